@@ -3,50 +3,24 @@
 # 
 # Here, `steam_links_v2.txt` is a result of that bot, and we simply clean out the tracking info from v2 to create the final clean version `steam_links_v3.txt`
 
-# %%
-# Open up v2 text file
-steam_links_from_text_file = open("steam_links_v2.txt","r")
-content = steam_links_from_text_file.read()
-print(content)
-# Split by new line, since every link is on it's own line
-URL_ARRAY = content.split("\n")
-steam_links_from_text_file.close()
-
-# %%
-url_set = set(URL_ARRAY) # Remove duplicates
-
-# %%
-clean_url_set = [] # Prepare for cleaning of trackers
+# %% [markdown]
+# The links are streamed through `links.py`: every link is reduced to its app_id (so `/app/367520/Hollow_Knight/?snr=...`, `/app/367520` and `http://.../app/367520/Hollow_Knight/` all count as the same app), deduped on that, and written to v3 as one clean url per app as we go. Nothing is loaded into memory, so this works the same on a list with millions of lines.
 
 # %%
-# Removes the tracking info from the url
-# Given : https://store.steampowered.com/app/367520/Hollow_Knight/?snr=1_7_7_230_150_3 as string
-# Returns : https://store.steampowered.com/app/367520/Hollow_Knight/ as string 
-def clean_url(url):
-  url_split = url.split('?')
-  # print(url_split[0])
-  return url_split[0]
+from links import clean_url, dedupe_file
 
+# clean_url() removes the tracking info from the url (links that aren't to an app are left as they are)
 clean_url("https://store.steampowered.com/app/367520/Hollow_Knight/?snr=1_7_7_230_150_3") 
 
-# %%
-# Clean each url with a tracker
-for url in url_set:
-  print(clean_url(url))
-  clean_url_set.append(clean_url(url))
-
 # %% [markdown]
-# We get 4388 entries to start our cleaning (of the data, not links) process.
+# Now we store for v3 of the links, postfixing a `\n` at the end of entry for easy conversion between text file and python list. `stats` says how many links were duplicates of an app we already had (and how many lines were blank or not app links at all)
 
 # %%
-len(clean_url_set)
+stats = dedupe_file('steam_links_v2.txt', 'steam_links_v3.txt')
+print(stats)
 
 # %% [markdown]
-# Now we store for v3 of the links, postfixing a `\n` at the end of entry for easy conversion between text file and python list
+# We got 4388 entries to start our cleaning (of the data, not links) process when deduping on the raw urls. Deduping on app_id also collapses the tracker / slug variants of the same app, so this is a bit lower.
 
 # %%
-with open('steam_links_v3.txt', 'w') as txtfile:
-    for url_link in clean_url_set:
-        txtfile.write(url_link + '\n')
-
-
+stats['unique']
@@ -21,10 +21,10 @@ from sklearn.linear_model import LinearRegression
 
 
 # %%
-steam_df = pd.read_csv('full_df.csv')
+# Loads full_df.parquet if there is one, else full_df.csv (read_stage drops the csv's 'Unnamed: 0' index column)
+from schema import read_stage
 
-# %%
-steam_df = steam_df.drop(columns = steam_df.columns[0])
+steam_df = read_stage('full_df')
 
 # %%
 steam_df
@@ -0,0 +1,136 @@
+# A lighter way to get the same rows: the store's JSON app-details API instead of the full HTML store page.
+#
+# A store page is hundreds of KB of HTML; the app-details JSON for the same app is a few KB and needs no HTML parsing
+# (apart from the small system requirements snippet). The fields are mapped onto the same 18 columns as
+# extract_page(), with a few differences worth knowing:
+#   * User Tags aren't in the API, so they come back as an empty list
+#   * Review fields come from the appreviews endpoint (one more small request per app, reviews = False skips it).
+#     Rating is the share of positive reviews on the 1-10 scale the store page's microdata uses
+#   * All Time Reception is only kept for positive summaries, like the 'game_review_summary positive' span was
+#
+# The full details are one request per app: the endpoint only takes several appids at once when asking for prices
+# alone (filters=price_overview), and the details already have the price.
+#
+# Usage:
+#   hw_df, errors = scrape_app_ids(['1092790', '367520'], concurrency = 4, per_host_rate = 1)
+
+import asyncio
+import time
+
+import pandas as pd
+
+from extract import extract_app_id, extract_requirements, HW_COLUMNS
+from fetch import get_json, open_session, run_workers, with_retries
+from parsers import make_soup
+from throttle import AdaptiveLimit, HostRateLimiter, RetryPolicy
+
+STORE_URL = 'https://store.steampowered.com'
+
+# The app-details endpoint allows roughly 200 requests per 5 minutes
+DEFAULT_RATE = 0.6
+
+
+# Raised when the API has nothing for an app_id ({"success": false}, which it also answers for removed apps)
+class AppNotFound(LookupError):
+  pass
+
+
+# Given : An open aiohttp session, an app_id and the throttling in use
+# Returns : The 'data' part of the app-details answer
+async def fetch_details(session, app_id, limiter, retry = None, gate = None, base_url = STORE_URL):
+  url = base_url + '/api/appdetails'
+  params = {'appids' : str(app_id), 'cc' : 'us', 'l' : 'english'}
+  answer = await with_retries(lambda: get_json(session, url, params, limiter), url, limiter, retry, gate)
+  entry = (answer or {}).get(str(app_id)) or {}
+  if not entry.get('success'):
+    raise AppNotFound(app_id)
+  return entry['data']
+
+# Given : An open aiohttp session, an app_id and the throttling in use
+# Returns : The 'query_summary' part of the appreviews answer (review_score_desc, total_positive, total_reviews, ...)
+async def fetch_review_summary(session, app_id, limiter, retry = None, gate = None, base_url = STORE_URL):
+  url = base_url + '/appreviews/' + str(app_id)
+  params = {'json' : '1', 'language' : 'all', 'purchase_type' : 'all', 'num_per_page' : '0'}
+  answer = await with_retries(lambda: get_json(session, url, params, limiter), url, limiter, retry, gate)
+  return (answer or {}).get('query_summary') or {}
+
+
+# Given : The price_overview of an app (or None) and whether it's free
+# Returns : The price as the store page shows it: the original price of a discounted game, 'Free To Play', or -1
+def price_text(price_overview, is_free):
+  if is_free:
+    return 'Free To Play'
+  if not price_overview:
+    return -1 # Same as extract_price() when no price was found
+  if price_overview.get('discount_percent') and price_overview.get('initial_formatted'):
+    return price_overview['initial_formatted']
+  return price_overview.get('final_formatted', -1)
+
+# Given : The data of an app-details answer, the app_id and the review summary (or None)
+# Returns : The spec_list extract_page() would give for the app's store page (see the top of this file)
+def details_to_spec_list(data, app_id, review_summary = None):
+  spec_list = [1] * ( 18 )
+
+  # Minimum requirements come as a small HTML snippet with the same <li><strong>OS:</strong> ... items as the page
+  requirements = data.get('pc_requirements')
+  if isinstance(requirements, dict) and requirements.get('minimum'):
+    extract_requirements(make_soup(requirements['minimum']).find_all('li'), spec_list)
+
+  spec_list[0] = data.get('name', '')
+  spec_list[6] = str(app_id)
+  spec_list[7] = price_text(data.get('price_overview'), data.get('is_free'))
+  spec_list[8] = (data.get('developers') or [''])[0]
+  spec_list[9] = (data.get('publishers') or [''])[0]
+  spec_list[10] = ((data.get('genres') or [{}])[0]).get('description', '')
+  spec_list[11] = (data.get('release_date') or {}).get('date', '')
+  spec_list[12] = []
+
+  summary = review_summary or {}
+  description = summary.get('review_score_desc', '')
+  spec_list[13] = description if 'Positive' in description else 'N/A'
+  total = summary.get('total_reviews', 0)
+  spec_list[14] = str(total)
+  spec_list[15] = str(max(1, round(10 * summary.get('total_positive', 0) / total))) if total else '0'
+  spec_list[16] = '10'
+  spec_list[17] = '1'
+  return spec_list
+
+
+# Given : An iterable of app_ids (or store urls, their app_id is used)
+# Yields : (app_id, spec_list, error) for every app, in the order they finish, like fetch.crawl()
+async def crawl_app_ids(app_ids, concurrency = 4, per_host_rate = DEFAULT_RATE, reviews = True, retry = RetryPolicy(),
+                        timeout = 30, adaptive = True, base_url = STORE_URL):
+  limiter = HostRateLimiter(per_host_rate)
+  gate = AdaptiveLimit(concurrency) if adaptive else None
+
+  async def scrape_one(session, app_id):
+    data = await fetch_details(session, app_id, limiter, retry, gate, base_url)
+    summary = await fetch_review_summary(session, app_id, limiter, retry, gate, base_url) if reviews else None
+    return details_to_spec_list(data, app_id, summary)
+
+  def as_app_id(item):
+    return extract_app_id(item) if '/' in str(item) else str(item)
+
+  async with open_session(concurrency, timeout) as session:
+    async for item in run_workers((as_app_id(item) for item in app_ids), lambda app_id: scrape_one(session, app_id), concurrency):
+      yield item
+
+
+# Given : An iterable of app_ids or store urls (plus any of crawl_app_ids()'s keyword arguments)
+# Returns : (hw_df, errors) like fetch.scrape_urls(), errors being a list of (app_id, exception)
+async def scrape_app_ids_async(app_ids, **options):
+  list_of_specs = []
+  errors = []
+  start = time.perf_counter()
+  async for app_id, spec_list, error in crawl_app_ids(app_ids, **options):
+    if error is None:
+      list_of_specs.append(spec_list)
+    else:
+      print("ERROR FOR APP : " + str(app_id) + " (" + type(error).__name__ + ")")
+      errors.append((app_id, error))
+  print("Fetched " + str(len(list_of_specs)) + " apps (" + str(len(errors)) + " errors) in " + str(round(time.perf_counter() - start, 1)) + "s")
+  return pd.DataFrame(list_of_specs, columns = HW_COLUMNS), errors
+
+# Same as scrape_app_ids_async(), for use outside of a running event loop
+def scrape_app_ids(app_ids, **options):
+  return asyncio.run(scrape_app_ids_async(app_ids, **options))
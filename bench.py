@@ -0,0 +1,275 @@
+# Benchmarks for the scraper, run against a folder of saved store pages (named <app_id>.html, same as standin.py).
+#
+# Usage:
+#   python bench.py extractors saved_pages      (per-page CPU cost of extract_fields vs the separate extract_* helpers)
+#   python bench.py backends saved_pages        (every parser backend gives the same rows, and how fast each one is)
+#   python bench.py workers saved_pages         (pages/sec of reextract.py at 1, 2, 4 and one worker per core)
+#   python bench.py suite saved_pages --save-baseline bench_baseline.json
+#   python bench.py suite saved_pages --baseline bench_baseline.json
+#                                               (times every stage of the scrape, see bench_suite(), and fails if
+#                                                any got slower than the baseline by more than --tolerance)
+#
+# Timings depend on the machine (and on what else it's running), so only compare against a baseline saved on the
+# same machine, from the same corpus. The corpus should have each of PAGE_CATEGORIES, the suite says which it lacks.
+#
+# tests/fixtures/pages is a corpus with every category (1xxx regular, 2xxx free, 3xxx discounted, 4xxx no system
+# requirements, 5xxx no review summary), and tests/fixtures/bench_baseline.json the suite's results on it:
+#   python bench.py suite tests/fixtures/pages --baseline tests/fixtures/bench_baseline.json
+# Save a new baseline on your machine first (--save-baseline) if it isn't the one that one was saved on.
+
+import argparse
+import contextlib
+import gc
+import glob
+import io
+import json
+import os
+import tempfile
+import time
+
+import bs4
+import pandas as pd
+
+import fetch
+import standin
+from extract import extract_fields, extract_fields_by_helpers, extract_page, HW_COLUMNS
+from metrics import HELPER_CALLS
+from page_cache import PageCache
+from parsers import DEFAULT_BACKEND, PARSER_BACKENDS, make_soup
+from reextract import reextract_entries
+
+# The kinds of store page the suite should cover, and how to tell a page is one of them (a page can be several)
+PAGE_CATEGORIES = {
+  'no_sys_req' : lambda page: b'game_area_sys_req_leftCol' not in page,
+  'free' : lambda page: b'Free To Play' in page or b'Free to Play' in page,
+  'discounted' : lambda page: b'discount_original_price' in page,
+  'no_review_summary' : lambda page: b'game_review_summary positive' not in page,
+}
+
+
+# Given : A folder of saved pages named <app_id>.html
+# Returns : A list of (url, page bytes), with urls as they'd appear in steam_links_v3.txt
+def load_corpus(pages_dir):
+  corpus = []
+  for page_path in sorted(glob.glob(os.path.join(pages_dir, '*.html'))):
+    app_id = os.path.splitext(os.path.basename(page_path))[0]
+    with open(page_path, 'rb') as page_file:
+      corpus.append(('https://store.steampowered.com/app/' + app_id + '/', page_file.read()))
+  return corpus
+
+# Given : A function and its arguments, and how many times to run it
+# Returns : The best (lowest) time of a single call, in seconds. The best of several runs is the least noisy figure
+#   (the garbage collector is held off while timing, so a collection doesn't land on one call at random)
+def best_time(function, args, repeat):
+  best = float('inf')
+  gc_was_enabled = gc.isenabled()
+  gc.disable()
+  try:
+    for _ in range(repeat):
+      start = time.perf_counter()
+      function(*args)
+      best = min(best, time.perf_counter() - start)
+  finally:
+    if gc_was_enabled:
+      gc.enable()
+  return best
+
+# Given : A list of (url, page bytes)
+# Prints the per-page time of both extraction paths (on an already-parsed page), and checks they give the same row
+def bench_extractors(corpus, repeat = 5):
+  helper_total = 0.0
+  single_total = 0.0
+  mismatches = 0
+  for url, page in corpus:
+    steamed_soup = bs4.BeautifulSoup(page, features="html.parser")
+    try:
+      expected = extract_fields_by_helpers(steamed_soup, url)
+    except Exception:
+      continue # The page isn't scrapable with either path
+    if extract_fields(steamed_soup, url) != expected:
+      mismatches = mismatches + 1
+      print('MISMATCH : ' + url)
+
+    helper_total = helper_total + best_time(extract_fields_by_helpers, (steamed_soup, url), repeat)
+    single_total = single_total + best_time(extract_fields, (steamed_soup, url), repeat)
+
+  pages = max(len(corpus), 1)
+  print('pages              : ' + str(len(corpus)))
+  print('extract_* helpers  : ' + str(round(helper_total / pages * 1000, 3)) + ' ms/page')
+  print('single pass        : ' + str(round(single_total / pages * 1000, 3)) + ' ms/page')
+  if single_total:
+    print('speedup            : ' + str(round(helper_total / single_total, 2)) + 'x')
+  print('mismatched rows    : ' + str(mismatches))
+
+
+# Given : A list of (url, page bytes)
+# Checks that every installed parser backend gives exactly the rows that html.parser gives (pages html.parser
+#   can't scrape must fail on the other backends too), and prints the per-page parse + extract time of each.
+# Returns : The number of mismatched pages, over all backends
+def check_backends(corpus, repeat = 3):
+  expected = {}
+  for url, page in corpus:
+    try:
+      expected[url] = extract_page(page, url, 'html.parser')
+    except Exception as e:
+      expected[url] = type(e).__name__
+
+  mismatches = 0
+  for backend in PARSER_BACKENDS:
+    total = 0.0
+    for url, page in corpus:
+      try:
+        row = extract_page(page, url, backend)
+        total = total + best_time(extract_page, (page, url, backend), repeat)
+      except Exception as e:
+        row = type(e).__name__
+      if row != expected[url]:
+        mismatches = mismatches + 1
+        print('MISMATCH (' + backend + ') : ' + url)
+        print('  html.parser : ' + str(expected[url]))
+        print('  ' + backend + ' : ' + str(row))
+    print(backend.ljust(12) + ' : ' + str(round(total / max(len(corpus), 1) * 1000, 3)) + ' ms/page')
+  print('mismatched rows : ' + str(mismatches))
+  return mismatches
+
+# Given : A list of (url, page bytes)
+# Caches the corpus (repeated `copies` times, so there's enough work to spread), then prints the pages/sec of
+#   reextract_entries() for each number of workers
+def bench_workers(corpus, worker_counts = None, copies = 20, chunk_size = 32):
+  worker_counts = worker_counts or sorted({1, 2, 4, os.cpu_count()})
+  with tempfile.TemporaryDirectory() as cache_dir:
+    with PageCache(cache_dir) as cache:
+      for copy in range(copies):
+        for number, (url, page) in enumerate(corpus):
+          cache.put(str(copy) + '-' + str(number), url, page)
+      entries = cache.entries()
+
+    base_rate = None
+    for workers in worker_counts:
+      start = time.perf_counter()
+      for result in reextract_entries(entries, workers = workers, chunk_size = chunk_size):
+        pass
+      rate = len(entries) / (time.perf_counter() - start)
+      base_rate = base_rate or rate
+      print(str(workers).rjust(3) + ' workers : ' + str(round(rate, 1)) + ' pages/sec (' + str(round(rate / base_rate, 2)) + 'x)')
+
+
+# Given : The bytes of a store page
+# Returns : The PAGE_CATEGORIES it falls in ('regular' if none)
+def categorize(page):
+  categories = [name for name, matches in PAGE_CATEGORIES.items() if matches(page)]
+  return categories or ['regular']
+
+# Given : A list of (url, page bytes)
+# Returns : The per-page time (ms, best of `repeat`) of every stage of the scrape, keyed by stage:
+#   'parse'                : make_soup() with the default backend (steam_scrape's parse)
+#   'extract_fields'       : the single-pass extraction on the parsed page
+#   'extract_page'         : both of the above, what steam_scrape() does once it has the page
+#   'helper:extract_*'     : each extract_* helper on its own
+#   'category:<category>'  : extract_page on the pages of that category (see PAGE_CATEGORIES)
+#   'to_dataframe'         : extract_page on every page, then the DataFrame, divided by the number of pages
+#   'scrape_urls'          : the whole fetch.scrape_urls() path against a local standin.py, divided by the number of pages
+def bench_suite(corpus, repeat = 5, pages_dir = None):
+  results = {}
+  soups = []
+  for url, page in corpus:
+    soups.append((url, make_soup(page)))
+  pages = max(len(corpus), 1)
+
+  def per_page(function, items):
+    return round(sum(best_time(function, item, repeat) for item in items) / max(len(items), 1) * 1000, 4)
+
+  results['parse'] = per_page(make_soup, [(page,) for url, page in corpus])
+  results['extract_fields'] = per_page(extract_fields, [(soup, url) for url, soup in soups])
+  results['extract_page'] = per_page(extract_page, [(page, url) for url, page in corpus])
+  for name, call in HELPER_CALLS:
+    results['helper:' + name] = per_page(lambda soup, url: try_call(call, soup, url), [(soup, url) for url, soup in soups])
+
+  by_category = {}
+  for url, page in corpus:
+    for category in categorize(page):
+      by_category.setdefault(category, []).append((page, url))
+  for category in list(PAGE_CATEGORIES) + ['regular']:
+    if category in by_category:
+      results['category:' + category] = per_page(extract_page, by_category[category])
+    else:
+      print('No ' + category + ' page in the corpus, that case isn\'t covered')
+
+  def to_dataframe():
+    return pd.DataFrame([extract_page(page, url) for url, page in corpus], columns = HW_COLUMNS)
+  results['to_dataframe'] = round(best_time(to_dataframe, (), repeat) / pages * 1000, 4)
+
+  if pages_dir is not None:
+    server, base_url = standin.serve(pages_dir)
+    try:
+      urls = [base_url + '/app/' + url.rstrip('/').split('/')[-1] + '/' for url, page in corpus]
+      def scrape():
+        with contextlib.redirect_stdout(io.StringIO()): # scrape_urls() prints a line per run
+          fetch.scrape_urls(urls, concurrency = 8, retry = None)
+      results['scrape_urls'] = round(best_time(scrape, (), repeat) / pages * 1000, 4)
+    finally:
+      server.shutdown()
+  return results
+
+# Given : One of metrics.HELPER_CALLS, a soup and its url, runs it (a helper failing on a page that lacks its block is fine)
+def try_call(call, steamed_soup, steam_url):
+  try:
+    call(steamed_soup, steam_url)
+  except Exception:
+    pass
+
+# Given : The results of bench_suite(), a baseline (same form, from an earlier run) and how much slower is tolerated
+#   (0.25 : 25%). Stages that got slower by less than min_ms (per page) are never flagged, their timings are mostly noise
+# Prints every stage next to its baseline
+# Returns : The stages that got slower than that
+def compare_to_baseline(results, baseline, tolerance = 0.25, min_ms = 0.05):
+  regressions = []
+  print('stage'.ljust(36) + 'ms/page'.rjust(10) + 'baseline'.rjust(10) + 'change'.rjust(9))
+  for stage, value in results.items():
+    before = baseline.get(stage)
+    if not before:
+      print(stage.ljust(36) + str(value).rjust(10) + '-'.rjust(10))
+      continue
+    change = value / before - 1
+    flag = ''
+    if change > tolerance and value - before > min_ms:
+      regressions.append(stage)
+      flag = '  REGRESSION'
+    print(stage.ljust(36) + str(value).rjust(10) + str(before).rjust(10) + (('+' if change >= 0 else '') + str(round(change * 100, 1)) + '%').rjust(9) + flag)
+  return regressions
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description = 'Benchmarks for the Steam scraper')
+  parser.add_argument('benchmark', choices = ['extractors', 'backends', 'workers', 'suite'])
+  parser.add_argument('pages_dir', help = 'Folder of saved store pages, named <app_id>.html')
+  parser.add_argument('--repeat', type = int, default = 5)
+  parser.add_argument('--workers', type = int, nargs = '+', help = 'Worker counts to try (workers benchmark)')
+  parser.add_argument('--copies', type = int, default = 20, help = 'Times the corpus is repeated (workers benchmark)')
+  parser.add_argument('--baseline', help = 'Results of an earlier suite run to compare against (suite benchmark)')
+  parser.add_argument('--save-baseline', help = 'Where to save the results as the new baseline (suite benchmark)')
+  parser.add_argument('--tolerance', type = float, default = 0.25, help = 'Slowdown allowed before it counts as a regression')
+  options = parser.parse_args()
+
+  corpus = load_corpus(options.pages_dir)
+  if options.benchmark == 'extractors':
+    bench_extractors(corpus, options.repeat)
+  elif options.benchmark == 'backends':
+    if check_backends(corpus, options.repeat):
+      raise SystemExit(1)
+  elif options.benchmark == 'workers':
+    bench_workers(corpus, options.workers, options.copies)
+  elif options.benchmark == 'suite':
+    print(str(len(corpus)) + ' pages, parser backend : ' + DEFAULT_BACKEND)
+    results = bench_suite(corpus, options.repeat, options.pages_dir)
+    baseline = {}
+    if options.baseline:
+      with open(options.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = compare_to_baseline(results, baseline, options.tolerance)
+    if options.save_baseline:
+      with open(options.save_baseline, 'w') as baseline_file:
+        json.dump(results, baseline_file, indent = 2)
+    if regressions:
+      print('Slower than the baseline : ' + ', '.join(regressions))
+      raise SystemExit(1)
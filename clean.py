@@ -1,14 +1,20 @@
 # %% [markdown]
 # After Generating the data, we now clean it
 # 
+# The cleaning itself is written down as a plan in `cleaning.py` (`steam_plan()`), and `clean_stage` runs it over the whole scrape and writes the cleaned files (see the end of this notebook). Here we first look at the raw data to see why each step of the plan is there
+# 
 # First start by loading the dataframe
 
 # %%
 import pandas as pd
 import numpy as np
+from schema import read_stage
+from cleaning import DateParser, clean_stage, has_hardware, parse_prices, parse_sizes
+from hardware import hardware_columns
 
 # %%
-steam_df = pd.read_csv('steam_hardware_data_v5_UNCLEAN.csv')
+# Loads the .parquet from scrape.py if there is one (typed, User Tags as lists), else the .csv
+steam_df = read_stage('steam_hardware_data_v5_UNCLEAN')
 
 # %%
 unique_titles = steam_df['Title'].unique()
@@ -19,12 +25,8 @@ print(len(sorted(unique_titles)))
 steam_df
 
 # %%
-# Drop 2nd column as it's a duplicate of the first
-column_name = steam_df.columns[0]
-print(column_name)
-
-# Drop first column, 'Unnamed: 0'
-steam_df = steam_df.drop(columns = column_name)
+# The csv's first column, 'Unnamed: 0', was a duplicate of the index. read_stage drops it (and a parquet never had it)
+print(steam_df.columns[0])
 steam_df
 
 
@@ -37,16 +39,10 @@ print(steam_df['Best Rating'].unique())
 # %%
 print(steam_df['Worst Rating'].unique())
 
-# %%
-# Drop the 'Best Rating' and 'Worst Rating Columns
-steam_df = steam_df.drop(columns = 'Best Rating')
-steam_df = steam_df.drop(columns = 'Worst Rating')
-
-# %%
-steam_df
-
 # %% [markdown]
-# After droping those two columns, we're left with the glaring fact that the features regarding Hardware, for a particular game, will either consist of 1's
+# So the plan drops the 'Best Rating' and 'Worst Rating' columns.
+# 
+# Once those two columns are dropped, we're left with the glaring fact that the features regarding Hardware, for a particular game, will either consist of 1's
 # 
 # $$ [\text{ Graphics }, \text{ Memory}, \text{ OS}, \text{ Processor}, \text{ Storage}] = [1,1,1,1,1]$$
 # 
@@ -77,65 +73,44 @@ print(sorted(unique_prices))
 # * If the game has:
 #   * `Free demo`, `Free To Play`, or other  set the price 0
 #   * Values like `'Unspottable Demo', 'Venge Demo', 'Worbital: Online Demo', 'Wunderling Demo'`, also get converted to 0
-#   * Otherwise, just strip the price from their $ symbol
+#   * Otherwise, just strip the price from its currency symbol (`$12.99`, but also `12,99€` or `¥ 1,200` if the store was browsed from elsewhere)
+#
+# `parse_prices` (in `cleaning.py`) does the whole column at once, and gives the currency and whether the game is free / a demo alongside the price
 
 # %%
-# Given a string of form $12.34, returns the dollar amount without the sign as '12.34' in USD
-def strip_dollar(dollar):
-  if '$' in dollar: 
-    # print(dollar)
-    stripped = dollar.split('$')
-    return stripped[1]
-  else: # If the inputted value was a Free To Play/ Free Demo game and dollar was instantiated as 0 (instead of a value w/ a $ in it)
-    # print('0000')
-    return '0'
-
 #Test
-print(strip_dollar('$10.99'))
-print(strip_dollar('Unholy Heights Trial Version'))
-print(strip_dollar('🐛  PLAY NOW'))
-
-# %%
-steam_df['Original Price'] = ['0' if x == 'Free demo' or x == 'Free To Play' else strip_dollar(x) for x in steam_df['Original Price']]
-
+print(parse_prices(['$10.99', '12,99€', 'Unholy Heights Trial Version', '🐛  PLAY NOW', 'Free To Play']))
 
 # %%
-steam_df
-
-# %%
-unique_prices = steam_df['Original Price'].unique()
-print(sorted(unique_prices))
+# What the plan makes of the column: free games, demos and anything that isn't a price cost 0
+prices = parse_prices(steam_df['Original Price'])
+print(prices['currency'].value_counts(dropna = False))
+print(sorted(prices['price'].fillna(0.0).unique()))
 
 # %% [markdown]
-# Now we see that the only unique entries is numerical, for the `Original Price` data
+# So the only unique entries left are numerical (float), for the `Original Price` data
 # 
 # Next, we take a look at the `All Time Reception` column
 
 # %%
-steam_df['All Time Reception'].isna().sum()
-
-# %% [markdown]
-# We only have 4 entries with 'NaN' in them. Let's remove them.
-
-# %%
-# steam_df.dropna(self, axis=1, how="any", thresh=None, subset=None, inplace=False)
-steam_df.dropna(axis = 0, how = 'any', inplace = True)
-
-# %%
-steam_df
+# Pages without a review summary were scraped as 'N/A'. read_csv turned those into NaN on its own, a parquet keeps the
+# string, so the plan turns 'N/A' into NaN first
+steam_df['All Time Reception'].replace('N/A', np.nan).isna().sum()
 
 # %% [markdown]
+# We only have 4 entries with 'NaN' in them. The plan removes the rows with a NaN in them (`dropna`).
+# 
 # Next, we look regarding converting the 'Release Date' column to type `Date`, if need be.
 
 # %%
 steam_df['Release Date'].dtypes
 
 # %%
-# Convert it to DateTime
-steam_df['Release Date'] = pd.to_datetime(steam_df['Release Date']) 
-
-# %%
-steam_df['Release Date'].dtypes
+# The plan converts it to DateTime. DateParser (in cleaning.py) knows the date formats the store uses ('19 Oct, 2021', 'Oct 2021', 'Q3 2023', '2021年10月19日'...),
+# parses each distinct string once, and leaves NaT for 'Coming soon' and anything it can't read instead of stopping the notebook
+release_dates = DateParser()
+print(release_dates(steam_df['Release Date']).dtypes)
+print(release_dates.summary())
 
 # %% [markdown]
 # Nice. Now, we look thinning out the Memory, Storage, and OS
@@ -170,123 +145,60 @@ sorted(unique_os)
 # 
 # _______________________________________
 # 
-# We start by making the functions that will clean the text entries of `Memory` and `Storage` by extracting the information, and converting to GB as needed.
+# We clean the text entries of `Memory` and `Storage` by extracting the information, and converting to GB as needed.
 
 # %%
-# Given : A string with storage information in GB or MB
-# Returns : The number (as float) representing the giving amount of GB (and converts to GB if amount was in MB)
-def clean_space(ram):
-  # Optimization note : Could factor out the following code chunk:
-      # try:
-      # ram_int = actual_ram[0] # Since ram value always starts with number
-      # # print(ram_int)
-      # convert_units_ram = np.divide(float(ram_int) , 1024.0)#float(ram_int) / 1024.0
-      # return convert_units_ram
-  
-  # Author's Note : While not generalizable, there was so few rare cases that it is
-  #   easier to just write them in
-  print(ram)
-  
-  if '以' in ram:
-    return 100.0
-  if '4g' in ram:
-    return 4.0
-
-  if ram == '1':
-    return 1 # This means there was no data from the scraping
-  elif 'MB' in ram:
-    # Convert it to GB, return the value
-    actual_ram = ram.strip().split(' ')
-    try:
-      ram_int = actual_ram[0] # Since ram value always starts with number
-      # print(ram_int)
-      convert_units_ram = np.divide(float(ram_int) , 1024.0)#float(ram_int) / 1024.0
-      return convert_units_ram
-    except:
-      actual_ram = ram.strip().split('M')
-      ram_int = actual_ram[0]
-      convert_units_ram = np.divide(float(ram_int) , 1024.0)#float(ram_int) / 1024.0
-      return convert_units_ram
-      
-    print(ram_int)
-    convert_units_ram = np.divide(float(ram_int) , 1024.0)#float(ram_int) / 1024.0
-    return convert_units_ram
-  
-  # No conversion needed. Just extract GB amount
-  elif 'GB' in ram:
-    try:
-      actual_ram = ram.strip().split(' ')
-      ram_int = float(actual_ram[0]) * 1.0
-      return ram_int 
-    except:
-      actual_ram = ram.strip().split('G')
-      ram_int = float(actual_ram[0]) * 1.0
-      return ram_int   
-
-  else:
-    return -1
-  return -1
+#Test
+print(parse_sizes(['8 GB RAM', '512 MB RAM', '1,5 Go', '100GB以上', '4gb', '1']))
 
 # %% [markdown]
-# Since the function only extracts out the storage capacity (in GB), then, we can use it both on the RAM and the Storage columns to clean it (we print out each input before cleaning, for demonstration)
+# `parse_sizes` (in `cleaning.py`) extracts the storage capacity (in GB) out of a whole column at once, so we use it on both the RAM and the Storage columns. Games with no hardware data (the `1`s) get NaN, and `missing` says which ones they are
 
 # %%
-steam_df['Memory'] = ['1' if x == '1' or x == 1 else clean_space(x) for x in steam_df['Memory']]
+memory = parse_sizes(steam_df['Memory'])
+print('Memory missing : ' + str(memory['missing'].sum()))
 
 # %%
-steam_df['Storage'] = ['1' if x == '1' or x == 1 else clean_space(x) for x in steam_df['Storage']]
-
-# %%
-steam_df
+storage = parse_sizes(steam_df['Storage'])
+print('Storage missing : ' + str(storage['missing'].sum()))
 
 # %% [markdown]
-# Now, we proceed by removing the 'OS' column entirely (since everything was Windows), and then after we remove any rows with `1` as a value for `Processor` as a means for removing empty hardware data
-# 
-# Starting with removing `OS`...
-
-# %%
-steam_df = steam_df.drop(columns = "OS")
+# The `Graphs` and `Processor` columns are free text (`NVIDIA GeForce GTX 960 2GB`, `Intel Core i5-4460 / AMD FX-6300`), so on their own they're of no use to the analysis. `hardware_columns` (in `hardware.py`) reads them into columns we can use: the CPU's vendor, family, cores and GHz, and the GPU's vendor, model, VRAM (GB) and a rough tier from 1 (integrated / old) to 5 (high end)
+#
+# It also looks the CPU and GPU up in `hardware_models.csv`, a table of common models with a score for each, giving `CPU Model` / `CPU Score` and `GPU Score`. The scores are approximate relative performance on a 0-100 scale, put together by hand (see the top of the csv), so they're good to rank games by how demanding they are, not to compare two cards precisely
+#
+# (`hardware.requirements_from_cache` gets the same, plus DirectX, for both the minimum and the recommended requirements out of the cached pages)
 
 # %%
-steam_df
+hardware = hardware_columns(steam_df)
+steam_df[['Processor', 'Graphs']].join(hardware)[['Processor', 'CPU Family', 'CPU Model', 'CPU Score', 'Graphs', 'GPU Model', 'GPU Tier', 'GPU Score']]
 
 # %% [markdown]
-# Now before we remove empty hardware specs, we save two csv's, since they both have potential uses:
+# Last, the plan removes the 'OS' column entirely (since everything was Windows). Rows with `1` as a value for `Processor` or `Graphs` have empty hardware data, but the rest of their features are intact, so we save two versions, since they both have potential uses:
 # 
 # 1) A CSV with empty $[\text{ Graph }, \text{ Memory } ,\text{ Processor } ,\text{ Storage }] = [1,1,1,1]$ but the rest of the features intact
 # 
-# 2) A CSV without the empty features mentioned in (1)
-
-# %%
-# This data is the csv described in (1) (csv with [1,1,1,1]'s)
-steam_df.to_csv('Steam Data Clean v5 (Cleaned).csv')
-
-# %% [markdown]
-# Then we save the csv with the empty hardware features removed
-
-# %%
-# If a 'Processor' cell has 1, then it means that no hardware specs were available for this game
-steam_df = steam_df[steam_df.Processor != '1'] # Should keep games like Carto, Let's Build a Zoo, Dishonored: Death of the Outsider, Need for Speed payback
+# 2) A CSV without the empty features mentioned in (1) (`has_hardware` in `cleaning.py` : both `Processor` and `Graphs` aren't `1`. Should keep games like Carto, Let's Build a Zoo, Dishonored: Death of the Outsider, Need for Speed payback, and remove Idle Big Devil)
+# 
+# `clean_stage` runs `steam_plan()` over the scrape a chunk at a time (changing each chunk in place and cutting it down once, no copy of the whole frame per step), so it also works when the scrape is too big for the notebook. It reads the input and cleans each row only once, and writes both versions, as csv and as typed parquet for the next stage. (`steam_plan().run(df)` does the same to a DataFrame already in memory)
 
 # %%
-steam_df
+# Each cleaned row goes to both versions (csv and parquet) or, if it has no hardware data, to the full ones only
+counts = clean_stage('steam_hardware_data_v5_UNCLEAN', {
+  'Steam Data Clean v5 (Cleaned).csv' : None,
+  'Steam Data Clean v5 (Cleaned).parquet' : None,
+  'Steam Data Clean V5 (Cleaned - Empty Hardware Data Trimmed).csv' : has_hardware,
+  'Steam Data Clean V5 (Cleaned - Empty Hardware Data Trimmed).parquet' : has_hardware,
+}, chunksize = 50000)
+print(counts)
 
 # %% [markdown]
-# We still see some items in the Graphics card (`Graphs`) column with 1, so let us remove those
-
-# %%
-steam_df = steam_df[steam_df.Graphs != '1'] # Will remove item # 2156 (Idle Big Devil)
+# Voila. Now we can do some interesting data analysis with the 2,000-ish entries leftover
 
 # %%
+steam_df = read_stage('Steam Data Clean V5 (Cleaned - Empty Hardware Data Trimmed)')
 steam_df
 
-# %% [markdown]
-# Voila. Now we save to csv and do some interesting data analysis with the 2,000-ish entries leftover
-
-# %%
-# This data is the csv described in (2) (csv WITHOUT [1,1,1,1]'s)
-steam_df.to_csv('Steam Data Clean V5 (Cleaned - Empty Hardware Data Trimmed).csv')
-
 # %%
 unique_titles = steam_df['Title'].unique()
 
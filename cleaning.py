@@ -0,0 +1,401 @@
+# Vectorized cleaners for the scraped columns, used by clean.py.
+#
+# clean.py used to go through the columns one row at a time in Python (a list comprehension calling strip_dollar()
+# on every price). These work on a whole column at once with pandas string methods, and only on the column's
+# distinct values: a catalog has thousands of rows but a few dozen different prices, so each one is parsed once and
+# the results are spread back over the rows.
+#
+# Usage:
+#   prices = parse_prices(steam_df['Original Price'])   -> DataFrame with price (float64), currency, is_free, is_demo
+#   memory = parse_sizes(steam_df['Memory'])            -> DataFrame with gb (float64, NaN if missing), missing
+#   dates = DateParser(); dates(steam_df['Release Date']) -> the dates as datetime64, dates.summary() for the coverage
+#
+# The cleaning steps are put together as a CleaningPlan (steam_plan()), which can clean a whole DataFrame at once or
+# a stream of chunks, so a catalog bigger than memory gets cleaned a chunk at a time. clean.py writes its outputs
+# with clean_stage():
+#   cleaned = steam_plan().run(steam_df)
+#   counts = clean_stage('steam_hardware_data_v5_UNCLEAN', {'Steam Data Clean v5 (Cleaned).csv' : None,
+#                        'Steam Data Clean V5 (Cleaned - Empty Hardware Data Trimmed).parquet' : has_hardware})
+
+import collections
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from schema import CLEAN_SCHEMA, read_stage_chunks
+from sinks import FanOutSink, open_sink
+
+# Currency symbols (as they appear before or after the amount) -> ISO code. Symbols shared by several currencies
+# ('kr') aren't in here and are kept as they are
+CURRENCY_SYMBOLS = {
+  'CDN$' : 'CAD', 'A$' : 'AUD', 'NZ$' : 'NZD', 'R$' : 'BRL', 'Mex$' : 'MXN', 'HK$' : 'HKD', 'S$' : 'SGD', 'NT$' : 'TWD',
+  '$' : 'USD', '€' : 'EUR', '£' : 'GBP', '¥' : 'JPY', '₽' : 'RUB', 'zł' : 'PLN', '₩' : 'KRW', '₹' : 'INR',
+  '₺' : 'TRY', '₴' : 'UAH', '₪' : 'ILS', '฿' : 'THB', '₫' : 'VND', 'CHF' : 'CHF', 'R' : 'ZAR',
+  'USD' : 'USD', 'EUR' : 'EUR',
+}
+
+# <currency before> <amount> <currency after>, e.g. '$12.99', '12,99€', 'CDN$ 12.99', '1 234,56 zł', '¥ 1,200'
+# (a '-' can't be a currency, so the -1 placeholder for 'no price found' doesn't parse)
+PRICE_PATTERN = r'^\s*(?P<before>[^\d\s-]*)\s*(?P<amount>\d(?:[\d\s.,  \']*\d)?)\s*(?P<after>[^\d\s]*)\s*$'
+
+# An amount split at its last separator: <whole> <separator> <digits after it> ('1 234,56' -> '1 234', ',', '56').
+# Whether that separator is the decimal one depends on the rest of the amount, see amounts_to_float()
+LAST_SEPARATOR_PATTERN = r'^(?P<whole>.*?)(?P<separator>[.,])(?P<decimals>\d+)$'
+
+# <amount> <unit> anywhere in the text, e.g. '8 GB RAM', '512MB', '1,5 Go', '2 ТБ', '4gb', '100GB以上'.
+# The amount may have thousands groups of exactly 3 digits split by a space (a thin or non-breaking one too), ',' or
+# '.': '1 024 MB', '1,024 MB', '1.024,5 MB'. The first one found is the size (the minimum, when a requirement lists more)
+SIZE_PATTERN = (r'(?i)(?P<amount>\d{1,3}(?:[ \u00a0\u2009\u202f]\d{3})+(?!\d)(?:[.,]\d+)?|\d+(?:[.,]\d+)*)\s*'
+                r'(?P<unit>[kmgt]i?b|[kmgt]o|[kmgt]|gigs?|(?:kilo|mega|giga|tera)bytes?|[кмгт]б)(?![a-zа-я])')
+
+# Size of one unit in GB, by the unit's first letter (lowercased)
+GB_PER_UNIT = {'k' : 1.0 / 1024 / 1024, 'm' : 1.0 / 1024, 'g' : 1.0, 't' : 1024.0,
+               'к' : 1.0 / 1024 / 1024, 'м' : 1.0 / 1024, 'г' : 1.0, 'т' : 1024.0}
+
+# What the scraper writes when a page had no value (it wrote 1 for hardware it couldn't find, -1 for prices)
+MISSING_PLACEHOLDERS = ('1', '-1', '')
+
+
+# Given : A column of amounts as strings ('12.99', '12,99', '1 234,56', '1,200')
+# Returns : The amounts as float64 (NaN where there's no amount)
+# The last separator is the decimal one when:
+#   - the amount has both '.' and ',' ('1.234,56', '1,234.5')
+#   - or it's the only separator and isn't followed by exactly 3 digits ('12,99', '4.5'), or the whole part is 0
+#     ('0.125', a thousands group never follows a lone 0), or it's a '.' and three_digit_decimals ('1.875 GB'; a bool
+#     or a boolean Series indexed like amount)
+# Otherwise it's a thousands separator ('1,200', '1.299', '1,234,567')
+def amounts_to_float(amount, three_digit_decimals = False):
+  parts = amount.str.extract(LAST_SEPARATOR_PATTERN)
+  separator = parts['separator']
+  whole = parts['whole'].str.replace(r'\D', '', regex = True)
+  flag = lambda values: values.fillna(False).astype(bool) # NA (no separator, no amount) counts as False
+  has_dot = flag(parts['whole'].str.contains('.', regex = False))
+  has_comma = flag(parts['whole'].str.contains(',', regex = False))
+  is_dot = flag(separator == '.')
+  is_comma = flag(separator == ',')
+  both = (is_dot & has_comma) | (is_comma & has_dot)
+  repeated = (is_dot & has_dot) | (is_comma & has_comma)
+  alone = ~repeated & (flag(parts['decimals'].str.len() != 3) | flag(whole == '0') | (is_dot & three_digit_decimals))
+  is_decimal = (is_dot | is_comma) & (both | alone)
+  digits = amount.str.replace(r'\D', '', regex = True).where(~is_decimal, whole + '.' + parts['decimals'])
+  return pd.to_numeric(digits, errors = 'coerce').astype('float64')
+
+# Given : A column, a function parsing a Series of distinct strings into a DataFrame indexed like it, and the row to
+#   give the missing values (None / NaN)
+# Returns : parse()'s columns for every row of the column, each distinct value having been parsed once
+def parse_unique(values, parse, missing_row):
+  values = pd.Series(values)
+  codes, uniques = pd.factorize(values.astype('string'), use_na_sentinel = True)
+  parsed = parse(pd.Series(uniques, dtype = 'string'))
+  dtypes = parsed.dtypes.to_dict()
+  parsed.loc[len(parsed)] = missing_row # Row for the missing values (code -1 takes the last row)
+  result = parsed.take(codes).reset_index(drop = True)
+  result.index = values.index
+  return result.astype(dtypes)
+
+
+# Given : The distinct price strings of a column
+# Returns : A DataFrame indexed like them with price (float64), currency (ISO code where known, else the symbol),
+#   is_free and is_demo. Prices that aren't an amount (free, demo, 'PLAY NOW'...) get a NaN price, 0.0 if free
+def parse_price_strings(prices):
+  prices = pd.Series(prices, dtype = 'string')
+  lowered = prices.str.lower()
+  is_free = lowered.str.contains('free', regex = False).fillna(False).astype(bool)
+  is_demo = lowered.str.contains(r'\bdemo\b|\btrial\b|\bprologue\b', regex = True).fillna(False).astype(bool)
+
+  parts = prices.str.extract(PRICE_PATTERN)
+  price = amounts_to_float(parts['amount'])
+  price = price.mask(price.isna() & is_free, 0.0)
+
+  symbol = parts['before'].where(parts['before'].str.len() > 0, parts['after'])
+  currency = symbol.map(CURRENCY_SYMBOLS, na_action = 'ignore').fillna(symbol).replace('', pd.NA)
+  return pd.DataFrame({'price' : price, 'currency' : currency.astype('string'), 'is_free' : is_free,
+                       'is_demo' : is_demo}, index = prices.index)
+
+# Given : A column of scraped prices (strings like '$12.99' / '12,99€' / 'Free To Play', or the -1 placeholder)
+# Returns : A DataFrame with the column's index and price (float64), currency, is_free and is_demo (see parse_price_strings())
+def parse_prices(prices):
+  return parse_unique(prices, parse_price_strings, [np.nan, pd.NA, False, False])
+
+
+# Given : The distinct size strings of a column, and the pattern of a size (an <amount> and a <unit>)
+# Returns : A DataFrame indexed like them with gb (float64, the size in GB; NaN if missing) and missing (True for the
+#   scraper's placeholders and for text with no size in it)
+def parse_size_strings(sizes, pattern = SIZE_PATTERN):
+  sizes = pd.Series(sizes, dtype = 'string')
+  parts = sizes.str.extract(pattern)
+  unit = parts['unit'].str.lower().str[0]
+  # '1.875 GB' is a decimal, '1.024 MB' a thousands group (nobody writes a size to the KB in MB)
+  large_unit = unit.isin(['g', 't', 'г', 'т']).fillna(False).astype(bool)
+  amount = amounts_to_float(parts['amount'].str.replace(r'\s', '', regex = True), three_digit_decimals = large_unit)
+  per_unit = unit.map(GB_PER_UNIT, na_action = 'ignore').astype('float64')
+  gb = (amount * per_unit).mask(sizes.str.strip().isin(MISSING_PLACEHOLDERS).fillna(False).astype(bool))
+  return pd.DataFrame({'gb' : gb, 'missing' : gb.isna()}, index = sizes.index)
+
+# Given : A Memory or Storage column (strings like '8 GB RAM' / '512 MB' / '50 GB available space', or 1 for no data)
+# Returns : A DataFrame with the column's index and gb (float64, NaN if missing) and missing (see parse_size_strings())
+def parse_sizes(sizes):
+  return parse_unique(sizes, parse_size_strings, [np.nan, True])
+
+
+
+# The release date formats the store uses (it follows the browsing language), tried in this order on each distinct
+# string: (name, pattern). A pattern has a year and, depending on how precise the date is, a month (a number or a
+# name, see MONTHS), a day or a quarter
+DATE_FORMATS = [
+  ('iso', r'(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})'),
+  ('day month year', r'(?P<day>\d{1,2})\.?\s+(?:de\s+)?(?P<month>[^\W\d_]+)\.?,?\s+(?:de\s+)?(?P<year>\d{4})(?:\s*г\.?)?'),
+  ('month day year', r'(?P<month>[^\W\d_]+)\.?\s+(?P<day>\d{1,2}),?\s+(?P<year>\d{4})'),
+  ('year month day', r'(?P<year>\d{4})\s*[年.년/]\s*(?P<month>\d{1,2})\s*[月.월/]\s*(?P<day>\d{1,2})\s*[日일.]?'),
+  ('month year', r'(?:(?P<month>[^\W\d_]+)\.?,?\s+(?:de\s+)?(?P<year>\d{4})|(?P<year_cjk>\d{4})\s*年\s*(?P<month_cjk>\d{1,2})\s*月)'),
+  ('quarter', r'(?:Q|T)(?P<quarter>[1-4]),?\s+(?P<year>\d{4})'),
+  ('year', r'(?P<year>\d{4})'),
+]
+
+# Dates the store doesn't have yet. They aren't counted as unparseable
+UPCOMING_PATTERN = r'(?i)coming soon|to be announced|\btb[ad]\b|when it.s done|demn.chst|prochainement|pr.ximamente|скоро'
+
+# Month names (lowercase, without the '.') -> month. English, German, French, Spanish and Russian; a name that isn't in
+# here is looked up on its first 3 letters
+MONTHS = {
+  'jan' : 1, 'january' : 1, 'feb' : 2, 'february' : 2, 'mar' : 3, 'march' : 3, 'apr' : 4, 'april' : 4, 'may' : 5,
+  'jun' : 6, 'june' : 6, 'jul' : 7, 'july' : 7, 'aug' : 8, 'august' : 8, 'sep' : 9, 'sept' : 9, 'september' : 9,
+  'oct' : 10, 'october' : 10, 'nov' : 11, 'november' : 11, 'dec' : 12, 'december' : 12,
+  'mär' : 3, 'märz' : 3, 'mai' : 5, 'okt' : 10, 'dez' : 12,
+  'janv' : 1, 'févr' : 2, 'fév' : 2, 'mars' : 3, 'avr' : 4, 'juin' : 6, 'juil' : 7, 'juillet' : 7, 'août' : 8, 'déc' : 12,
+  'ene' : 1, 'abr' : 4, 'ago' : 8, 'dic' : 12,
+  'янв' : 1, 'фев' : 2, 'мар' : 3, 'апр' : 4, 'мая' : 5, 'май' : 5, 'июн' : 6, 'июл' : 7, 'авг' : 8, 'сен' : 9,
+  'окт' : 10, 'ноя' : 11, 'дек' : 12,
+}
+
+
+# Given : A column of month names or numbers (as strings)
+# Returns : The months as floats (NaN if unknown)
+def month_numbers(months):
+  months = months.str.lower().str.strip('.')
+  numbers = pd.to_numeric(months, errors = 'coerce')
+  named = months.map(MONTHS, na_action = 'ignore').astype('float64')
+  named = named.fillna(months.str[:3].map(MONTHS, na_action = 'ignore').astype('float64'))
+  return numbers.fillna(named)
+
+# Given : The distinct date strings of a column
+# Returns : A DataFrame indexed like them with date (datetime64, the first day of the month / quarter / year when
+#   the date isn't more precise than that; NaT if there's no date) and format (the name of the DATE_FORMATS entry that
+#   matched, 'upcoming' for 'Coming soon' and the like, NA if nothing did)
+# Each format is tried with one vectorized match over the strings no earlier format matched
+def parse_date_strings(dates):
+  dates = pd.Series(dates, dtype = 'string').str.strip()
+  result = pd.DataFrame({'date' : pd.Series(pd.NaT, index = dates.index, dtype = 'datetime64[ns]'),
+                         'format' : pd.Series(pd.NA, index = dates.index, dtype = 'string')})
+  left = dates.notna()
+  for name, pattern in DATE_FORMATS:
+    if not left.any():
+      break
+    parts = dates[left].str.extract('^(?:' + pattern + ')$')
+    if 'year_cjk' in parts:
+      parts['year'] = parts['year'].fillna(parts.pop('year_cjk'))
+      parts['month'] = parts['month'].fillna(parts.pop('month_cjk'))
+    year = pd.to_numeric(parts['year'], errors = 'coerce')
+    if 'quarter' in parts:
+      month = (pd.to_numeric(parts['quarter'], errors = 'coerce') - 1) * 3 + 1
+    elif 'month' in parts:
+      month = month_numbers(parts['month'])
+    else:
+      month = pd.Series(1.0, index = parts.index)
+    day = pd.to_numeric(parts['day'], errors = 'coerce') if 'day' in parts else pd.Series(1.0, index = parts.index)
+    date = pd.to_datetime(pd.DataFrame({'year' : year, 'month' : month, 'day' : day}).dropna(), errors = 'coerce')
+    date = date.dropna()
+    result.loc[date.index, 'date'] = date.astype('datetime64[ns]')
+    result.loc[date.index, 'format'] = name
+    left[date.index] = False
+  upcoming = left & dates.str.contains(UPCOMING_PATTERN, regex = True).fillna(False).astype(bool)
+  result.loc[upcoming[upcoming].index, 'format'] = 'upcoming'
+  return result
+
+
+# Turns release date columns into dates, keeping what every distinct string parsed to across calls, so a string seen in
+# an earlier chunk isn't parsed again. Also counts the rows of each format, and the strings that didn't parse
+class DateParser:
+  def __init__(self):
+    self.cache = {}
+    self.formats = collections.Counter()
+    self.unparsed = collections.Counter()
+    self.rows = 0
+
+  # Given : A column of date strings
+  # Returns : The dates as a datetime64 Series with the column's index (NaT where there's no date)
+  def __call__(self, values):
+    return self.parse(values)['date']
+
+  # Given : A column of date strings
+  # Returns : A DataFrame with the column's index and date and format (see parse_date_strings())
+  def parse(self, values):
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values.astype('string'), use_na_sentinel = True)
+    uniques = pd.Series(uniques, dtype = 'string')
+    new = uniques[~uniques.isin(list(self.cache))]
+    if len(new):
+      parsed = parse_date_strings(new)
+      self.cache.update(zip(new, zip(parsed['date'], parsed['format'])))
+    known = [self.cache[value] for value in uniques]
+    dates = pd.Series([date for date, name in known] + [pd.NaT], dtype = 'datetime64[ns]')
+    names = pd.Series([name for date, name in known] + [pd.NA], dtype = 'string')
+    result = pd.DataFrame({'date' : dates.take(codes).values, 'format' : names.take(codes).values}, index = values.index)
+    self.count(result['format'], values)
+    return result
+
+  def count(self, formats, values):
+    self.rows = self.rows + len(formats)
+    labels = formats.fillna('unparsed').mask(values.isna().values, 'missing')
+    self.formats.update(labels.value_counts().to_dict())
+    missed = values[formats.isna().values & values.notna().values]
+    self.unparsed.update(missed.astype(str).value_counts().to_dict())
+
+  # Returns : {'rows', 'parsed' (rows with a date), 'formats' : {format : rows} ('upcoming', 'unparsed' and 'missing'
+  #   included), 'unparsed' : [(string, rows), ...] the most common first}
+  def coverage(self, top = 20):
+    parsed = sum(rows for name, rows in self.formats.items() if name not in ('upcoming', 'unparsed', 'missing'))
+    return {'rows' : self.rows, 'parsed' : parsed, 'formats' : dict(self.formats.most_common()),
+            'unparsed' : self.unparsed.most_common(top)}
+
+  # Returns : A table of the rows per format, and the most common strings that didn't parse
+  def summary(self, top = 10):
+    coverage = self.coverage(top)
+    rate = coverage['parsed'] / self.rows * 100 if self.rows else 0
+    lines = [str(self.rows) + ' dates, ' + str(round(rate, 1)) + '% parsed (' + str(len(self.cache)) + ' distinct)']
+    for name, rows in coverage['formats'].items():
+      lines.append('  ' + name.ljust(18) + str(rows).rjust(9))
+    for value, rows in coverage['unparsed']:
+      lines.append('  unparsed : ' + repr(value) + ' x' + str(rows))
+    return '\n'.join(lines)
+
+# A list of cleaning steps, written down first and run later on a DataFrame or on each chunk of one.
+# Nothing gets copied step by step like the notebook does: columns are changed in place on the chunk, the dropped
+# columns and the rows filtered out are only collected, and the chunk is cut down once at the end
+class CleaningPlan:
+  def __init__(self):
+    self.steps = []
+
+  # Drops the columns (later steps don't see them, dropna() included)
+  def drop_columns(self, *columns):
+    self.steps.append(('drop', columns, None))
+    return self
+
+  # Replaces the column with function(column), function taking and returning a whole Series
+  def transform(self, column, function):
+    self.steps.append(('transform', column, function))
+    return self
+
+  # Keeps the rows with no missing value in the columns not dropped so far
+  def dropna(self):
+    self.steps.append(('dropna', None, None))
+    return self
+
+  # Keeps the rows where function(chunk) is True, function taking a DataFrame and returning a boolean Series
+  def keep_rows(self, function):
+    self.steps.append(('keep', None, function))
+    return self
+
+  # Adds (or replaces) the columns of function(chunk), function taking a DataFrame and returning a DataFrame with
+  # its index
+  def add_columns(self, function):
+    self.steps.append(('add', None, function))
+    return self
+
+  # Given : A DataFrame (it isn't changed)
+  # Returns : The cleaned DataFrame
+  def run(self, df):
+    return self.run_chunk(df.copy(deep = False))
+
+  # Given : A DataFrame the plan may change in place (e.g. a chunk just read)
+  # Returns : The cleaned DataFrame
+  def run_chunk(self, chunk):
+    columns = list(chunk.columns)
+    keep = pd.Series(True, index = chunk.index)
+    for kind, column, function in self.steps:
+      if kind == 'drop':
+        columns = [name for name in columns if name not in column]
+      elif kind == 'transform':
+        chunk[column] = function(chunk[column])
+      elif kind == 'add':
+        added = function(chunk)
+        for name in added.columns:
+          chunk[name] = added[name]
+        columns = columns + [name for name in added.columns if name not in columns]
+      elif kind == 'dropna':
+        keep = keep & chunk[columns].notna().all(axis = 1)
+      else:
+        keep = keep & function(chunk).fillna(False).astype(bool)
+    if keep.all():
+      return chunk[columns]
+    return chunk.loc[keep.values, columns]
+
+  # Given : An iterable of DataFrames (e.g. schema.read_stage_chunks())
+  # Yields : Each one cleaned, as it comes in
+  def stream(self, chunks):
+    for chunk in chunks:
+      yield self.run_chunk(chunk)
+
+
+# Given : A Series
+# Returns : It with the 'N/A' the scraper wrote for a missing value turned into NaN
+def na_to_nan(values):
+  return values.replace('N/A', np.nan)
+
+# Given : An Original Price column
+# Returns : The prices as floats, 0 for the free games, demos and anything that isn't a price
+def clean_price(prices):
+  return parse_prices(prices)['price'].fillna(0.0)
+
+# Given : A Memory or Storage column
+# Returns : The sizes in GB, NaN where there was no data
+def clean_size(sizes):
+  return parse_sizes(sizes)['gb']
+
+# Given : A cleaned chunk
+# Returns : True for the rows that have hardware data (the scraper wrote '1' for a Processor / Graphs it didn't find)
+def has_hardware(chunk):
+  return (chunk['Processor'].astype('string') != '1') & (chunk['Graphs'].astype('string') != '1')
+
+# Returns : The plan for the scraped steam data (the steps clean.py walks through)
+def steam_plan():
+  from hardware import hardware_columns # hardware.py is built on the parsers in here, so it can't be imported first
+  return (CleaningPlan()
+          .drop_columns('Best Rating', 'Worst Rating')
+          .transform('Original Price', clean_price)
+          .transform('All Time Reception', na_to_nan)
+          .dropna()
+          .transform('Release Date', DateParser())
+          .transform('Memory', clean_size)
+          .transform('Storage', clean_size)
+          .add_columns(hardware_columns)
+          .drop_columns('OS'))
+
+
+# Given : A stage's output to clean (see schema.read_stage_chunks()), the outputs to write as {path : None for every
+#   cleaned row, or a keep_rows function for some of them} (.csv, .jsonl or .parquet, see sinks.py), and the plan
+# Reads the input once, a chunk at a time, cleans each chunk and routes its rows to the outputs through a FanOutSink.
+# Outputs that already exist are replaced. A .parquet output is a folder of parts typed with schema.CLEAN_SCHEMA
+# Returns : {path : number of rows written}
+def clean_stage(in_path, outputs, plan = None, chunksize = 50000, schema = CLEAN_SCHEMA):
+  plan = steam_plan() if plan is None else plan
+  for path in outputs:
+    if os.path.isdir(path):
+      shutil.rmtree(path)
+    elif os.path.exists(path):
+      os.remove(path)
+  sink = None
+  try:
+    for cleaned in plan.stream(read_stage_chunks(in_path, chunksize)):
+      if sink is None: # The columns are only known once the first chunk is cleaned
+        columns = list(cleaned.columns)
+        sink = FanOutSink([(open_sink(path, columns, schema = schema), keep) for path, keep in outputs.items()])
+      sink.write_frame(cleaned)
+  finally:
+    if sink is not None:
+      sink.close()
+  if sink is None:
+    return dict.fromkeys(outputs, 0)
+  return {path : route[0].rows_written for path, route in zip(outputs, sink.routes)}
@@ -0,0 +1,116 @@
+# Persistent work queue for the crawl, so that a crash (or a Ctrl-C) at URL 3,900 doesn't lose the whole run.
+#
+# Every url gets a row in a SQLite table with its status:
+#   'pending' : not scraped yet (or scraped, but the row wasn't flushed to disk before the run stopped)
+#   'done'    : its row is in the output file
+#   'failed'  : scraping it raised, the exception class and message are kept so we know why
+# A new run only goes through the urls that aren't done (failed ones too, with retry_failed = True).
+# An app is in the queue once, under the first url it was added with: the same app under another url (another slug,
+# no slug, tracking parameters... see links.normalize_url()) isn't added again, and the status of any of its urls is
+# the app's.
+#
+# Usage:
+#   queue = CrawlQueue('crawl_state.sqlite')
+#   queue.add(url_set)
+#   for url in queue.unfinished(): ...
+#   queue.mark_done([url, ...]) / queue.mark_failed(url, exception)
+#   queue.counts()  -> {'pending' : ..., 'done' : ..., 'failed' : ...}
+
+import sqlite3
+import time
+
+from links import normalize_url
+
+# The queue's row for a url: its app's (parameters : app_id, url). A url that isn't an app's only matches itself
+SAME_APP = '(app_id = ? OR (app_id IS NULL AND url = ?))'
+
+
+# Given : A url
+# Returns : The app_id it links to (see links.normalize_url()), None if it's not a link to an app
+def app_id_of(url):
+  normalized = normalize_url(url)
+  return normalized[0] if normalized else None
+
+
+class CrawlQueue:
+  def __init__(self, path = 'crawl_state.sqlite'):
+    self.path = path
+    self.db = sqlite3.connect(path)
+    self.db.execute('''CREATE TABLE IF NOT EXISTS urls (
+                         url TEXT PRIMARY KEY, app_id TEXT, status TEXT NOT NULL DEFAULT 'pending',
+                         error_class TEXT, error_message TEXT, attempts INTEGER NOT NULL DEFAULT 0, updated_at REAL)''')
+    self.db.execute('CREATE INDEX IF NOT EXISTS urls_status ON urls (status)')
+    self.db.execute('CREATE INDEX IF NOT EXISTS urls_app_id ON urls (app_id)')
+    self.db.commit()
+
+  def close(self):
+    self.db.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  # Given : An iterable of urls, adds the ones whose app the queue hasn't seen yet as pending
+  # Returns : How many were new
+  def add(self, urls):
+    before = self.db.total_changes
+    now = time.time()
+    rows = []
+    for url in urls:
+      url = url.strip()
+      if not url:
+        continue
+      app_id = app_id_of(url) # None for a url that isn't an app's, the crawl will fail it with the real reason
+      rows.append((url, app_id, now, app_id, app_id))
+    self.db.executemany('''INSERT OR IGNORE INTO urls (url, app_id, updated_at) SELECT ?, ?, ?
+                           WHERE ? IS NULL OR NOT EXISTS (SELECT 1 FROM urls WHERE app_id = ?)''', rows)
+    self.db.commit()
+    return self.db.total_changes - before
+
+  # Returns : The urls still to scrape (pending, plus the failed ones if retry_failed)
+  def unfinished(self, retry_failed = False):
+    if retry_failed:
+      query = "SELECT url FROM urls WHERE status IN ('pending', 'failed') ORDER BY rowid"
+    else:
+      query = "SELECT url FROM urls WHERE status = 'pending' ORDER BY rowid"
+    return [row[0] for row in self.db.execute(query)]
+
+  # Given : A url (any of its app's urls)
+  # Returns : Its status ('pending', 'done' or 'failed'), None if it isn't in the queue
+  def status(self, url):
+    row = self.db.execute('SELECT status FROM urls WHERE ' + SAME_APP, (app_id_of(url), url)).fetchone()
+    return row[0] if row else None
+
+  # Given : A list of urls whose rows are now safely in the output file
+  def mark_done(self, urls):
+    now = time.time()
+    self.db.executemany('''UPDATE urls SET status = 'done', error_class = NULL, error_message = NULL,
+                           attempts = attempts + 1, updated_at = ? WHERE ''' + SAME_APP,
+                        [(now, app_id_of(url), url) for url in urls])
+    self.db.commit()
+
+  # Given : A url and the exception it failed with
+  def mark_failed(self, url, error):
+    self.db.execute('''UPDATE urls SET status = 'failed', error_class = ?, error_message = ?,
+                       attempts = attempts + 1, updated_at = ? WHERE ''' + SAME_APP,
+                    (type(error).__name__, str(error)[:500], time.time(), app_id_of(url), url))
+    self.db.commit()
+
+  # Returns : Number of urls in each status
+  def counts(self):
+    counts = {'pending' : 0, 'done' : 0, 'failed' : 0}
+    for status, count in self.db.execute('SELECT status, COUNT(*) FROM urls GROUP BY status'):
+      counts[status] = count
+    return counts
+
+  # Returns : Number of failed urls per exception class, most common first
+  def error_counts(self):
+    return self.db.execute('''SELECT error_class, COUNT(*) FROM urls WHERE status = 'failed'
+                              GROUP BY error_class ORDER BY COUNT(*) DESC''').fetchall()
+
+  # Returns : (url, error class, error message, attempts) of every failed url
+  def failures(self):
+    return self.db.execute('''SELECT url, error_class, error_message, attempts FROM urls
+                              WHERE status = 'failed' ORDER BY rowid''').fetchall()
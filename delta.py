@@ -0,0 +1,192 @@
+# Delta crawl: refresh an existing dataset by only re-scraping (and re-writing) the apps whose store data changed.
+#
+# Every app gets a fingerprint in a SQLite file: the ETag / Last-Modified of its page, and a hash of its extracted
+# fields. On the next run each page is asked for with If-None-Match / If-Modified-Since, and:
+#   'not-modified' : the store answered 304, nothing was downloaded or parsed
+#   'unchanged'    : the page was downloaded, but the extracted fields hash the same as last time (the store page has
+#                    ads, timestamps etc. that change while price, rating and review count don't)
+#   'changed'      : the fields differ, the row is merged into the dataset
+#   'new'          : the app had no fingerprint yet, the row is merged into the dataset
+# Only 'changed' and 'new' rows are scraped again, replacing the dataset's row with the same app_id (the dataset file
+# itself is rewritten once per run, see merge_rows()).
+# Fingerprints are only saved once the merged dataset is on disk, so a run that stops halfway is simply redone.
+#
+# Usage:
+#   fingerprints = FingerprintStore('fingerprints.sqlite')
+#   counts = refresh(url_set, 'steam_hardware_data.csv', fingerprints, concurrency = 16, per_host_rate = 10)
+
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+from extract import extract_page, extract_app_id, HW_COLUMNS
+from fetch import DEFAULT_HEADERS, DEFAULT_COOKIES, fetch_page, with_retries, open_session, run_workers
+from schema import RAW_SCHEMA, read_stage, write_stage
+from throttle import AdaptiveLimit, HostRateLimiter, RetryPolicy
+
+DELTA_STATUSES = ('not-modified', 'unchanged', 'changed', 'new')
+
+
+# Given : A spec_list
+# Returns : A hash of its fields (sha1 hex), the same for the same values whatever their order of extraction
+def fingerprint(spec_list):
+  return hashlib.sha1(json.dumps([str(value) for value in spec_list], ensure_ascii = False).encode('utf-8')).hexdigest()
+
+
+# What we knew about every app the last time it was checked
+class FingerprintStore:
+  def __init__(self, path = 'fingerprints.sqlite'):
+    self.path = path
+    self.db = sqlite3.connect(path)
+    self.db.execute('''CREATE TABLE IF NOT EXISTS fingerprints (
+                         app_id TEXT PRIMARY KEY, url TEXT, fingerprint TEXT, etag TEXT, last_modified TEXT,
+                         changed_at REAL, checked_at REAL)''')
+    self.db.commit()
+
+  def close(self):
+    self.db.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  # Given : An app_id
+  # Returns : (fingerprint, etag, last_modified), or None if the app was never fingerprinted
+  def get(self, app_id):
+    return self.db.execute('SELECT fingerprint, etag, last_modified FROM fingerprints WHERE app_id = ?', (app_id,)).fetchone()
+
+  # Given : A list of (app_id, url, fingerprint, etag, last_modified) for apps whose rows changed, saves them
+  def save_changed(self, rows):
+    now = time.time()
+    self.db.executemany('''INSERT OR REPLACE INTO fingerprints (app_id, url, fingerprint, etag, last_modified, changed_at, checked_at)
+                           VALUES (?, ?, ?, ?, ?, ?, ?)''', [row + (now, now) for row in rows])
+    self.db.commit()
+
+  # Given : A list of (app_id, etag, last_modified) for apps that were checked and hadn't changed
+  def save_checked(self, rows):
+    now = time.time()
+    self.db.executemany('''UPDATE fingerprints SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified),
+                           checked_at = ? WHERE app_id = ?''', [(etag, last_modified, now, app_id) for app_id, etag, last_modified in rows])
+    self.db.commit()
+
+  def __len__(self):
+    return self.db.execute('SELECT COUNT(*) FROM fingerprints').fetchone()[0]
+
+
+# Given : The (fingerprint, etag, last_modified) of an app (or None)
+# Returns : The headers asking the store to only send the page if it changed
+def delta_headers(known):
+  headers = {}
+  if known is not None:
+    if known[1]:
+      headers['If-None-Match'] = known[1]
+    if known[2]:
+      headers['If-Modified-Since'] = known[2]
+  return headers
+
+
+# Given : An iterable of steam urls and a FingerprintStore (plus the same throttling options as fetch.crawl())
+# Yields : (url, (status, spec_list, fingerprint, etag, last_modified), error) for every url, in the order they finish.
+#   status is one of DELTA_STATUSES, spec_list is None for 'not-modified'
+async def delta_crawl(urls, fingerprints, concurrency = 16, per_host_rate = None, parse = extract_page, parse_executor = None,
+                      headers = DEFAULT_HEADERS, cookies = DEFAULT_COOKIES, partial = False, retry = RetryPolicy(),
+                      timeout = 30, adaptive = True):
+  loop = asyncio.get_running_loop()
+  limiter = HostRateLimiter(per_host_rate)
+  gate = AdaptiveLimit(concurrency) if adaptive else None
+
+  async def request(session, url, request_headers):
+    await limiter.wait(urlsplit(url).hostname)
+    return await fetch_page(session, url, partial, request_headers)
+
+  async def check_one(session, url):
+    known = fingerprints.get(extract_app_id(url))
+    fetched = await with_retries(lambda: request(session, url, delta_headers(known)), url, limiter, retry, gate)
+    if fetched.status == 304:
+      return 'not-modified', None, None, fetched.etag, fetched.last_modified
+    spec_list = await loop.run_in_executor(parse_executor, parse, fetched.page, url)
+    new_fingerprint = fingerprint(spec_list)
+    if known is None:
+      status = 'new'
+    elif known[0] == new_fingerprint:
+      status = 'unchanged'
+    else:
+      status = 'changed'
+    return status, spec_list, new_fingerprint, fetched.etag, fetched.last_modified
+
+  async with open_session(concurrency, timeout, headers, cookies) as session:
+    async for item in run_workers(urls, lambda url: check_one(session, url), concurrency):
+      yield item
+
+
+# Given : The path of a dataset (.csv or .parquet, a file or a folder of parts) and a list of spec_lists
+# Writes the dataset back with those rows in place of the rows with the same app_id (added at the end if new).
+# The new file is written next to the old one and moved over it, so a crash never leaves a half-written dataset
+# The whole dataset is read and written again, however few rows changed: a refresh costs one pass over the catalog's
+# rows on disk (a few seconds for the whole store), on top of the requests it saved. That's what keeps every reader of
+# the dataset (read_stage(), clean.py) free of merging rows itself
+def merge_rows(path, rows):
+  changed_df = pd.DataFrame(rows, columns = HW_COLUMNS)
+  if os.path.exists(path):
+    old_df = read_stage(path)
+    old_df = old_df[~old_df['app_id'].astype(str).isin(changed_df['app_id'].astype(str))]
+    merged_df = pd.concat([old_df, changed_df], ignore_index = True)
+  else:
+    merged_df = changed_df
+
+  temp_path = path + '.tmp'
+  if path.endswith('.parquet'):
+    write_stage(merged_df, temp_path, RAW_SCHEMA)
+    if os.path.isdir(path): # A folder of parts (sinks.ParquetSink) becomes a folder with a single part
+      shutil.rmtree(path)
+      os.makedirs(path)
+      os.replace(temp_path, os.path.join(path, 'part-00000.parquet'))
+      return len(merged_df)
+  else:
+    merged_df.to_csv(temp_path)
+  os.replace(temp_path, path)
+  return len(merged_df)
+
+
+# Given : An iterable of steam urls, the path of the dataset to keep up to date, and a FingerprintStore
+#   (plus any of delta_crawl()'s keyword arguments)
+# Checks every url, merges the changed and new rows into the dataset, then saves the fingerprints
+# Returns : The number of urls in each of DELTA_STATUSES, plus 'failed'
+async def refresh_async(urls, out, fingerprints, **crawl_options):
+  counts = dict.fromkeys(DELTA_STATUSES + ('failed',), 0)
+  changed = []
+  checked = []
+  start = time.perf_counter()
+  async for url, result, error in delta_crawl(urls, fingerprints, **crawl_options):
+    if error is not None:
+      print("ERROR FOR URL : " + str(url) + " (" + type(error).__name__ + ")")
+      counts['failed'] = counts['failed'] + 1
+      continue
+    status, spec_list, new_fingerprint, etag, last_modified = result
+    counts[status] = counts[status] + 1
+    if status in ('changed', 'new'):
+      changed.append((url, spec_list, new_fingerprint, etag, last_modified))
+    else:
+      checked.append((extract_app_id(url), etag, last_modified))
+
+  if changed:
+    merge_rows(out, [spec_list for url, spec_list, new_fingerprint, etag, last_modified in changed])
+  fingerprints.save_changed([(extract_app_id(url), url, new_fingerprint, etag, last_modified) for url, spec_list, new_fingerprint, etag, last_modified in changed])
+  fingerprints.save_checked(checked)
+  print("Checked " + str(sum(counts.values())) + " apps in " + str(round(time.perf_counter() - start, 1)) + "s, "
+        + str(counts['changed'] + counts['new']) + " rows merged into " + out)
+  return counts
+
+
+# Same as refresh_async(), for use outside of a running event loop
+def refresh(urls, out, fingerprints, **options):
+  return asyncio.run(refresh_async(urls, out, fingerprints, **options))
@@ -0,0 +1,140 @@
+# Catalog discovery: find the apps to scrape ourselves, instead of starting from a link list made by another bot.
+#
+# Two sources:
+#   'search'  : pages through the store's search results (/search/results/?start=...&count=100&json=1). The first
+#               page says how many results there are, the rest of the pages are then fetched concurrently
+#   'applist' : the Web API's full app list (ISteamApps/GetAppList), every app_id in one answer. It has everything
+#               (DLC, tools, soundtracks...) where search only lists what the store shows
+# Discovered apps are normalized and deduped on app_id like the link lists (see links.py).
+#
+# discover_and_scrape() streams the discovered urls straight into the crawl queue and the scraper, so the first pages
+# are being scraped while discovery is still paging through the listing.
+#
+# Usage:
+#   queue = CrawlQueue('crawl_state.sqlite')
+#   counts = discover_and_scrape(queue, 'steam_hardware_data.csv', discovery = {'source' : 'search'}, concurrency = 16)
+
+import asyncio
+import re
+
+from fetch import get_json, open_session, run_workers, scrape_resumable_async, with_retries
+from links import AppIdBitmap, normalize_url
+from throttle import AdaptiveLimit, HostRateLimiter, RetryPolicy
+
+STORE_URL = 'https://store.steampowered.com'
+APPLIST_URL = 'https://api.steampowered.com/ISteamApps/GetAppList/v2/'
+DISCOVERY_SOURCES = ('search', 'applist')
+
+# The store gives at most 100 results per search page
+SEARCH_PAGE_SIZE = 100
+
+# Links to app pages in the search results' HTML
+APP_LINK = re.compile(r'href="([^"]*/app/\d+[^"]*)"')
+
+
+# Given : An open aiohttp session, the store's base url, the index of the first result, and the throttling in use
+# Returns : (total number of results, list of app links on that page)
+async def fetch_search_page(session, base_url, start, page_size, search_params, limiter, retry, gate):
+  url = base_url + '/search/results/'
+  params = dict(search_params or {}, start = str(start), count = str(page_size), infinite = '1', json = '1')
+  answer = await with_retries(lambda: get_json(session, url, params, limiter), url, limiter, retry, gate)
+  return int(answer.get('total_count', 0)), APP_LINK.findall(answer.get('results_html', ''))
+
+# Given : An open aiohttp session and the throttling in use (see discover())
+# Yields : The app links of every search page, the first page first, then the others as they come in
+async def search_links(session, base_url, page_size, max_pages, search_params, limiter, retry, gate, concurrency, stats):
+  total, first_links = await fetch_search_page(session, base_url, 0, page_size, search_params, limiter, retry, gate)
+  stats['pages'] = 1
+  stats['total'] = total
+  for link in first_links:
+    yield link
+  starts = range(page_size, total, page_size)
+  if max_pages is not None:
+    starts = starts[:max(0, max_pages - 1)]
+  fetch = lambda start: fetch_search_page(session, base_url, start, page_size, search_params, limiter, retry, gate)
+  async for start, result, error in run_workers(starts, fetch, concurrency):
+    if error is not None:
+      print("ERROR FOR SEARCH PAGE : " + str(start) + " (" + type(error).__name__ + ")")
+      stats['failed_pages'] = stats.get('failed_pages', 0) + 1
+      continue
+    stats['pages'] = stats['pages'] + 1
+    for link in result[1]:
+      yield link
+
+# Given : An open aiohttp session, the app list's url and the throttling in use
+# Yields : An app link for every app in the list
+async def applist_links(session, applist_url, limiter, retry, gate, stats):
+  answer = await with_retries(lambda: get_json(session, applist_url, None, limiter), applist_url, limiter, retry, gate)
+  apps = answer.get('applist', {}).get('apps', [])
+  stats['pages'] = 1
+  stats['total'] = len(apps)
+  for app in apps:
+    yield '/app/' + str(app['appid'])
+
+
+# Given : Where to discover apps from (one of DISCOVERY_SOURCES), and how to throttle the listing requests
+# Yields : The canonical store url of every app found (each app once), as soon as its listing page comes in
+#
+# base_url      : The store (app urls are made on it too, so a stand-in store gives stand-in urls)
+# page_size     : Results per search page
+# max_pages     : Stop after this many search pages (None for all of them)
+# search_params : Extra search filters, e.g. {'category1' : '998'} for games only
+# stats         : A dict that gets 'pages', 'total' (results the listing announced), 'found' and 'duplicates'
+async def discover(source = 'search', base_url = STORE_URL, applist_url = APPLIST_URL, concurrency = 4, per_host_rate = 2,
+                   page_size = SEARCH_PAGE_SIZE, max_pages = None, search_params = None, retry = RetryPolicy(),
+                   timeout = 30, adaptive = True, stats = None):
+  if source not in DISCOVERY_SOURCES:
+    raise ValueError('source must be one of ' + ', '.join(DISCOVERY_SOURCES))
+  stats = {} if stats is None else stats
+  stats.update(found = 0, duplicates = 0)
+  limiter = HostRateLimiter(per_host_rate)
+  gate = AdaptiveLimit(concurrency) if adaptive else None
+  seen = AppIdBitmap() # Search results shift while we page through them, so the same app can show up twice
+
+  async with open_session(concurrency, timeout) as session:
+    if source == 'search':
+      links = search_links(session, base_url, page_size, max_pages, search_params, limiter, retry, gate, concurrency, stats)
+    else:
+      links = applist_links(session, applist_url, limiter, retry, gate, stats)
+    async for link in links:
+      normalized = normalize_url(link, base_url + '/app/')
+      if normalized is None:
+        continue
+      app_id, url = normalized
+      if seen.add(app_id):
+        stats['found'] = stats['found'] + 1
+        yield url
+      else:
+        stats['duplicates'] = stats['duplicates'] + 1
+
+
+# Given : An async iterable of discovered urls and a CrawlQueue
+# Yields : The urls that still need scraping: each discovered url is added to the queue, and passed on unless the
+#   queue already has it done (or failed, unless retry_failed). Once discovery is over, the urls left unfinished by
+#   an earlier run that discovery didn't come across again are passed on too
+async def feed_queue(discovered, queue, retry_failed = False):
+  wanted = ('pending', 'failed') if retry_failed else ('pending',)
+  passed_on = AppIdBitmap()
+  async for url in discovered:
+    queue.add([url])
+    if queue.status(url) in wanted:
+      passed_on.add(normalize_url(url)[0])
+      yield url
+  for url in queue.unfinished(retry_failed):
+    normalized = normalize_url(url)
+    if normalized is None or normalized[0] not in passed_on:
+      yield url
+
+
+# Given : A CrawlQueue, where to write the rows (see fetch.scrape_resumable()), the keyword arguments of discover(),
+#   plus any of fetch.crawl()'s keyword arguments for the scraping
+# Discovers apps and scrapes them at the same time, the scraper picking up urls as discovery finds them
+# Returns : The queue's counts once the run is over
+async def discover_and_scrape_async(queue, out, discovery = None, retry_failed = False, flush_every = 50, **crawl_options):
+  discovered = discover(**(discovery or {}))
+  return await scrape_resumable_async(queue, out, flush_every = flush_every, retry_failed = retry_failed,
+                                      urls = feed_queue(discovered, queue, retry_failed), **crawl_options)
+
+# Same as discover_and_scrape_async(), for use outside of a running event loop
+def discover_and_scrape(queue, out, **options):
+  return asyncio.run(discover_and_scrape_async(queue, out, **options))
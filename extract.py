@@ -0,0 +1,487 @@
+# Extraction helpers for a single Steam store page.
+#
+# These used to live inside scrape.py, but since that notebook runs the whole crawl from top to bottom
+# they're kept here so they can be imported by the fetch engine (and anything else) without starting a crawl.
+
+from parsers import make_soup, to_css_selector, SelectolaxTag
+
+# Column names of the dataframe built from a list of spec_lists, in spec_list order
+HW_COLUMNS = ["Title", "Graphs", "Memory", "OS", "Processor", "Storage","app_id", "Original Price", "Developer","Publisher","Genre",\
+              "Release Date", "User Tags", "All Time Reception", "Total Count of Reviews", "Rating", "Best Rating", "Worst Rating"]
+
+# Given a <div> tag containing the ORIGINAL price, will extract the numerical value from the div tag
+# Input Form : <div class="discount_original_price">$39.99</div> | Output: 39.99
+def extract_price(steam_page_price_div, steamed_soup):
+  price = -1; # -1 comes up if no price was found
+
+  # If the div-tage is empty...
+  if steam_page_price_div == None:
+    # ...the price is likely contained in another tag. Look for it and extract the price...
+    steam_page_price_div = steamed_soup.find("div", {"class": "discount_original_price"})
+
+  # Making the assumption that div tag has only one item
+  for item in steam_page_price_div:
+    # print(item)
+    price = item.strip()
+
+  return price
+
+# Given a Steam URL (for example, https://store.steampowered.com/app/1092790/Inscryption/)
+#   will extract the corresponding app_ID
+def extract_app_id(steam_url):
+  # Split by '/'
+  # https://store.steampowered.com/app/1092790/Inscryption/) <- App ID will be 5th element
+
+  forward_slash = steam_url.split('/')
+  return forward_slash[4]
+
+# Given bs4 object of a steam page
+#   Returns developer, publisher, genre as string
+def extract_info(steamed_soup):
+  everything = steamed_soup.find(id = 'genresAndManufacturer')
+
+  #Now here, I realized I could extract genre, Developer, Publisher/
+
+  # Developer
+  developer_name = ''
+  dev = everything.find('div', {'class' : 'dev_row'}).find('a')
+  for developer in dev: # Again, assuming there's only one developer 
+    developer_name = str(developer) # A plain str, a bs4 string drags the whole parse tree along when pickled
+
+  # Publisher
+  # Get the list of div-tags of type 'dev_row'. 2nd one in list is publisher
+  publisher = everything.find_all('div', {'class' : 'dev_row'})
+
+  publisher_name = '' # Placeholder for publisher name
+  i = 0 # When i = 1, that's our location of the publisher
+  for item in publisher:
+    if i == 1: # Publisher name is the <a> tag in the second 'dev_row' <div> tag
+      for a_tag_value in item.find('a'): # Get the publisher a-tag
+        publisher_name = str(a_tag_value) #Since each a-tag has only one list of publishers
+    i = i + 1 # Increment if i = 0
+  
+  # Genre
+  b_tags = steamed_soup.find('span', {'data-panel' : '{"flow-children":"row"}'}).find('a')
+  genre = b_tags.text
+  # print("~~~~~~~~~~~~~~~~ NEXT GAME~~~~~~~~~~~~~~~~~~")
+  return [developer_name,publisher_name,genre]
+
+
+  # Given a bs4 object a Steam Page, gets the release date
+def extract_date(steamed_soup):
+  date = steamed_soup.find('div' , {'class' : 'date'})
+  release_date = date.text
+  return release_date
+
+# Given a bs4 object of a steam page, gets the tags from'Popular user-defined tags for this product:' 
+def extract_user_tags(steamed_soup):
+  tag_list = ['']
+
+  # Get list of tags
+  tags = steamed_soup.find_all('a', {'class' : 'app_tag'})
+  tag_list = [''] * len(tags)  # Make an array for the tags
+  i = 0 # indexing for the array
+  for tag in tags:
+      tag_list[i] = tag.text.strip()
+      # print(tag.text.strip())
+      i = i + 1
+
+  # print("~~~~~~~~~~~~~~~~ NEXT GAME~~~~~~~~~~~~~~~~~~")
+  return tag_list
+
+def extract_all_review_summary(steamed_soup):
+  # Not all pages have this rating. Return 'N/A' if so
+  e_a_r_s = steamed_soup.find('span', {'class' : 'game_review_summary positive'})
+  if e_a_r_s is None:
+    return 'N/A'
+  return e_a_r_s.text
+
+ # Given a bs4 object of a Steam Page, gets the TOTAL review count (not recent)
+def extract_review_count(steamed_soup):
+  rev_count_tag = steamed_soup.find('meta', attrs={'itemprop': 'reviewCount'})
+  return rev_count_tag['content']
+
+ # Given a bs4 object of a Steam Page, gets the current rating of the title
+def extract_current_rating(steamed_soup):
+  curr_rating = steamed_soup.find('meta', attrs={'itemprop': 'ratingValue'})
+  return curr_rating['content']
+
+ # Given a bs4 object of a Steam Page, gets the best rating recieved
+def extract_best_rating(steamed_soup):
+  best_rating = steamed_soup.find('meta', attrs={'itemprop': 'bestRating'})
+  return best_rating['content']
+
+ # Given a bs4 object of a Steam Page, gets the worst rating recieved
+def extract_worst_rating(steamed_soup):
+  worst_rating = steamed_soup.find('meta', attrs={'itemprop': 'worstRating'})
+  return worst_rating['content']
+
+
+ # Given a bs4 object of a Steam Page, gets the game title
+def extract_steam_title(steamed_soup):
+  game_name = steamed_soup.find('div', {'id': 'appHubAppName'})
+  title = game_name.get_text()
+  return title
+
+# Given: The li-tags of the minimum system requirements block, and the spec_list of the page
+# Fills in the Graphics, Memory, OS, Processor and Storage entries of spec_list (entries not found are left as they are)
+def extract_requirements(ul_minimum, spec_list):
+  for li in ul_minimum:
+    requirement_pair = li.get_text().split(":")
+    if 'OS' in requirement_pair:
+      spec_list[3] = requirement_pair[1]
+    if 'Processor' in requirement_pair:
+      spec_list[4] = requirement_pair[1]
+    if 'Memory' in requirement_pair:
+      spec_list[2] = requirement_pair[1]
+    if 'Graphics' in requirement_pair:
+      spec_list[1] = requirement_pair[1]
+    if 'Storage' in requirement_pair:
+      spec_list[5] = requirement_pair[1]
+
+# Given: A bs4 object of ONE steam page, and the url (as string) it was downloaded from
+# Returns: A LIST consisting of the steam game info, for use with dataframe
+# This is the original extraction, where each extract_* helper searches the page from the top on its own.
+#   extract_fields() below gives the same list with a single walk over the page, this one is kept to compare against
+def extract_fields_by_helpers(steamed_soup, steam_url):
+    # Store specifications in a list
+    # For now we have an array of length 6. Adjust this size later when we add more parameters
+    spec_list = [1] * ( 18 ) # 6 original arguments, and the 12 extra for the app_ID, original price, etc
+
+    # Get the div tag that stores the minimum requirements
+    # ul_minimum = steamed_soup.find('div', {'class': 'game_area_sys_req_leftCol'}).find_all('li')
+    sys_req = steamed_soup.find('div', {'class': 'game_area_sys_req_leftCol'})
+    if sys_req is not None: # Leave the placeholders if nothing found
+      extract_requirements(sys_req.find_all('li'), spec_list)
+
+    # Get the title of the Steam Page
+    title = extract_steam_title(steamed_soup)
+
+    # Get the div tag that stores the original price of the game
+    # class="discount_original_price"
+    div_original_price = steamed_soup.find("div", {"class": "game_purchase_price price"})
+
+    # Not all steam pages will have the div-tag of class 'game_purchase_price price'
+    # In such a case, we fall back on finding other possible tags in the steamed_soup
+    # Pass a reference to steamed_soup to this function so that we may look for other tags, if needed.
+    price = extract_price(div_original_price, steamed_soup)
+
+    # App_ID is -1 if none found. Otherwise, we extract it here
+    app_ID = extract_app_id(steam_url)
+
+    # Developer, Publisher, Genre
+    developer,publisher,genre = extract_info(steamed_soup)
+
+    # Release Date
+    release_date = extract_date(steamed_soup)
+
+    # User Tags
+    user_tags = extract_user_tags(steamed_soup)
+
+    # All-Time Review Rating (as string)
+    all_time_reception = extract_all_review_summary(steamed_soup)
+
+    # 'Microdata' (Review Count, Current Rating Value, Best Rating, Worst Rating)
+    all_review_count = extract_review_count(steamed_soup)
+
+    # Current Rating Value
+    current_Rating = extract_current_rating(steamed_soup)
+
+    # Best Rating recieved
+    best_rating = extract_best_rating(steamed_soup)
+
+    # Worst Rating recieved
+    worst_rating = extract_worst_rating(steamed_soup)
+
+    #________________ Store the scraped info _____________
+
+    # Store the title
+    spec_list[0] = title
+
+    # Store the app_id
+    spec_list[6] = str(app_ID) # Add the app_ID as string to avoid any Int-String type mismatch issues
+
+    # store price
+    spec_list[7] = price
+
+    # Store developer
+    spec_list[8] = developer
+
+    # Store Publisher
+    spec_list[9] = publisher
+
+    # Store Genre
+    spec_list[10] = genre
+
+    # Store release date
+    spec_list[11] = release_date
+
+    # User tags
+    spec_list [12] = user_tags
+
+    # Store All Time Reception (Mostly Positive, Mixed, etc)
+    spec_list[13] = all_time_reception
+
+    # Store 'ALL Review Count'
+    spec_list[14] = all_review_count
+
+    # Rating 
+    spec_list[15] = current_Rating
+
+    # Best Rating Recieved
+    spec_list[16] = best_rating
+
+    # Worst Rating Recieved
+    spec_list[17] = worst_rating
+
+    return spec_list
+
+
+# bs4 matches {'class' : 'a b'} against the whole class attribute, and {'class' : 'a'} against any single class.
+# Given : A bs4 tag and a class string, returns True if steamed_soup.find(..., {'class' : css_class}) would match the tag
+def has_class(tag, css_class):
+  classes = tag.get('class')
+  if not classes:
+    return False
+  return css_class in classes or ' '.join(classes) == css_class
+
+# Where each field's block is on a store page: field -> (tag name, or None for any tag; attribute; value).
+# The attribute is matched like a bs4 find() would ('class' against any single class, or the whole class list).
+# When Steam changes its markup, this table (or a SelectorTable built from another one) is what needs changing
+PAGE_SELECTORS = {
+  'title'          : ('div', 'id', 'appHubAppName'),
+  'price'          : ('div', 'class', 'game_purchase_price price'),
+  'original_price' : ('div', 'class', 'discount_original_price'),
+  'date'           : ('div', 'class', 'date'),
+  'sys_req'        : ('div', 'class', 'game_area_sys_req_leftCol'),
+  'app_tags'       : ('a', 'class', 'app_tag'),
+  'genre'          : ('span', 'data-panel', '{"flow-children":"row"}'),
+  'review_summary' : ('span', 'class', 'game_review_summary positive'),
+  'info'           : (None, 'id', 'genresAndManufacturer'),
+}
+
+# Fields that keep every matching tag (in page order) instead of the first one
+PAGE_MULTI_FIELDS = ('app_tags',)
+
+# Columns read straight from the page's <meta itemprop="..." content="..."> microdata: column -> itemprop
+MICRODATA_COLUMNS = {"Total Count of Reviews" : 'reviewCount', "Rating" : 'ratingValue',
+                     "Best Rating" : 'bestRating', "Worst Rating" : 'worstRating'}
+
+
+# A field -> selector table, compiled once into what select_fields() needs:
+#   by_name : tag name -> the (field, attribute, value) that tag could match (plus the any-tag ones), so each tag of
+#             the page is only checked against the selectors for its name
+#   css     : field -> CSS selector, for trees that can run CSS natively (selectolax)
+class SelectorTable:
+  def __init__(self, selectors, multi_fields = ()):
+    self.selectors = dict(selectors)
+    self.multi_fields = frozenset(multi_fields)
+    self.any_name = [(field, attribute, value) for field, (name, attribute, value) in self.selectors.items() if name is None]
+    self.by_name = {}
+    for field, (name, attribute, value) in self.selectors.items():
+      if name is not None:
+        self.by_name.setdefault(name, []).append((field, attribute, value))
+    for name in self.by_name:
+      self.by_name[name] = self.by_name[name] + self.any_name
+    self.css = {field : to_css_selector(name, {attribute : value}) for field, (name, attribute, value) in self.selectors.items()}
+
+PAGE_TABLE = SelectorTable(PAGE_SELECTORS, PAGE_MULTI_FIELDS)
+
+# Given : A bs4 tag, an attribute and a value, returns True if the tag has it (classes matched like bs4 does)
+def tag_matches(tag, attribute, value):
+  if attribute == 'class':
+    return has_class(tag, value)
+  return tag.get(attribute) == value
+
+# Given: A bs4 object of ONE steam page (or a parsers.SelectolaxTag) and a SelectorTable
+# Returns: (found, metas) where found maps each field to its first matching tag (a list of every match for the
+#   multi fields, fields with no match are left out) and metas maps every itemprop to the content of its first
+#   <meta itemprop=...> tag
+# A selectolax tree runs each selector as CSS, in C. Anything else is walked only ONCE: every tag is looked
+#   at a single time, against the selectors for its tag name only
+def select_fields(steamed_soup, table = PAGE_TABLE):
+  found = {}
+  metas = {}
+  if isinstance(steamed_soup, SelectolaxTag):
+    for field, selector in table.css.items():
+      if field in table.multi_fields:
+        found[field] = steamed_soup.css(selector)
+      else:
+        match = steamed_soup.css_first(selector)
+        if match is not None:
+          found[field] = match
+    for meta in steamed_soup.css('meta[itemprop]'):
+      metas.setdefault(meta.get('itemprop'), meta.get('content'))
+    return found, metas
+
+  for field in table.multi_fields:
+    found[field] = []
+  by_name = table.by_name
+  any_name = table.any_name
+  multi_fields = table.multi_fields
+  for tag in steamed_soup.descendants:
+    name = tag.name
+    if name is None: # Text, comments, etc.
+      continue
+    if name == 'meta':
+      itemprop = tag.get('itemprop')
+      if itemprop is not None and itemprop not in metas:
+        metas[itemprop] = tag.get('content')
+    for field, attribute, value in by_name.get(name, any_name):
+      if field in multi_fields:
+        if tag_matches(tag, attribute, value):
+          found[field].append(tag)
+      elif field not in found and tag_matches(tag, attribute, value):
+        found[field] = tag
+  return found, metas
+
+
+# How each field of a page came out (see extract_fields_detailed()):
+#   'ok'      : found and read
+#   'missing' : the page doesn't have it, the field keeps its placeholder
+#   'error'   : the block is there, but not in the shape the extraction expects, the field keeps its placeholder
+FIELD_STATUSES = ('ok', 'missing', 'error')
+
+# What a field is set to when it's missing or can't be read (None for the fields that had no placeholder before)
+FIELD_PLACEHOLDERS = {"Graphs" : 1, "Memory" : 1, "OS" : 1, "Processor" : 1, "Storage" : 1, "Original Price" : -1,
+                      "User Tags" : [], "All Time Reception" : 'N/A'}
+
+# Raised for a page that has none of a store page's blocks (an age gate, an error page...), there's no row to keep
+class NotAStorePage(ValueError):
+  pass
+
+# Given : A bs4 tag (or None)
+# Returns : Its last child, which is what the original helpers ended up with by looping over the tag. None if there's none
+def last_child(tag):
+  value = None
+  if tag is not None:
+    for child in tag:
+      value = child
+  return value
+
+# Given: A bs4 object of ONE steam page, and the url (as string) it was downloaded from (and the SelectorTable to use)
+# Returns: (spec_list, statuses), where spec_list is the same LIST as extract_fields_by_helpers() and statuses gives
+#   each column's status (see FIELD_STATUSES). The blocks of every field are found in one go by select_fields(),
+#   and only the small blocks found (the developer rows, the requirement list) get searched again.
+# A field that's missing or malformed only costs that field: it keeps its placeholder (FIELD_PLACEHOLDERS) and the
+#   rest of the row is kept. Only a page with none of the store page blocks raises (NotAStorePage)
+def extract_fields_detailed(steamed_soup, steam_url, table = PAGE_TABLE):
+  spec_list = [FIELD_PLACEHOLDERS.get(column) for column in HW_COLUMNS]
+  spec_list[HW_COLUMNS.index("User Tags")] = [] # Its own list, not FIELD_PLACEHOLDERS' one shared by every row
+  statuses = dict.fromkeys(HW_COLUMNS, 'missing')
+  found, metas = select_fields(steamed_soup, table)
+  app_tags = found.get('app_tags', [])
+
+  if 'title' not in found and 'info' not in found and not metas:
+    raise NotAStorePage(steam_url)
+
+  # Given : A column, its value, and whether it was found at all. Sets it (and its status) if found
+  def keep(column, value, is_found = True):
+    if is_found:
+      spec_list[HW_COLUMNS.index(column)] = value
+      statuses[column] = 'ok'
+
+  # Minimum requirements (placeholders stay for the requirements that aren't there)
+  if 'sys_req' in found:
+    extract_requirements(found['sys_req'].find_all('li'), spec_list)
+    for index, column in enumerate(HW_COLUMNS[1:6], 1):
+      if spec_list[index] != FIELD_PLACEHOLDERS[column]:
+        statuses[column] = 'ok'
+
+  # Title
+  keep("Title", found['title'].get_text() if 'title' in found else None, 'title' in found)
+
+  # App ID
+  try:
+    keep("app_id", str(extract_app_id(steam_url)))
+  except IndexError: # Not an /app/<id>/ url
+    statuses["app_id"] = 'error'
+
+  # Price, falling back on the original price of a discounted game
+  price_div = found.get('price')
+  if price_div is None:
+    price_div = found.get('original_price')
+  if price_div is not None:
+    price = extract_price(price_div, steamed_soup)
+    keep("Original Price", price, price != -1)
+    if price == -1: # The price block is there, but empty
+      statuses["Original Price"] = 'error'
+
+  # Developer and Publisher are the <a> tags in the 1st and 2nd 'dev_row' of the block
+  if 'info' in found:
+    dev_rows = found['info'].find_all('div', {'class' : 'dev_row'})
+    for column, number in (("Developer", 0), ("Publisher", 1)):
+      if len(dev_rows) > number:
+        name_tag = dev_rows[number].find('a')
+        if name_tag is None:
+          statuses[column] = 'error'
+        else:
+          keep(column, str(last_child(name_tag) or '')) # str() : a bs4 string would drag the whole parse tree along when pickled
+
+  # Genre
+  if 'genre' in found:
+    genre_tag = found['genre'].find('a')
+    if genre_tag is None:
+      statuses["Genre"] = 'error'
+    else:
+      keep("Genre", genre_tag.text)
+
+  # Release date
+  if 'date' in found:
+    keep("Release Date", found['date'].text)
+
+  # User tags
+  keep("User Tags", [tag.text.strip() for tag in app_tags], len(app_tags) > 0)
+
+  # All time reception ('N/A' when the page doesn't have one)
+  if 'review_summary' in found:
+    keep("All Time Reception", found['review_summary'].text)
+
+  # Microdata
+  for column, itemprop in MICRODATA_COLUMNS.items():
+    keep(column, metas.get(itemprop), metas.get(itemprop) is not None)
+
+  return spec_list, statuses
+
+# Given: A bs4 object of ONE steam page, and the url (as string) it was downloaded from
+# Returns: The same LIST as extract_fields_by_helpers(), without searching the page once per field (see extract_fields_detailed())
+def extract_fields(steamed_soup, steam_url, table = PAGE_TABLE):
+  return extract_fields_detailed(steamed_soup, steam_url, table)[0]
+
+
+# Counts how each field came out over many pages, so we know which fields the extraction keeps missing
+class FieldStats:
+  def __init__(self, columns = HW_COLUMNS):
+    self.counts = {column : dict.fromkeys(FIELD_STATUSES, 0) for column in columns}
+    self.pages = 0
+
+  # Given : The statuses of one page (see extract_fields_detailed())
+  def add(self, statuses):
+    self.pages = self.pages + 1
+    for column, status in statuses.items():
+      self.counts[column][status] = self.counts[column][status] + 1
+
+  # Returns : {column : share of the pages where it was 'ok'}
+  def success_rates(self):
+    return {column : counts['ok'] / self.pages if self.pages else None for column, counts in self.counts.items()}
+
+  # Returns : A table of every column's ok / missing / error counts and success rate
+  def summary(self):
+    lines = [str(self.pages) + ' pages', 'field'.ljust(24) + ''.join(status.rjust(9) for status in FIELD_STATUSES) + 'ok %'.rjust(8)]
+    for column, counts in self.counts.items():
+      rate = counts['ok'] / self.pages * 100 if self.pages else 0
+      lines.append(column.ljust(24) + ''.join(str(counts[status]).rjust(9) for status in FIELD_STATUSES) + str(round(rate, 1)).rjust(8))
+    return '\n'.join(lines)
+
+# Given: The raw bytes of ONE steam page, and the url (as string) it was downloaded from
+# Returns: A LIST consisting of the steam game info, for use with dataframe
+# Kept apart from the download itself, so that any fetcher (urllib, the async engine in fetch.py, ...)
+#   can hand its pages to the same extraction code
+# backend picks the HTML parser (see parsers.py). None uses the fastest one installed
+def extract_page(response_steam_page, steam_url, backend = None):
+  steamed_soup = make_soup(response_steam_page, backend)
+  return extract_fields(steamed_soup, steam_url)
+
+# Same as extract_page(), but returns (spec_list, statuses) (see extract_fields_detailed())
+def extract_page_detailed(response_steam_page, steam_url, backend = None):
+  return extract_fields_detailed(make_soup(response_steam_page, backend), steam_url)
@@ -0,0 +1,323 @@
+# Concurrent fetch engine for Steam store pages.
+#
+# scrape.py used to download one page at a time with urllib, so a full crawl of steam_links_v3.txt
+# took (number of urls) x (round trip time). Here a fixed pool of asyncio workers share one aiohttp
+# session (and so one keep-alive connection pool), each host gets a rate limit so we don't hammer
+# the store, and every downloaded page goes through the same extract_page() as before.
+# Throttled (429/5xx) and timed out requests are retried with backoff, and the number of requests in flight
+# shrinks while the store is pushing back (see throttle.py).
+#
+# Usage (from a script):
+#   hw_df, errors = scrape_urls(url_set, concurrency = 16, per_host_rate = 10)
+# Usage (from a notebook, where an event loop is already running):
+#   hw_df, errors = await scrape_urls_async(url_set, concurrency = 16, per_host_rate = 10)
+
+import asyncio
+import contextlib
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+import aiohttp
+import pandas as pd
+
+from extract import extract_page, extract_page_detailed, extract_app_id, HW_COLUMNS
+from page_cache import CacheMiss, CACHE_MODES
+from sinks import RowSink, open_sink
+from partial import read_until_fields_async, page_size, partial_stats, CHUNK_SIZE
+from throttle import AdaptiveLimit, HostRateLimiter, RetryPolicy
+
+# Sent with every request. Steam serves the age-check page instead of the store page without these cookies
+DEFAULT_HEADERS = {'User-Agent' : 'Mozilla/5.0 (steamscrape)', 'Accept-Language' : 'en-US,en;q=0.9'}
+DEFAULT_COOKIES = {'birthtime' : '0', 'lastagecheckage' : '1-0-1900', 'mature_content' : '1'}
+
+
+# What came back from the store for one url
+#   status        : HTTP status (304 when the cached copy is still good, in which case page is None)
+#   complete      : False if only the start of the page was read (see partial.py)
+#   bytes_total   : Size of the whole page, None if unknown
+FetchedPage = namedtuple('FetchedPage', ['status', 'page', 'complete', 'bytes_total', 'etag', 'last_modified'])
+
+# Given : An open aiohttp session, a url and any extra request headers (such as If-None-Match)
+# Returns : A FetchedPage (raises for 4xx/5xx responses). With partial = True, only as much of the page
+#   as the extraction needs is read (see partial.py). The time to read the body goes to metrics (if any) as 'download'
+async def fetch_page(session, steam_url, partial = False, request_headers = None, metrics = None):
+  async with session.get(steam_url, headers = request_headers) as response:
+    if response.status == 304:
+      return FetchedPage(304, None, True, None, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    response.raise_for_status()
+    bytes_total = page_size(response.headers.get('Content-Length'), response.headers.get('Content-Encoding'))
+    start = time.perf_counter()
+    if partial:
+      page, complete = await read_until_fields_async(response.content.iter_chunked(CHUNK_SIZE))
+    else:
+      page, complete = await response.read(), True
+    if metrics is not None:
+      metrics.observe('download', time.perf_counter() - start)
+    return FetchedPage(response.status, page, complete, bytes_total, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+# Given : A CachedPage (or None)
+# Returns : The headers asking the store to only send the page if it changed since it was cached
+def conditional_headers(entry):
+  headers = {}
+  if entry is not None and entry.complete: # A partly read page can't stand in for the whole one
+    if entry.etag:
+      headers['If-None-Match'] = entry.etag
+    if entry.last_modified:
+      headers['If-Modified-Since'] = entry.last_modified
+  return headers
+
+# Given : An open aiohttp session, a url, and a PageCache (or None) with the way to use it (see page_cache.CACHE_MODES)
+# Returns : (page bytes, True if that's the whole page, size of the whole page or None), from the cache or the store
+# The limiter (if any) is only waited on when the store actually gets a request
+async def load_page(session, steam_url, cache = None, cache_mode = 'cache-first', partial = False, limiter = None, metrics = None):
+  async def request(request_headers = None):
+    if limiter is not None:
+      await limiter.wait(urlsplit(steam_url).hostname)
+    return await fetch_page(session, steam_url, partial, request_headers, metrics)
+
+  if cache is None:
+    fetched = await request()
+    return fetched.page, fetched.complete, fetched.bytes_total
+
+  app_id = extract_app_id(steam_url)
+  entry = cache.get(app_id) if cache_mode != 'refresh' else None
+  if cache_mode == 'cache-only':
+    if entry is None:
+      raise CacheMiss(steam_url)
+    return entry.page, entry.complete, None
+  if cache_mode == 'cache-first' and entry is not None and cache.is_fresh(entry):
+    return entry.page, entry.complete, None
+
+  fetched = await request(conditional_headers(entry) if cache_mode == 'conditional' else None)
+  if fetched.status == 304:
+    cache.touch(app_id)
+    return entry.page, entry.complete, None
+  cache.put(app_id, steam_url, fetched.page, fetched.etag, fetched.last_modified, fetched.complete)
+  return fetched.page, fetched.complete, fetched.bytes_total
+
+
+# Given : An open aiohttp session, a url, its query parameters and the HostRateLimiter in use
+# Returns : The decoded JSON body (raises for 4xx/5xx)
+async def get_json(session, url, params, limiter):
+  await limiter.wait(urlsplit(url).hostname)
+  async with session.get(url, params = params) as response:
+    response.raise_for_status()
+    return await response.json(content_type = None) # Steam sometimes answers JSON as text/html
+
+
+# Given : A function making a request (returns a coroutine), the url it requests, and the throttling in use
+# Returns : What the request returned, trying it again after a backoff if it failed in a way worth retrying
+#   (see RetryPolicy). A Retry-After from the store holds back every request to that host, and every push back is
+#   reported to the AdaptiveLimit (if any) so that fewer requests go out at once
+async def with_retries(make_request, url, limiter, retry, gate):
+  attempt = 0
+  while True:
+    attempt = attempt + 1
+    try:
+      async with (gate or contextlib.nullcontext()):
+        result = await make_request()
+      if gate is not None:
+        gate.success()
+      return result
+    except Exception as e:
+      if retry is None or not retry.should_retry(e):
+        raise
+      if gate is not None:
+        gate.throttled()
+      if attempt >= retry.attempts:
+        raise
+      delay = retry.delay(attempt, e)
+      if getattr(e, 'status', None) == 429:
+        limiter.pause(urlsplit(url).hostname, delay)
+      await asyncio.sleep(delay)
+
+# Same as load_page(), with retries (see with_retries())
+async def load_page_with_retries(session, steam_url, cache, cache_mode, partial, limiter, retry, gate, metrics = None):
+  return await with_retries(lambda: load_page(session, steam_url, cache, cache_mode, partial, limiter, metrics), steam_url, limiter, retry, gate)
+
+
+# Given : The most requests in flight, the timeout of a request (seconds), the headers / cookies to send, and
+#   aiohttp TraceConfigs (see metrics.Metrics.trace_config()) if any
+# Returns : An aiohttp session whose keep-alive connection pool is sized for that many requests
+def open_session(concurrency, timeout, headers = DEFAULT_HEADERS, cookies = DEFAULT_COOKIES, trace_configs = None):
+  connector = aiohttp.TCPConnector(limit = concurrency, limit_per_host = concurrency, ttl_dns_cache = 300, keepalive_timeout = 30)
+  client_timeout = aiohttp.ClientTimeout(total = timeout, sock_connect = min(timeout, 10))
+  return aiohttp.ClientSession(connector = connector, headers = headers, cookies = cookies, timeout = client_timeout,
+                               trace_configs = trace_configs)
+
+# Given : An iterable (or async iterable) of items, an async function handling one item, and how many to handle at once
+# Yields : (item, result, error) for every item, in the order they finish. Exactly one of result/error is None
+# A fixed pool of workers pulls from a small queue, so a huge (or endless) iterable never sits in memory all at once
+async def run_workers(items, handle, concurrency):
+  item_queue = asyncio.Queue(maxsize = concurrency * 2)
+  results = asyncio.Queue()
+  DONE = object() # Marks a worker having run out of items
+
+  # Feeds the items to the workers, then one DONE per worker. If the items themselves raise, that's raised below
+  async def producer():
+    try:
+      if hasattr(items, '__aiter__'):
+        async for item in items:
+          await item_queue.put(item)
+      else:
+        for item in items:
+          await item_queue.put(item)
+    except Exception as e:
+      await results.put(e)
+      return
+    for _ in range(concurrency):
+      await item_queue.put(DONE)
+
+  async def worker():
+    while True:
+      item = await item_queue.get()
+      if item is DONE:
+        await results.put(DONE)
+        return
+      try:
+        await results.put((item, await handle(item), None))
+      except Exception as e: # Keep going, but hand back what went wrong for this item
+        await results.put((item, None, e))
+
+  tasks = [asyncio.create_task(producer())] + [asyncio.create_task(worker()) for _ in range(concurrency)]
+  try:
+    finished_workers = 0
+    while finished_workers < concurrency:
+      result = await results.get()
+      if isinstance(result, Exception):
+        raise result
+      if result is DONE:
+        finished_workers = finished_workers + 1
+      else:
+        yield result
+  finally:
+    for task in tasks:
+      task.cancel()
+    await asyncio.gather(*tasks, return_exceptions = True)
+
+
+# Given : An iterable (or async iterable) of steam urls
+# Yields : (url, spec_list, error) for every url, in the order they finish. Exactly one of spec_list/error is None
+#
+# concurrency   : Most pages in flight at once (also the size of the connection pool)
+# per_host_rate : Max requests per second to any one host (None for no limit)
+# retry         : A RetryPolicy for throttled / failed requests (None to never retry)
+# timeout       : Seconds a request may take before it's abandoned (and retried)
+# adaptive      : Shrink the number of requests in flight while the store pushes back, and grow it back after
+# parse         : Function turning (page bytes, url) into a spec_list. Runs in `parse_executor`
+#                 (default thread pool) so that parsing one page doesn't stall the downloads of the others
+# partial       : Stop downloading each page once the fields we need have been read (see partial.py)
+# page_stats    : A list that, with partial = True, gets (url, stats) appended for every page scraped
+# cache         : A page_cache.PageCache to read pages from / save pages to (None for no cache)
+# cache_mode    : How the cache is used, one of page_cache.CACHE_MODES
+# metrics       : A metrics.Metrics to record per-stage timings in: the network stages, 'fetch' (the whole load,
+#                 retries and cache included) and 'parse_total' (the whole parse function, waiting for a thread included)
+# field_stats   : An extract.FieldStats counting how each field came out (parse may then also return (spec_list, statuses),
+#                 like extract_page_detailed(), which is used instead of the default extract_page)
+async def crawl(urls, concurrency = 16, per_host_rate = None, parse = extract_page, parse_executor = None,
+                headers = DEFAULT_HEADERS, cookies = DEFAULT_COOKIES, partial = False, page_stats = None,
+                cache = None, cache_mode = 'cache-first', retry = RetryPolicy(), timeout = 30, adaptive = True, metrics = None,
+                field_stats = None):
+  if cache_mode not in CACHE_MODES:
+    raise ValueError('cache_mode must be one of ' + ', '.join(CACHE_MODES))
+  if field_stats is not None and parse is extract_page:
+    parse = extract_page_detailed
+  loop = asyncio.get_running_loop()
+  limiter = HostRateLimiter(per_host_rate)
+  gate = AdaptiveLimit(concurrency) if adaptive else None
+
+  async def scrape_one(session, url):
+    start = time.perf_counter()
+    page, complete, bytes_total = await load_page_with_retries(session, url, cache, cache_mode, partial, limiter, retry, gate, metrics)
+    parse_start = time.perf_counter()
+    spec_list = await loop.run_in_executor(parse_executor, parse, page, url)
+    if isinstance(spec_list, tuple): # (spec_list, statuses)
+      spec_list, statuses = spec_list
+      if field_stats is not None:
+        field_stats.add(statuses)
+    if partial and page_stats is not None:
+      page_stats.append((url, partial_stats(page, complete, bytes_total, time.perf_counter() - parse_start)))
+    if metrics is not None:
+      metrics.observe('fetch', parse_start - start)
+      metrics.observe('parse_total', time.perf_counter() - parse_start)
+      metrics.page_done(page)
+    return spec_list
+
+  trace_configs = [metrics.trace_config()] if metrics is not None else None
+  async with open_session(concurrency, timeout, headers, cookies, trace_configs) as session:
+    async for item in run_workers(urls, lambda url: scrape_one(session, url), concurrency):
+      if metrics is not None and item[2] is not None:
+        metrics.page_failed()
+      yield item
+
+
+# Given : An iterable of steam urls (plus any of crawl()'s keyword arguments)
+# Returns : (hw_df, errors) where hw_df has the same 18 columns as scrape.py's and errors is a list of (url, exception)
+async def scrape_urls_async(urls, **crawl_options):
+  list_of_specs = []
+  errors = []
+  start = time.perf_counter()
+  async for url, spec_list, error in crawl(urls, **crawl_options):
+    if error is None:
+      list_of_specs.append(spec_list)
+    else:
+      print("ERROR FOR URL : " + str(url) + " (" + type(error).__name__ + ")")
+      errors.append((url, error))
+  print("Scraped " + str(len(list_of_specs)) + " pages (" + str(len(errors)) + " errors) in " + str(round(time.perf_counter() - start, 1)) + "s")
+
+  hw_df = pd.DataFrame(list_of_specs, columns = HW_COLUMNS)
+  return hw_df, errors
+
+
+# Same as scrape_urls_async(), for use outside of a running event loop
+def scrape_urls(urls, **crawl_options):
+  return asyncio.run(scrape_urls_async(urls, **crawl_options))
+
+
+# Given : A CrawlQueue (see crawl_state.py) and where to write the rows: a path (.csv, .jsonl or .parquet, see sinks.py)
+#   or an open RowSink (plus any of crawl()'s keyword arguments)
+# Scrapes the queue's unfinished urls. Rows are held back until `flush_every` pages are in, then written to the sink,
+#   flushed and marked done in one step, so only rows of done urls ever reach the sink. A crash (or cancel) drops the
+#   rows held back, and their urls stay pending for the next run (which scrapes them again, without duplicating a row)
+#   Failed urls are recorded in the queue with their exception class
+#   `urls` (an iterable or async iterable of urls already in the queue) is scraped instead of queue.unfinished() if given
+# Returns : The queue's counts once the run is over
+async def scrape_resumable_async(queue, out, flush_every = 50, retry_failed = False, urls = None, **crawl_options):
+  if isinstance(out, RowSink):
+    sink = out
+  else:
+    sink = open_sink(out, start_index = queue.counts()['done']) # Keep a csv's index column counting up across runs
+  unflushed_rows = []
+  unflushed_urls = []
+
+  # Writes the rows held back and marks their urls done
+  def flush():
+    sink.write_rows(unflushed_rows)
+    sink.flush()
+    queue.mark_done(unflushed_urls)
+    unflushed_rows.clear()
+    unflushed_urls.clear()
+
+  try:
+    if urls is None:
+      urls = queue.unfinished(retry_failed)
+    async for url, spec_list, error in crawl(urls, **crawl_options):
+      if error is None:
+        unflushed_rows.append(spec_list)
+        unflushed_urls.append(url)
+        if len(unflushed_urls) >= flush_every:
+          flush()
+      else:
+        print("ERROR FOR URL : " + str(url) + " (" + type(error).__name__ + ")")
+        queue.mark_failed(url, error)
+    flush()
+  finally:
+    if sink is not out:
+      sink.close() # Only the rows already marked done are in there, the ones held back are dropped
+  return queue.counts()
+
+
+# Same as scrape_resumable_async(), for use outside of a running event loop
+def scrape_resumable(queue, out, **options):
+  return asyncio.run(scrape_resumable_async(queue, out, **options))
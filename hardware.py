@@ -0,0 +1,441 @@
+# Structured system requirements: typed hardware features out of the requirement text of a store page.
+#
+# The scraper keeps the minimum requirements as raw text (Graphs = 'NVIDIA GeForce GTX 960 2GB', Processor =
+# 'Intel Core i5-4460 / AMD FX-6300'...), so analysis.py had nothing numeric to use about the hardware. Here the text
+# is read with precompiled regex tables, one vectorized match per table entry over the column's distinct strings
+# (see cleaning.parse_unique()), into:
+#   RAM, Storage        : GB (float)
+#   DirectX             : version (float)
+#   CPU Vendor, Family  : 'Intel' / 'Core i5', 'AMD' / 'FX'... (the first CPU named)
+#   CPU Cores, CPU GHz  : when the text says ('Quad-core', '2.4 GHz')
+#   GPU Vendor, Model   : 'NVIDIA' / 'GeForce GTX 960'... (the first GPU named)
+#   GPU VRAM            : GB (float), from an amount with an MB / GB unit (see VRAM_PATTERN)
+#   GPU Tier            : 1 (integrated / old) to 5 (current high end), from the model's score (see GPU_TIERS). A
+#                         rough bucket to compare requirements with, not a benchmark
+#   CPU Model, GPU Model: the model named in the text, looked up in hardware_models.csv (the GPU one falls back on the
+#                         GPU_MODELS name for cards that aren't in the table)
+#   CPU Score, GPU Score: that model's score in hardware_models.csv, an APPROXIMATE relative performance on a 0-100
+#                         scale (see the top of the csv), to rank requirements with
+#
+# The model lookup goes through a ModelIndex: the table's model names are split into tokens once ('Core i5-4460' ->
+# core, i5, 4460), indexed on the tokens that have a digit in them, and each distinct requirement string is matched
+# against the few models sharing one of those tokens with it (then kept in the index's cache).
+#
+# read_requirements() reads both columns of a page (minimum and recommended, with the DirectX line the scraper
+# skips), and requirements_from_cache() does it for every page of a page cache.
+#
+# Usage:
+#   features = requirement_features(pd.DataFrame({'Processor' : ..., 'Graphics' : ..., 'Memory' : ...}))
+#   steam_df = steam_df.join(hardware_columns(steam_df))            (the CPU / GPU columns of the scraped rows)
+#   rows = requirements_from_cache(PageCache('page_cache'))          (Min / Rec features of every cached page)
+
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from cleaning import parse_size_strings, parse_sizes, parse_unique
+from page_cache import read_blob
+from parsers import make_soup
+
+# Where the requirement columns are on a page. Games with a single column put it in 'full'
+REQUIREMENT_BLOCKS = {'minimum' : 'game_area_sys_req_leftCol', 'recommended' : 'game_area_sys_req_rightCol'}
+SINGLE_BLOCK = 'game_area_sys_req_full'
+
+# Label of a requirement line (lowercase, before the ':') -> the field it's about
+REQUIREMENT_LABELS = {
+  'os' : 'OS', 'operating system' : 'OS',
+  'processor' : 'Processor', 'cpu' : 'Processor',
+  'memory' : 'Memory', 'ram' : 'Memory',
+  'graphics' : 'Graphics', 'video card' : 'Graphics', 'video' : 'Graphics', 'gpu' : 'Graphics',
+  'directx' : 'DirectX',
+  'storage' : 'Storage', 'hard drive' : 'Storage', 'hard disk space' : 'Storage', 'hdd' : 'Storage',
+}
+REQUIREMENT_FIELDS = ('OS', 'Processor', 'Memory', 'Graphics', 'DirectX', 'Storage')
+
+# (vendor, family, pattern). The one found earliest in the text wins, the one listed first if two start at the same place
+CPU_FAMILIES = [
+  ('Intel', 'Core i9', r'\bi9[- ]?\d{3,5}|core\s*i9\b'),
+  ('Intel', 'Core i7', r'\bi7[- ]?\d{3,5}|core\s*i7\b'),
+  ('Intel', 'Core i5', r'\bi5[- ]?\d{3,5}|core\s*i5\b'),
+  ('Intel', 'Core i3', r'\bi3[- ]?\d{3,5}|core\s*i3\b'),
+  ('Intel', 'Core 2 Quad', r'core\s*2\s*quad|\bq[6-9]\d{3}\b'),
+  ('Intel', 'Core 2 Duo', r'core\s*2\s*duo|\b[et][4-8]\d{3}\b'),
+  ('Intel', 'Xeon', r'\bxeon\b'),
+  ('Intel', 'Pentium', r'\bpentium\b'),
+  ('Intel', 'Celeron', r'\bceleron\b'),
+  ('Intel', 'Atom', r'\batom\b'),
+  ('AMD', 'Threadripper', r'threadripper'),
+  ('AMD', 'Ryzen 9', r'ryzen\s*9\b'),
+  ('AMD', 'Ryzen 7', r'ryzen\s*7\b'),
+  ('AMD', 'Ryzen 5', r'ryzen\s*5\b'),
+  ('AMD', 'Ryzen 3', r'ryzen\s*3\b'),
+  ('AMD', 'FX', r'\bfx[- ]?\d{4}'),
+  ('AMD', 'Phenom', r'\bphenom\b'),
+  ('AMD', 'Athlon', r'\bathlon\b'),
+  ('AMD', 'A-Series', r'\ba(?:4|6|8|10|12)[- ]\d{4}'),
+  ('Apple', 'Apple M', r'\bapple\s*m[1-9]\b'),
+]
+CPU_VENDORS = [('Intel', r'\bintel\b'), ('AMD', r'\bamd\b'), ('Apple', r'\bapple\b')]
+
+# Cores as the requirements write them: 'Dual Core', 'Quad-core', '4 cores'
+CORE_WORDS = {'dual' : 2, 'two' : 2, 'triple' : 3, 'tri' : 3, 'quad' : 4, 'four' : 4, 'hexa' : 6, 'six' : 6,
+              'octa' : 8, 'eight' : 8}
+CORES_PATTERN = r'(?i)\b(?P<word>' + '|'.join(CORE_WORDS) + r'|\d{1,2})[- ]?cores?\b'
+GHZ_PATTERN = r'(?i)(?P<ghz>\d+(?:[.,]\d+)?)\s*ghz'
+
+# (vendor, model prefix, pattern). The pattern's <number> (and <suffix>) make the rest of the model name, e.g.
+# 'GeForce GTX ' + '1060'. Like CPU_FAMILIES, the one found earliest in the text wins. A suffix only counts when it
+# ends there ('9800 GTX+' isn't a '9800 GT')
+GPU_MODELS = [
+  ('NVIDIA', 'GeForce RTX ', r'\brtx\s*(?P<number>\d{4})(?:\s*(?P<suffix>ti|super)(?![a-z]))?'),
+  ('NVIDIA', 'GeForce GTX ', r'\bgtx\s*(?P<number>\d{3,4})(?:\s*(?P<suffix>ti|super)(?![a-z]))?'),
+  ('NVIDIA', 'GeForce GTS ', r'\bgts\s*(?P<number>\d{3})'),
+  ('NVIDIA', 'GeForce GT ', r'\bgt\s*(?P<number>\d{3,4})\b'),
+  ('NVIDIA', 'GeForce ', r'\bgeforce\s*(?P<number>\d{4})(?!\d)(?:\s*(?P<suffix>gtx\+?|gts|gt|gs)(?![a-z]))?'),
+  ('AMD', 'Radeon RX ', r'\brx\s*(?P<number>\d{3,4})(?:\s*(?P<suffix>xtx|xt)(?![a-z]))?'),
+  ('AMD', 'Radeon RX Vega ', r'\bvega\s*(?P<number>\d{2})'),
+  ('AMD', 'Radeon R9 ', r'\br9\s*(?P<number>\d{3}x?|fury)'),
+  ('AMD', 'Radeon R7 ', r'\br7\s*(?P<number>\d{3}x?)'),
+  ('AMD', 'Radeon HD ', r'\b(?:radeon|ati)\s*hd\s*(?P<number>[2-8]\d{3})\b'),
+  ('Intel', 'Intel Arc ', r'\barc\s*(?P<number>a\d{3})'),
+  ('Intel', 'Intel Iris ', r'\biris\s*(?P<number>xe|pro|plus)?'),
+  ('Intel', 'Intel UHD Graphics ', r'\buhd\s*(?:graphics\s*)?(?P<number>\d{3})'),
+  ('Intel', 'Intel HD Graphics ', r'\bintel\s*(?:hd\s*)?(?:graphics\s*)?(?P<number>\d{3,4})\b'),
+]
+GPU_VENDORS = [('NVIDIA', r'nvidia|geforce'), ('AMD', r'\bamd\b|radeon|\bati\b'), ('Intel', r'\bintel\b')]
+
+# (lowest score, tier) in the order they're tried, over the score of the model in hardware_models.csv. Models with a
+# lower score, or that aren't in the table, are tier 1 (integrated and older cards)
+GPU_TIERS = [(40, 5), (20, 4), (10, 3), (3, 2)]
+
+# The table of models and scores the ModelIndexes are built from (kind, vendor, model, score)
+MODELS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hardware_models.csv')
+
+# Tokens of a name: a letter followed by digits stays whole (i5, r9, m1, x4, q6600), otherwise letters and digits are
+# split apart (gtx960 -> gtx, 960; 4770k -> 4770, k)
+TOKEN_PATTERN = re.compile(r'\b[a-z]\d+\b|[a-z]+|\d+')
+
+# Brand words requirement text often leaves out ('GTX 960' for 'GeForce GTX 960'). A model doesn't need them to match
+BRAND_TOKENS = frozenset(['geforce', 'nvidia', 'radeon', 'amd', 'ati', 'intel', 'core', 'graphics', 'apple'])
+
+# Suffixes that make another model out of the same number ('8800 GTS' isn't an 8800 GT), on top of the ones in the table
+MODEL_SUFFIXES = frozenset(['gs', 'gt', 'gts', 'gtx', 'le', 'se', 'ti', 'super', 'xt', 'xtx'])
+
+# Family words written before a model number ('Radeon HD 6800', 'Quadro 4000'): a model from another family doesn't
+# match, even with the same number (Radeon HD 6800 isn't a Radeon RX 6800)
+FAMILY_TOKENS = frozenset(['hd', 'uhd', 'rx', 'r5', 'r7', 'r9', 'vega', 'gt', 'gts', 'gtx', 'rtx', 'quadro', 'titan',
+                           'iris', 'arc', 'firepro', 'mx'])
+
+# Words naming a vendor. A model from another vendor than the one written before its number doesn't match
+VENDOR_TOKENS = {'nvidia' : 'NVIDIA', 'geforce' : 'NVIDIA', 'quadro' : 'NVIDIA', 'amd' : 'AMD', 'radeon' : 'AMD',
+                 'ati' : 'AMD', 'intel' : 'Intel', 'apple' : 'Apple'}
+
+# VRAM in a Graphics string: an amount with an explicit MB / GB unit ('2GB', '512 MB', '1 Go'), standing on its own.
+# A bare letter after a model number is a model suffix, not a size ('GTX 970M', 'HD 6770M 1GB' -> 1 GB)
+VRAM_PATTERN = r'(?i)(?<![\w.,])(?P<amount>\d+(?:[.,]\d+)?)\s*(?P<unit>[mg]i?b|[mg]o|[мг]б)(?![a-zа-я])'
+
+DIRECTX_PATTERN = r'(?i)(?:directx|dx)?\s*(?:version\s*)?(?P<version>\d{1,2}(?:\.\d)?)'
+
+
+# Given : Strings (a Series) and a regex
+# Returns : A DataFrame with the pattern's groups in each string (case-insensitive, see Series.str.extract()) and
+#   'start', where in the string the match starts (NaN where there's none)
+def extract_with_start(strings, pattern):
+  parts = strings.str.extract(r'(?is)^(?P<before>.*?)(?:' + pattern + ')')
+  parts['start'] = parts.pop('before').str.len().astype('float64')
+  return parts
+
+# Given : Strings (a Series) and a list of (label, pattern)
+# Returns : The label of the pattern found earliest in each string (case-insensitive, the one listed first if two
+#   start at the same place), NA if none was. 'AMD Ryzen 5 1600 or Intel i5-7600' -> the Ryzen 5 one
+def earliest_match(strings, table):
+  chosen = pd.Series(pd.NA, index = strings.index, dtype = 'string')
+  earliest = pd.Series(np.inf, index = strings.index)
+  for label, pattern in table:
+    start = extract_with_start(strings, pattern)['start']
+    earlier = (start < earliest).values
+    chosen[earlier] = label
+    earliest[earlier] = start[earlier]
+  return chosen
+
+# Given : A string
+# Returns : Its tokens (see TOKEN_PATTERN), lowercase, in order
+def tokenize(text):
+  return TOKEN_PATTERN.findall(text.lower())
+
+
+# Lookup of the hardware models named in free text, for one kind of hardware (the GPUs or the CPUs of the table).
+# A model matches a text when every one of its tokens with a digit in it is in the text (and, for a model without any,
+# every token that isn't a brand word). Of the models that match, the one with the most of its (non-brand) tokens in
+# the text wins, then the one with the most tokens found, then the one whose brand is named, then the one named first:
+#   'GTX 1050 Ti' -> GeForce GTX 1050 Ti (not GeForce GTX 1050), 'i5-4460 / FX-6300' -> Core i5-4460
+# A model's suffix (the token after its last number: GT, Ti, K, XT...) only counts when the text has it right after
+# that number, and a text with another suffix there names another model: '9800GTX+' isn't a GeForce 9800 GT
+# The family and vendor words written right before the number must be the model's too: 'Radeon HD 6800' isn't a
+# Radeon RX 6800 and 'NVIDIA Quadro 4000' isn't an Intel HD Graphics 4000 (no match at all rather than the wrong card)
+class ModelIndex:
+  def __init__(self, models):
+    self.models = []
+    self.scores = {} # model -> score
+    self.by_token = {}
+    self.suffixes = set(MODEL_SUFFIXES)
+    self.cache = {}
+    for vendor, model, score in models:
+      tokens = tokenize(model)
+      names = [token for token in tokens if token not in BRAND_TOKENS]
+      numbers = [number for number, token in enumerate(names) if any(character.isdigit() for character in token)]
+      required = [names[number] for number in numbers] or names
+      number, suffix = None, None
+      if numbers:
+        number = names[numbers[-1]]
+        suffix = names[numbers[-1] + 1] if numbers[-1] + 1 < len(names) else None
+      if suffix is not None:
+        self.suffixes.add(suffix)
+      families = frozenset(names) & FAMILY_TOKENS - frozenset([suffix])
+      self.scores[model] = float(score)
+      self.models.append((vendor, model, float(score), frozenset(names), frozenset(required),
+                          frozenset(tokens) & BRAND_TOKENS | frozenset([vendor.lower()]), number, suffix, families))
+      for token in required:
+        self.by_token.setdefault(token, []).append(len(self.models) - 1)
+
+  def __len__(self):
+    return len(self.models)
+
+  # Given : A requirement string
+  # Returns : (vendor, model, score) of the model it names, (None, None, NaN) if there's none
+  def match(self, text):
+    text = text.lower()
+    spans = list(TOKEN_PATTERN.finditer(text))
+    tokens = [span.group() for span in spans]
+    if not tokens:
+      return None, None, np.nan
+    found = set(tokens)
+    position = {}
+    for number, token in enumerate(tokens):
+      position.setdefault(token, number)
+    written_suffixes = {} # token -> the suffixes written right after it ('9800gtx' : 9800 -> {gtx})
+    for span, following in zip(spans, spans[1:]):
+      if following.group() in self.suffixes and not text[span.end():following.start()].strip():
+        written_suffixes.setdefault(span.group(), set()).add(following.group())
+    written_families, written_vendors = {}, {} # token -> the family / vendor words right before it ('hd', 'AMD')
+    for number, token in enumerate(tokens):
+      before = number
+      while before > 0 and (tokens[before - 1] in FAMILY_TOKENS or tokens[before - 1] in BRAND_TOKENS):
+        before -= 1
+      written_families.setdefault(token, set()).update(set(tokens[before:number]) & FAMILY_TOKENS)
+      written_vendors.setdefault(token, set()).update(VENDOR_TOKENS[word] for word in tokens[before:number]
+                                                      if word in VENDOR_TOKENS)
+    best, best_key = None, None
+    candidates = set(number for token in found for number in self.by_token.get(token, ()))
+    for number in candidates:
+      vendor, model, score, names, required, brands, model_number, suffix, families = self.models[number]
+      if not required <= found:
+        continue
+      written = written_suffixes.get(model_number, set())
+      if written and suffix not in written: # The text names another variant of the model
+        continue
+      written_family = written_families.get(model_number, set())
+      if written_family and not written_family & families: # ... or a model of another family
+        continue
+      written_vendor = written_vendors.get(model_number, set())
+      if written_vendor and vendor not in written_vendor: # ... or of another vendor
+        continue
+      matched = names & found
+      if suffix is not None and suffix not in written:
+        matched = matched - {suffix}
+      key = (len(matched) / len(names), len(matched), len(brands & found), -min(position[token] for token in required))
+      if best_key is None or key > best_key:
+        best, best_key = number, key
+    if best is None:
+      return None, None, np.nan
+    return self.models[best][:3]
+
+  # Given : A column of requirement strings
+  # Returns : A DataFrame with the column's index and vendor, model and score (see match()). Each distinct string is
+  #   matched once, and kept in the cache for the next columns
+  def lookup(self, values):
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values.astype('string'), use_na_sentinel = True)
+    for value in uniques:
+      if value not in self.cache:
+        self.cache[value] = self.match(value)
+    known = [self.cache[value] for value in uniques] + [(None, None, np.nan)]
+    vendors = pd.Series([vendor for vendor, model, score in known], dtype = 'string')
+    models = pd.Series([model for vendor, model, score in known], dtype = 'string')
+    scores = pd.Series([score for vendor, model, score in known], dtype = 'float64')
+    return pd.DataFrame({'vendor' : vendors.take(codes).values, 'model' : models.take(codes).values,
+                         'score' : scores.take(codes).values}, index = values.index)
+
+
+# Given : The path of a models table (see MODELS_PATH)
+# Returns : {kind : ModelIndex} ('gpu' and 'cpu')
+def load_model_indexes(path = MODELS_PATH):
+  table = pd.read_csv(path, comment = '#')
+  return {kind : ModelIndex(rows[['vendor', 'model', 'score']].itertuples(index = False, name = None))
+          for kind, rows in table.groupby('kind')}
+
+MODEL_INDEXES = load_model_indexes()
+
+
+# Given : The distinct Processor strings of a column
+# Returns : A DataFrame indexed like them with CPU Vendor, CPU Family, CPU Cores and CPU GHz
+def parse_cpu_strings(cpus):
+  cpus = pd.Series(cpus, dtype = 'string')
+  family = earliest_match(cpus, [(str(number), pattern) for number, (vendor, name, pattern) in enumerate(CPU_FAMILIES)])
+  number = pd.to_numeric(family, errors = 'coerce')
+  vendor = number.map(lambda n: CPU_FAMILIES[int(n)][0], na_action = 'ignore').astype('string')
+  vendor = vendor.fillna(earliest_match(cpus, CPU_VENDORS))
+  family = number.map(lambda n: CPU_FAMILIES[int(n)][1], na_action = 'ignore').astype('string')
+  cores = cpus.str.extract(CORES_PATTERN)['word'].str.lower()
+  cores = pd.to_numeric(cores, errors = 'coerce').fillna(cores.map(CORE_WORDS, na_action = 'ignore').astype('float64'))
+  ghz = pd.to_numeric(cpus.str.extract(GHZ_PATTERN)['ghz'].str.replace(',', '.'), errors = 'coerce')
+  return pd.DataFrame({'CPU Vendor' : vendor, 'CPU Family' : family, 'CPU Cores' : cores.astype('float64'),
+                       'CPU GHz' : ghz.astype('float64')}, index = cpus.index)
+
+# Given : The distinct Graphics strings of a column
+# Returns : A DataFrame indexed like them with GPU Vendor, GPU Model, GPU VRAM (GB) and GPU Tier (see GPU_TIERS)
+# Each GPU_MODELS pattern is matched once over the strings, and kept where it starts earlier than the ones before it
+def parse_gpu_strings(gpus):
+  gpus = pd.Series(gpus, dtype = 'string')
+  vendor = pd.Series(pd.NA, index = gpus.index, dtype = 'string')
+  model = pd.Series(pd.NA, index = gpus.index, dtype = 'string')
+  earliest = pd.Series(np.inf, index = gpus.index)
+  for model_vendor, prefix, pattern in GPU_MODELS:
+    parts = extract_with_start(gpus, pattern)
+    parts = parts[(parts['start'] < earliest).values]
+    if parts.empty:
+      continue
+    number = parts['number'].fillna('')
+    name = prefix + number.str.title().where(~number.str.contains(r'\d', regex = True), number.str.upper())
+    if 'suffix' in parts:
+      suffix = parts['suffix'].str.upper().where(~parts['suffix'].str.lower().isin(['ti', 'super']), parts['suffix'].str.title())
+      name = name + (' ' + suffix).fillna('')
+    vendor[parts.index] = model_vendor
+    model[parts.index] = name.str.strip()
+    earliest[parts.index] = parts['start']
+  vendor = vendor.fillna(earliest_match(gpus, GPU_VENDORS))
+  vram = parse_size_strings(gpus, VRAM_PATTERN)['gb']
+  return pd.DataFrame({'GPU Vendor' : vendor, 'GPU Model' : model, 'GPU VRAM' : vram.astype('float64'),
+                       'GPU Tier' : gpu_tiers(model)}, index = gpus.index)
+
+# Given : GPU model names, and the ModelIndex with their scores
+# Returns : Their tier (see GPU_TIERS), 1 for the models that aren't in the index, NA where there's no model
+def gpu_tiers(models, index = None):
+  index = MODEL_INDEXES['gpu'] if index is None else index
+  scores = pd.Series(models, dtype = 'string').map(index.scores, na_action = 'ignore').astype('float64')
+  tier = pd.Series(np.select([(scores >= score).values for score, tier in GPU_TIERS], [tier for score, tier in GPU_TIERS],
+                             default = 1), index = scores.index)
+  return tier.where(pd.Series(models).notna().values).astype('Int64')
+
+# Given : The distinct DirectX strings of a column ('Version 11', 'DirectX 9.0c')
+# Returns : A DataFrame indexed like them with DirectX (float)
+def parse_directx_strings(versions):
+  versions = pd.Series(versions, dtype = 'string')
+  version = pd.to_numeric(versions.str.extract(DIRECTX_PATTERN)['version'], errors = 'coerce')
+  return pd.DataFrame({'DirectX' : version.astype('float64')}, index = versions.index)
+
+
+CPU_MISSING = [pd.NA, pd.NA, np.nan, np.nan]
+GPU_MISSING = [pd.NA, pd.NA, np.nan, pd.NA]
+
+# Given : A Processor column (the scraper's text, '1' when there was none)
+# Returns : A DataFrame with the column's index and CPU Vendor, CPU Family, CPU Cores and CPU GHz
+def parse_cpus(cpus):
+  return parse_unique(cpus, parse_cpu_strings, CPU_MISSING)
+
+# Given : A Graphs column (the scraper's text, '1' when there was none)
+# Returns : A DataFrame with the column's index and GPU Vendor, GPU Model, GPU VRAM and GPU Tier
+def parse_gpus(gpus):
+  return parse_unique(gpus, parse_gpu_strings, GPU_MISSING)
+
+# Given : A Processor column
+# Returns : parse_cpus() plus CPU Model and CPU Score from the model index
+def cpu_columns(cpus, index = None):
+  index = MODEL_INDEXES['cpu'] if index is None else index
+  columns = parse_cpus(cpus)
+  found = index.lookup(cpus)
+  columns['CPU Model'] = found['model']
+  columns['CPU Score'] = found['score']
+  return columns
+
+# Given : A Graphs column
+# Returns : parse_gpus() plus GPU Score from the model index, GPU Vendor, GPU Model and GPU Tier being the index
+#   model's when it knows the model (so they always describe the same card)
+def gpu_columns(gpus, index = None):
+  index = MODEL_INDEXES['gpu'] if index is None else index
+  columns = parse_gpus(gpus)
+  found = index.lookup(gpus)
+  columns['GPU Vendor'] = found['vendor'].fillna(columns['GPU Vendor'])
+  columns['GPU Model'] = found['model'].fillna(columns['GPU Model'])
+  columns['GPU Tier'] = gpu_tiers(columns['GPU Model'], index)
+  columns['GPU Score'] = found['score']
+  return columns
+
+# Given : A DataFrame of requirement text with any of the REQUIREMENT_FIELDS as columns
+# Returns : A DataFrame with its index and RAM, Storage, DirectX, the CPU and the GPU columns, models and scores
+#   included (NA for the fields that weren't given)
+def requirement_features(texts):
+  empty = pd.Series(pd.NA, index = texts.index, dtype = 'string')
+  column = lambda field: texts[field] if field in texts else empty
+  return pd.concat([
+    parse_sizes(column('Memory'))['gb'].rename('RAM'),
+    parse_sizes(column('Storage'))['gb'].rename('Storage'),
+    parse_unique(column('DirectX'), parse_directx_strings, [np.nan]),
+    cpu_columns(column('Processor')),
+    gpu_columns(column('Graphics')),
+  ], axis = 1)
+
+# Given : Rows as scraped (or being cleaned), with their Processor and Graphs columns
+# Returns : The CPU and GPU columns for them (see requirement_features()), with the rows' index
+def hardware_columns(rows):
+  return pd.concat([cpu_columns(rows['Processor']), gpu_columns(rows['Graphs'])], axis = 1)
+
+
+# Given : The <li> tags of one requirement column
+# Returns : {field : text} for the lines with a label in REQUIREMENT_LABELS
+def read_requirement_lines(lines):
+  texts = {}
+  for li in lines:
+    label, colon, text = li.get_text().partition(':')
+    field = REQUIREMENT_LABELS.get(label.strip().lower())
+    if colon and field is not None and field not in texts:
+      texts[field] = text.strip()
+  return texts
+
+# Given : A parsed store page (bs4 or parsers.SelectolaxTag)
+# Returns : {'minimum' : {field : text}, 'recommended' : {field : text}}, a column being empty if the page doesn't
+#   have it
+def read_requirements(steamed_soup):
+  requirements = {}
+  for column, css_class in REQUIREMENT_BLOCKS.items():
+    block = steamed_soup.find('div', {'class' : css_class})
+    if block is None and column == 'minimum':
+      block = steamed_soup.find('div', {'class' : SINGLE_BLOCK})
+    requirements[column] = {} if block is None else read_requirement_lines(block.find_all('li'))
+  return requirements
+
+# Given : Pages as (app_id, raw bytes), and the parser backend to use
+# Returns : A DataFrame indexed by app_id with the text of every requirement (columns 'Min Processor',
+#   'Rec Graphics'... see REQUIREMENT_FIELDS) and the features of both columns ('Min RAM', 'Rec GPU Tier'...)
+def requirements_frame(pages, backend = None):
+  rows = {}
+  for app_id, page in pages:
+    requirements = read_requirements(make_soup(page, backend))
+    rows[app_id] = {prefix + field : requirements[column].get(field) for column, prefix in (('minimum', 'Min '), ('recommended', 'Rec '))
+                    for field in REQUIREMENT_FIELDS}
+  texts = pd.DataFrame.from_dict(rows, orient = 'index', columns = ['Min ' + field for field in REQUIREMENT_FIELDS] +
+                                 ['Rec ' + field for field in REQUIREMENT_FIELDS])
+  texts.index.name = 'app_id'
+  features = [texts]
+  for prefix in ('Min ', 'Rec '):
+    column = texts[[prefix + field for field in REQUIREMENT_FIELDS]]
+    column.columns = list(REQUIREMENT_FIELDS)
+    features.append(requirement_features(column).add_prefix(prefix))
+  return pd.concat(features, axis = 1)
+
+# Given : A PageCache (see page_cache.py)
+# Returns : requirements_frame() of every cached page
+def requirements_from_cache(cache, backend = None):
+  return requirements_frame(((app_id, read_blob(path)) for app_id, url, path in cache.entries()), backend)
@@ -0,0 +1,152 @@
+# Streaming normalizer / deduper for the steam link lists (steam_links_v2.txt -> steam_links_v3.txt).
+#
+# The same app shows up under many urls: with and without tracking (?snr=..., ?curator_clanid=...), with a different
+# or missing title slug, http or https, with or without the trailing slash. Deduping the raw strings keeps all of
+# them, so here every link is reduced to its app_id and deduped on that:
+#   https://store.steampowered.com/app/367520/Hollow_Knight/?snr=1_7_7_230_150_3  ->  367520
+# and written back as one canonical url per app (the slug of the first link seen for it):
+#   https://store.steampowered.com/app/367520/Hollow_Knight/
+#
+# Links are read and written one line at a time, so a file with millions of lines never sits in memory. The app_ids
+# seen so far are kept in an AppIdBitmap (one bit per possible app_id, a few hundred KB whatever the number of links)
+# or, with a path, in a DiskSeenSet (SQLite), which also remembers them across runs.
+#
+# Usage:
+#   stats = dedupe_file('steam_links_v2.txt', 'steam_links_v3.txt')
+#   stats -> {'lines' : ..., 'unique' : ..., 'duplicates' : ..., 'blank' : ..., 'invalid' : ...}
+
+import re
+import sqlite3
+
+STORE_APP_URL = 'https://store.steampowered.com/app/'
+
+# /app/<app_id>/<slug>, the slug being optional
+APP_PATH = re.compile(r'/app/(\d+)(?:/([^/?#\s]+))?', re.IGNORECASE)
+
+# Highest app_id taken as real (store app_ids are in the low millions). Links to anything above are invalid, so a
+# mangled link ('/app/99999999999/') can't make an AppIdBitmap allocate gigabytes
+MAX_APP_ID = 1 << 24
+
+
+# Given : A link to a store page (any host form / query / fragment), and where app pages live
+# Returns : (app_id, canonical url), or None if it's not a link to an app (app_ids above MAX_APP_ID included)
+def normalize_url(url, app_url = STORE_APP_URL):
+  match = APP_PATH.search(url)
+  if match is None or int(match.group(1)) > MAX_APP_ID:
+    return None
+  app_id = str(int(match.group(1))) # Drops leading zeros
+  slug = match.group(2)
+  return app_id, app_url + app_id + '/' + (slug + '/' if slug else '')
+
+
+# Removes the tracking info from a link to an app
+# Given : https://store.steampowered.com/app/367520/Hollow_Knight/?snr=1_7_7_230_150_3 as string
+# Returns : https://store.steampowered.com/app/367520/Hollow_Knight/ as string. Links that aren't to an app (/sub/,
+# /bundle/, ...) have no app_id to rebuild them from and are returned unchanged
+def clean_url(url):
+  normalized = normalize_url(url)
+  return url if normalized is None else normalized[1]
+
+
+# Set of app_ids kept as a bitmap: bit n is set once app_id n has been seen.
+# Store app_ids are dense integers (a few million at most), so this stays small however many links go through.
+# It never grows past MAX_APP_ID bits (2 MB)
+class AppIdBitmap:
+  def __init__(self):
+    self.bits = bytearray()
+    self.count = 0
+
+  # Given : An app_id (str or int), 0 to MAX_APP_ID (ValueError otherwise)
+  # Returns : True if it wasn't in the set (it is now)
+  def add(self, app_id):
+    app_id = int(app_id)
+    if not 0 <= app_id <= MAX_APP_ID:
+      raise ValueError('app_id out of range : ' + str(app_id))
+    byte, bit = divmod(app_id, 8)
+    if byte >= len(self.bits):
+      size = min(max(byte + 1, 2 * len(self.bits)), MAX_APP_ID // 8 + 1) # Grow by doubling, up to MAX_APP_ID
+      self.bits.extend(bytes(size - len(self.bits)))
+    if self.bits[byte] >> bit & 1:
+      return False
+    self.bits[byte] = self.bits[byte] | (1 << bit)
+    self.count = self.count + 1
+    return True
+
+  def __contains__(self, app_id):
+    byte, bit = divmod(int(app_id), 8)
+    return 0 <= byte < len(self.bits) and bool(self.bits[byte] >> bit & 1)
+
+  def __len__(self):
+    return self.count
+
+  def close(self):
+    pass
+
+
+# Set of app_ids kept in a SQLite table, for when it should outlive the run (e.g. skip apps a previous list had)
+class DiskSeenSet:
+  def __init__(self, path, commit_every = 10000):
+    self.db = sqlite3.connect(path)
+    self.db.execute('CREATE TABLE IF NOT EXISTS seen (app_id INTEGER PRIMARY KEY)')
+    self.commit_every = commit_every
+    self.uncommitted = 0
+
+  # Given : An app_id (str or int)
+  # Returns : True if it wasn't in the set (it is now)
+  def add(self, app_id):
+    cursor = self.db.execute('INSERT OR IGNORE INTO seen (app_id) VALUES (?)', (int(app_id),))
+    self.uncommitted = self.uncommitted + 1
+    if self.uncommitted >= self.commit_every:
+      self.db.commit()
+      self.uncommitted = 0
+    return cursor.rowcount == 1
+
+  def __contains__(self, app_id):
+    return self.db.execute('SELECT 1 FROM seen WHERE app_id = ?', (int(app_id),)).fetchone() is not None
+
+  def __len__(self):
+    return self.db.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+
+  def close(self):
+    self.db.commit()
+    self.db.close()
+
+
+# Given : An iterable of links (e.g. an open file), the set of app_ids already seen (a new AppIdBitmap if None),
+#   and a stats dict to count into (see the top of this file)
+# Yields : The canonical url of every app, the first time it shows up
+def dedupe_links(lines, seen = None, stats = None):
+  seen = AppIdBitmap() if seen is None else seen
+  stats = {} if stats is None else stats
+  for key in ('lines', 'unique', 'duplicates', 'blank', 'invalid'):
+    stats.setdefault(key, 0)
+  for line in lines:
+    stats['lines'] = stats['lines'] + 1
+    line = line.strip()
+    if not line:
+      stats['blank'] = stats['blank'] + 1
+      continue
+    normalized = normalize_url(line)
+    if normalized is None:
+      stats['invalid'] = stats['invalid'] + 1
+      continue
+    app_id, url = normalized
+    if seen.add(app_id):
+      stats['unique'] = stats['unique'] + 1
+      yield url
+    else:
+      stats['duplicates'] = stats['duplicates'] + 1
+
+# Given : The link file to read, the file to write (one canonical url per line), and optionally the path of a
+#   DiskSeenSet to dedupe against (app_ids in it from earlier runs are skipped too)
+# Returns : The stats dict (see the top of this file)
+def dedupe_file(in_path, out_path, seen_path = None):
+  stats = {}
+  seen = DiskSeenSet(seen_path) if seen_path else AppIdBitmap()
+  try:
+    with open(in_path, 'r', encoding = 'utf-8', errors = 'replace') as in_file, open(out_path, 'w', encoding = 'utf-8') as out_file:
+      for url in dedupe_links(in_file, seen, stats):
+        out_file.write(url + '\n')
+  finally:
+    seen.close()
+  return stats
@@ -0,0 +1,294 @@
+# Per-stage timing for the crawl, to tell whether a slow crawl is waiting on the network, the HTML parser or the
+# extraction helpers.
+#
+# A Metrics object collects latency histograms per stage:
+#   network : 'dns', 'connect', 'ttfb' (request sent -> response headers), 'download' (headers -> whole body)
+#             and 'fetch' (the whole load_page(), retries and cache included)
+#   parsing : 'parse' (make_soup), 'extract' (extract_fields_detailed), and with helpers = True one 'extract_*' stage per
+#             helper (the helpers run a second time on the same soup just to be timed, so only turn that on to profile)
+# plus a histogram of page sizes, page / error counts and pages per second.
+#
+# Usage:
+#   metrics = Metrics()
+#   hw_df, errors = fetch.scrape_urls(urls, metrics = metrics, parse = InstrumentedParse(metrics, helpers = True))
+#   print(metrics.summary())
+#   metrics.to_json('crawl_metrics.json') / metrics.to_prometheus('crawl_metrics.prom')
+#
+# For a function-level view, profiled() wraps cProfile. cProfile only sees the thread it runs in, so give the crawl
+# parse_executor = InlineExecutor() to parse on the event loop's thread while profiling.
+
+import bisect
+import concurrent.futures
+import contextlib
+import cProfile
+import json
+import pstats
+import threading
+import time
+
+import aiohttp
+
+from extract import (extract_all_review_summary, extract_app_id, extract_best_rating, extract_current_rating, extract_date,
+                     extract_fields_detailed, extract_info, extract_price, extract_requirements, extract_review_count,
+                     extract_steam_title, extract_user_tags, extract_worst_rating)
+from parsers import make_soup
+
+# Upper bounds (seconds) of the latency buckets, 0.5ms to 60s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Upper bounds (bytes) of the page size buckets, 16KB to 4MB
+SIZE_BUCKETS = (16384, 32768, 65536, 131072, 262144, 524288, 1048576, 2097152, 4194304)
+
+
+# Counts of observations per bucket (each bucket counts the values up to its bound, past the previous one),
+# plus their count, sum, min and max
+class Histogram:
+  def __init__(self, buckets = LATENCY_BUCKETS):
+    self.buckets = buckets
+    self.counts = [0] * (len(buckets) + 1) # The last one is everything past the last bound
+    self.count = 0
+    self.sum = 0.0
+    self.min = None
+    self.max = None
+
+  def observe(self, value):
+    bucket = bisect.bisect_left(self.buckets, value)
+    self.counts[bucket] = self.counts[bucket] + 1
+    self.count = self.count + 1
+    self.sum = self.sum + value
+    self.min = value if self.min is None else min(self.min, value)
+    self.max = value if self.max is None else max(self.max, value)
+
+  # Given : A quantile (0.5 for the median)
+  # Returns : An estimate of it, interpolated within the bucket it falls in (like Prometheus' histogram_quantile)
+  def quantile(self, q):
+    if not self.count:
+      return None
+    rank = q * self.count
+    seen = 0
+    lower = self.min
+    for bound, count in zip(list(self.buckets) + [self.max], self.counts):
+      if count and seen + count >= rank:
+        upper = min(bound, self.max)
+        lower = max(lower, self.min)
+        return lower + (upper - lower) * (rank - seen) / count
+      seen = seen + count
+      lower = bound
+    return self.max
+
+  def as_dict(self):
+    return {'count' : self.count, 'sum' : self.sum, 'min' : self.min, 'max' : self.max,
+            'mean' : self.sum / self.count if self.count else None,
+            'p50' : self.quantile(0.5), 'p90' : self.quantile(0.9), 'p99' : self.quantile(0.99),
+            'buckets' : dict(zip([str(bound) for bound in self.buckets] + ['+Inf'], self.counts))}
+
+
+class Metrics:
+  def __init__(self):
+    self.stages = {}
+    self.page_bytes = Histogram(SIZE_BUCKETS)
+    self.pages = 0
+    self.errors = 0
+    self.started = time.perf_counter()
+    self.lock = threading.Lock() # Parsing stages are observed from the parse executor's threads
+
+  # Given : The name of a stage and how many seconds it took
+  def observe(self, stage, seconds):
+    with self.lock:
+      if stage not in self.stages:
+        self.stages[stage] = Histogram()
+      self.stages[stage].observe(seconds)
+
+  # Times the code in the with block as one observation of `stage`
+  @contextlib.contextmanager
+  def timer(self, stage):
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.observe(stage, time.perf_counter() - start)
+
+  # Given : The page that was scraped (bytes), counts it
+  def page_done(self, page):
+    with self.lock:
+      self.pages = self.pages + 1
+      self.page_bytes.observe(len(page))
+
+  def page_failed(self):
+    with self.lock:
+      self.errors = self.errors + 1
+
+  def pages_per_second(self):
+    elapsed = time.perf_counter() - self.started
+    return self.pages / elapsed if elapsed > 0 else 0.0
+
+  # Returns : An aiohttp TraceConfig recording 'dns', 'connect' and 'ttfb' for every request of the session it's given to
+  def trace_config(self):
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+      context.request_start = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+      self.observe('ttfb', time.perf_counter() - context.request_start)
+
+    async def on_dns_start(session, context, params):
+      context.dns_start = time.perf_counter()
+
+    async def on_dns_end(session, context, params):
+      self.observe('dns', time.perf_counter() - context.dns_start)
+
+    async def on_connection_start(session, context, params):
+      context.connection_start = time.perf_counter()
+
+    async def on_connection_end(session, context, params):
+      self.observe('connect', time.perf_counter() - context.connection_start)
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_dns_resolvehost_start.append(on_dns_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_end)
+    trace_config.on_connection_create_start.append(on_connection_start)
+    trace_config.on_connection_create_end.append(on_connection_end)
+    return trace_config
+
+  # Returns : Everything collected so far as a dict (what to_json() writes)
+  def as_dict(self):
+    with self.lock:
+      return {'pages' : self.pages, 'errors' : self.errors, 'elapsed_seconds' : time.perf_counter() - self.started,
+              'pages_per_second' : self.pages_per_second(), 'page_bytes' : self.page_bytes.as_dict(),
+              'stages' : {stage : histogram.as_dict() for stage, histogram in sorted(self.stages.items())}}
+
+  # Given : A path (or None), writes the metrics there as JSON
+  # Returns : The JSON text
+  def to_json(self, path = None):
+    text = json.dumps(self.as_dict(), indent = 2)
+    if path is not None:
+      with open(path, 'w') as json_file:
+        json_file.write(text)
+    return text
+
+  # Given : A path (or None), writes the metrics there in the Prometheus text format
+  # Returns : The text
+  def to_prometheus(self, path = None):
+    lines = ['# HELP steamscrape_stage_seconds Time spent in each stage of scraping a page',
+             '# TYPE steamscrape_stage_seconds histogram']
+    with self.lock:
+      for stage, histogram in sorted(self.stages.items()):
+        lines.extend(prometheus_histogram('steamscrape_stage_seconds', histogram, 'stage="' + stage + '",'))
+      lines.extend(['# HELP steamscrape_page_bytes Size of the scraped pages',
+                    '# TYPE steamscrape_page_bytes histogram'])
+      lines.extend(prometheus_histogram('steamscrape_page_bytes', self.page_bytes, ''))
+      lines.extend(['# HELP steamscrape_pages_total Pages scraped', '# TYPE steamscrape_pages_total counter',
+                    'steamscrape_pages_total ' + str(self.pages),
+                    '# HELP steamscrape_errors_total Pages that failed', '# TYPE steamscrape_errors_total counter',
+                    'steamscrape_errors_total ' + str(self.errors),
+                    '# HELP steamscrape_pages_per_second Pages scraped per second since the start',
+                    '# TYPE steamscrape_pages_per_second gauge',
+                    'steamscrape_pages_per_second ' + repr(self.pages_per_second())])
+    text = '\n'.join(lines) + '\n'
+    if path is not None:
+      with open(path, 'w') as prom_file:
+        prom_file.write(text)
+    return text
+
+  # Returns : A table of every stage (count, mean / p50 / p90 / max in ms, share of the total time), slowest first
+  def summary(self):
+    stats = self.as_dict()
+    lines = [str(stats['pages']) + ' pages, ' + str(stats['errors']) + ' errors, '
+             + str(round(stats['pages_per_second'], 1)) + ' pages/s, '
+             + str(round((stats['page_bytes']['mean'] or 0) / 1024)) + ' KB/page on average',
+             'stage'.ljust(30) + 'count'.rjust(8) + 'mean ms'.rjust(10) + 'p50 ms'.rjust(10) + 'p90 ms'.rjust(10) + 'max ms'.rjust(10) + 'total s'.rjust(10)]
+    for stage, histogram in sorted(stats['stages'].items(), key = lambda item: -item[1]['sum']):
+      lines.append(stage.ljust(30) + str(histogram['count']).rjust(8) + ms(histogram['mean']).rjust(10) + ms(histogram['p50']).rjust(10)
+                   + ms(histogram['p90']).rjust(10) + ms(histogram['max']).rjust(10) + str(round(histogram['sum'], 2)).rjust(10))
+    return '\n'.join(lines)
+
+
+# Given : A number of seconds (or None), returns it in milliseconds as text
+def ms(seconds):
+  return '-' if seconds is None else str(round(seconds * 1000, 2))
+
+# Given : A metric name, a Histogram and the labels to put in front of 'le' (e.g. 'stage="parse",')
+# Returns : The Prometheus lines for it (cumulative buckets, then _sum and _count)
+def prometheus_histogram(name, histogram, labels):
+  lines = []
+  cumulative = 0
+  for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+    cumulative = cumulative + count
+    lines.append(name + '_bucket{' + labels + 'le="' + str(bound) + '"} ' + str(cumulative))
+  lines.append(name + '_sum' + ('{' + labels.rstrip(',') + '}' if labels else '') + ' ' + repr(histogram.sum))
+  lines.append(name + '_count' + ('{' + labels.rstrip(',') + '}' if labels else '') + ' ' + str(histogram.count))
+  return lines
+
+
+# The extract_* helpers as extract_fields_by_helpers() calls them, so each one can be timed on its own
+HELPER_CALLS = [
+  ('extract_requirements', lambda soup, url: extract_requirements(soup.find('div', {'class': 'game_area_sys_req_leftCol'}).find_all('li'), [1] * 18)),
+  ('extract_steam_title', lambda soup, url: extract_steam_title(soup)),
+  ('extract_price', lambda soup, url: extract_price(soup.find("div", {"class": "game_purchase_price price"}), soup)),
+  ('extract_app_id', lambda soup, url: extract_app_id(url)),
+  ('extract_info', lambda soup, url: extract_info(soup)),
+  ('extract_date', lambda soup, url: extract_date(soup)),
+  ('extract_user_tags', lambda soup, url: extract_user_tags(soup)),
+  ('extract_all_review_summary', lambda soup, url: extract_all_review_summary(soup)),
+  ('extract_review_count', lambda soup, url: extract_review_count(soup)),
+  ('extract_current_rating', lambda soup, url: extract_current_rating(soup)),
+  ('extract_best_rating', lambda soup, url: extract_best_rating(soup)),
+  ('extract_worst_rating', lambda soup, url: extract_worst_rating(soup)),
+]
+
+# Given : A soup, its url and a Metrics, runs every extract_* helper on it and times each one
+def profile_helpers(steamed_soup, steam_url, metrics):
+  for name, call in HELPER_CALLS:
+    start = time.perf_counter()
+    try:
+      call(steamed_soup, steam_url)
+    except Exception: # Same as in extract_fields_by_helpers(), a page without the block still took the time to look
+      pass
+    metrics.observe(name, time.perf_counter() - start)
+
+
+# Drop-in for extract_page (fetch.crawl(parse = InstrumentedParse(metrics))) that times 'parse' and 'extract',
+# and with helpers = True each extract_* helper too. Returns (spec_list, statuses) like extract_page_detailed(), so
+# the crawl's field_stats still get counted
+class InstrumentedParse:
+  def __init__(self, metrics, backend = None, helpers = False):
+    self.metrics = metrics
+    self.backend = backend
+    self.helpers = helpers
+
+  def __call__(self, response_steam_page, steam_url):
+    with self.metrics.timer('parse'):
+      steamed_soup = make_soup(response_steam_page, self.backend)
+    with self.metrics.timer('extract'):
+      spec_list, statuses = extract_fields_detailed(steamed_soup, steam_url)
+    if self.helpers:
+      profile_helpers(steamed_soup, steam_url, self.metrics)
+    return spec_list, statuses
+
+
+# An executor that runs what it's given straight away on the calling thread (so that cProfile sees it)
+class InlineExecutor(concurrent.futures.Executor):
+  def submit(self, function, *args, **kwargs):
+    future = concurrent.futures.Future()
+    try:
+      future.set_result(function(*args, **kwargs))
+    except Exception as e:
+      future.set_exception(e)
+    return future
+
+
+# Profiles the code in the with block with cProfile, then prints the `top` most expensive functions
+# (sorted by `sort`) and, given a path, saves the full profile there (open it with pstats or snakeviz)
+@contextlib.contextmanager
+def profiled(path = None, sort = 'cumulative', top = 25):
+  profiler = cProfile.Profile()
+  profiler.enable()
+  try:
+    yield profiler
+  finally:
+    profiler.disable()
+    if path is not None:
+      profiler.dump_stats(path)
+    pstats.Stats(profiler).sort_stats(sort).print_stats(top)
@@ -0,0 +1,194 @@
+# On-disk cache of raw store pages, so that re-running the extraction never has to download the catalog again.
+#
+# Layout of the cache folder:
+#   index.sqlite         : one row per app_id -> which blob holds its page, plus the ETag / Last-Modified of the response
+#   blobs/ab/abcd....gz  : the compressed pages, named after the sha256 of the page (so identical pages are stored once)
+# Pages are compressed with zstd when the zstandard package is installed, gzip otherwise.
+#
+# Eviction: entries older than max_age seconds are dropped, then the least recently used ones until the blobs
+# take less than max_bytes on disk. It runs whenever evict() is called (put() calls it every `evict_every` puts).
+#
+# Usage:
+#   cache = PageCache('page_cache', ttl = 7 * 24 * 3600)
+#   cache.put(app_id, url, page, etag = ..., last_modified = ...)
+#   entry = cache.get(app_id)   -> CachedPage, or None
+#   cache.is_fresh(entry)       -> True if it was fetched less than ttl seconds ago
+
+import gzip
+import hashlib
+import os
+import sqlite3
+import time
+from collections import namedtuple
+
+try:
+  import zstandard
+except ImportError:
+  zstandard = None
+
+CachedPage = namedtuple('CachedPage', ['app_id', 'url', 'page', 'etag', 'last_modified', 'fetched_at', 'complete'])
+
+# How the crawl uses the cache (see fetch.crawl):
+#   'cache-first' : use the cached page if it's fresh, download it otherwise
+#   'cache-only'  : never download, pages that aren't cached fail with CacheMiss
+#   'refresh'     : always download, and replace what's cached
+#   'conditional' : ask the store whether the cached page changed (If-None-Match / If-Modified-Since), download only if it did
+CACHE_MODES = ('cache-first', 'cache-only', 'refresh', 'conditional')
+
+
+# Raised in 'cache-only' mode for a page that isn't cached
+class CacheMiss(KeyError):
+  pass
+
+
+# Given : A page (bytes) returns it compressed, and the file suffix of the compression used
+def compress(page):
+  if zstandard is not None:
+    return zstandard.ZstdCompressor(level = 10).compress(page), '.zst'
+  return gzip.compress(page, compresslevel = 6), '.gz'
+
+# Given : The compressed bytes and the file suffix they were stored with, returns the page
+def decompress(data, suffix):
+  if suffix == '.zst':
+    return zstandard.ZstdDecompressor().decompress(data)
+  return gzip.decompress(data)
+
+# Given : The path of a blob in the cache, returns the page stored in it
+def read_blob(path):
+  with open(path, 'rb') as blob_file:
+    return decompress(blob_file.read(), os.path.splitext(path)[1])
+
+
+class PageCache:
+  # root        : Folder of the cache (made if missing)
+  # ttl         : Seconds a cached page counts as fresh (None: forever)
+  # max_age     : Entries older than this many seconds are evicted (None: never)
+  # max_bytes   : Max size of the blobs on disk, least recently used pages are evicted past this (None: no limit)
+  def __init__(self, root = 'page_cache', ttl = None, max_age = None, max_bytes = None, evict_every = 500):
+    self.root = root
+    self.ttl = ttl
+    self.max_age = max_age
+    self.max_bytes = max_bytes
+    self.evict_every = evict_every
+    self.puts_since_evict = 0
+    os.makedirs(os.path.join(root, 'blobs'), exist_ok = True)
+    self.db = sqlite3.connect(os.path.join(root, 'index.sqlite'))
+    self.db.execute('''CREATE TABLE IF NOT EXISTS pages (
+                         app_id TEXT PRIMARY KEY, url TEXT, blob TEXT, stored_bytes INTEGER, page_bytes INTEGER,
+                         etag TEXT, last_modified TEXT, fetched_at REAL, accessed_at REAL, complete INTEGER)''')
+    self.db.commit()
+
+  def close(self):
+    self.db.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  def __len__(self):
+    return self.db.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+
+  # Given : A blob name (sha256 + suffix), returns where it lives on disk
+  def blob_path(self, blob):
+    return os.path.join(self.root, 'blobs', blob[:2], blob)
+
+  # Returns : Every cached app_id
+  def app_ids(self):
+    return [row[0] for row in self.db.execute('SELECT app_id FROM pages ORDER BY app_id')]
+
+  # Returns : (app_id, url, blob path) of every cached page, ordered by app_id. The blob can be read back
+  #   with read_blob(), which lets other processes load pages without going through this index
+  def entries(self):
+    return [(app_id, url, self.blob_path(blob)) for app_id, url, blob in
+            self.db.execute('SELECT app_id, url, blob FROM pages ORDER BY app_id')]
+
+  # Given : An app_id
+  # Returns : Its CachedPage, or None if it isn't cached (or its blob went missing)
+  def get(self, app_id):
+    row = self.db.execute('SELECT url, blob, etag, last_modified, fetched_at, complete FROM pages WHERE app_id = ?',
+                          (str(app_id),)).fetchone()
+    if row is None:
+      return None
+    url, blob, etag, last_modified, fetched_at, complete = row
+    try:
+      page = read_blob(self.blob_path(blob))
+    except FileNotFoundError:
+      self.delete(app_id)
+      return None
+    self.db.execute('UPDATE pages SET accessed_at = ? WHERE app_id = ?', (time.time(), str(app_id)))
+    self.db.commit()
+    return CachedPage(str(app_id), url, page, etag, last_modified, fetched_at, bool(complete))
+
+  # Given : A CachedPage, returns True if it was fetched less than ttl seconds ago
+  def is_fresh(self, entry):
+    return self.ttl is None or time.time() - entry.fetched_at < self.ttl
+
+  # Stores the page of an app_id (replacing what was there). complete is False for pages that were only partly read
+  def put(self, app_id, url, page, etag = None, last_modified = None, complete = True):
+    data, suffix = compress(page)
+    blob = hashlib.sha256(page).hexdigest() + suffix
+    path = self.blob_path(blob)
+    if not os.path.exists(path): # Same page already stored under another app_id (or an earlier fetch)
+      os.makedirs(os.path.dirname(path), exist_ok = True)
+      with open(path + '.tmp', 'wb') as blob_file:
+        blob_file.write(data)
+      os.replace(path + '.tmp', path)
+
+    old = self.db.execute('SELECT blob FROM pages WHERE app_id = ?', (str(app_id),)).fetchone()
+    now = time.time()
+    self.db.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (str(app_id), url, blob, len(data), len(page), etag, last_modified, now, now, int(complete)))
+    self.db.commit()
+    if old is not None and old[0] != blob:
+      self.drop_blob_if_unused(old[0])
+
+    self.puts_since_evict = self.puts_since_evict + 1
+    if self.puts_since_evict >= self.evict_every:
+      self.evict()
+
+  # A 304 Not Modified means the cached page is still good: count it as fetched now
+  def touch(self, app_id):
+    now = time.time()
+    self.db.execute('UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE app_id = ?', (now, now, str(app_id)))
+    self.db.commit()
+
+  # Removes an app_id from the cache. Returns True if that freed its blob on disk
+  def delete(self, app_id):
+    row = self.db.execute('SELECT blob FROM pages WHERE app_id = ?', (str(app_id),)).fetchone()
+    self.db.execute('DELETE FROM pages WHERE app_id = ?', (str(app_id),))
+    self.db.commit()
+    return row is not None and self.drop_blob_if_unused(row[0])
+
+  # Given : A blob name, deletes it from disk unless another app_id still points at it. Returns True if deleted
+  def drop_blob_if_unused(self, blob):
+    if self.db.execute('SELECT 1 FROM pages WHERE blob = ? LIMIT 1', (blob,)).fetchone() is not None:
+      return False
+    try:
+      os.remove(self.blob_path(blob))
+    except FileNotFoundError:
+      pass
+    return True
+
+  # Drops the entries older than max_age, then the least recently used ones until the blobs fit in max_bytes
+  # Returns : How many entries were evicted
+  def evict(self):
+    self.puts_since_evict = 0
+    evicted = []
+    if self.max_age is not None:
+      cutoff = time.time() - self.max_age
+      evicted = [row[0] for row in self.db.execute('SELECT app_id FROM pages WHERE fetched_at < ?', (cutoff,))]
+      for app_id in evicted:
+        self.delete(app_id)
+
+    if self.max_bytes is not None:
+      # Blobs shared by several app_ids only take space once
+      total = self.db.execute('SELECT COALESCE(SUM(stored_bytes), 0) FROM (SELECT DISTINCT blob, stored_bytes FROM pages)').fetchone()[0]
+      for app_id, stored_bytes in self.db.execute('SELECT app_id, stored_bytes FROM pages ORDER BY accessed_at').fetchall():
+        if total <= self.max_bytes:
+          break
+        if self.delete(app_id):
+          total = total - stored_bytes
+        evicted.append(app_id)
+    return len(evicted)
@@ -0,0 +1,141 @@
+# HTML parser backends for the extraction helpers in extract.py.
+#
+# BeautifulSoup's own "html.parser" is pure Python and is the slowest option, but it is always available,
+# so it stays the fallback. Faster backends are used when they're installed:
+#   'lxml'        : BeautifulSoup on top of the lxml (libxml2) tree builder. The extract_* helpers run unchanged
+#   'selectolax'  : selectolax's lexbor parser, wrapped in SelectolaxTag so that it looks like a bs4 tag to the
+#                   extract_* helpers (only the small part of the bs4 API that the helpers use)
+#   'html.parser' : BeautifulSoup with Python's html.parser
+#
+# Usage:
+#   steamed_soup = make_soup(response_steam_page)                 (fastest backend installed)
+#   steamed_soup = make_soup(response_steam_page, 'html.parser')  (a specific one)
+
+import bs4
+
+try:
+  import lxml # Only needed by bs4 for the 'lxml' tree builder
+except ImportError:
+  lxml = None
+
+try:
+  from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+  try:
+    from selectolax.parser import HTMLParser as SelectolaxParser
+  except ImportError:
+    SelectolaxParser = None
+
+
+# Given : The attribute filters of a bs4 find() call (as a dict, plus any keyword arguments such as id = ...)
+# Returns : The same filter as a CSS selector string (selectolax can only search with CSS)
+def to_css_selector(name, attrs):
+  selector = name if isinstance(name, str) else ''
+  for attr, value in attrs.items():
+    value = str(value).replace('\\', '\\\\').replace("'", "\\'")
+    if attr == 'class' and ' ' not in value:
+      selector = selector + "[class~='" + value + "']" # bs4 matches a single class against any of the tag's classes
+    else:
+      selector = selector + '[' + attr + "='" + value + "']"
+  return selector or '*'
+
+
+# Makes a selectolax node look like a bs4 tag to the extract_* helpers:
+#   find(), find_all(), get_text(), .text, .name, .get(), tag['attr'], .descendants and iterating over the children
+#   (plus css_first() / css(), which extract.select_fields() uses instead of walking the tree)
+# Text nodes come back as plain strings, like bs4's NavigableString
+class SelectolaxTag:
+  __slots__ = ('node',)
+
+  def __init__(self, node):
+    self.node = node
+
+  @property
+  def name(self):
+    return self.node.tag
+
+  # bs4 gives back the class attribute as a list of classes
+  def get(self, attr, default = None):
+    value = self.node.attributes.get(attr, default)
+    if attr == 'class' and isinstance(value, str):
+      return value.split()
+    return value
+
+  def __getitem__(self, attr):
+    value = self.get(attr)
+    if value is None:
+      raise KeyError(attr)
+    return value
+
+  def get_text(self):
+    return self.node.text(deep = True)
+
+  @property
+  def text(self):
+    return self.get_text()
+
+  def __iter__(self):
+    for child in self.node.iter(include_text = True):
+      yield wrap(child)
+
+  @property
+  def descendants(self):
+    nodes = self.node.traverse(include_text = True)
+    next(nodes, None) # traverse() starts with the node itself
+    for child in nodes:
+      yield wrap(child)
+
+  def find(self, name = None, attrs = None, **kwargs):
+    match = self.node.css_first(to_css_selector(name, dict(attrs or {}, **kwargs)))
+    return None if match is None else SelectolaxTag(match)
+
+  def find_all(self, name = None, attrs = None, **kwargs):
+    return [SelectolaxTag(match) for match in self.node.css(to_css_selector(name, dict(attrs or {}, **kwargs)))]
+
+  # Given : A CSS selector string (see to_css_selector()), lexbor runs it in C, much faster than walking the tree in Python
+  # Returns : The first matching tag (or None) / every matching tag, in page order
+  def css_first(self, selector):
+    match = self.node.css_first(selector)
+    return None if match is None else SelectolaxTag(match)
+
+  def css(self, selector):
+    return [SelectolaxTag(match) for match in self.node.css(selector)]
+
+# Given : A selectolax node, returns a string for text nodes and a SelectolaxTag for anything else
+# Text nodes become NavigableStrings, so that (like in a real bs4 tree) their .name is None
+def wrap(node):
+  if node.tag == '-text':
+    return bs4.NavigableString(node.text(deep = False))
+  return SelectolaxTag(node)
+
+
+# Given : The raw bytes of a page
+# Returns : The root of the parsed page, for each backend
+def parse_html_parser(page):
+  return bs4.BeautifulSoup(page, features="html.parser")
+
+def parse_lxml(page):
+  return bs4.BeautifulSoup(page, features="lxml")
+
+def parse_selectolax(page):
+  return SelectolaxTag(SelectolaxParser(page).root)
+
+
+# Backend name -> parse function, fastest first. Only the installed ones are listed
+PARSER_BACKENDS = {}
+if SelectolaxParser is not None:
+  PARSER_BACKENDS['selectolax'] = parse_selectolax
+if lxml is not None:
+  PARSER_BACKENDS['lxml'] = parse_lxml
+PARSER_BACKENDS['html.parser'] = parse_html_parser
+
+DEFAULT_BACKEND = next(iter(PARSER_BACKENDS))
+
+
+# Given : The raw bytes of a page and the name of a backend (None for the fastest one installed)
+# Returns : The parsed page, ready for the extract_* helpers
+def make_soup(page, backend = None):
+  backend = backend or DEFAULT_BACKEND
+  if backend not in PARSER_BACKENDS:
+    raise ValueError('Parser backend ' + repr(backend) + ' is not installed. Available: ' + ', '.join(PARSER_BACKENDS))
+  return PARSER_BACKENDS[backend](page)
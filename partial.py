@@ -0,0 +1,193 @@
+# Partial-document reads of Steam store pages.
+#
+# extract_fields() only needs the header, the purchase block, the details block, the minimum requirements and the
+# microdata meta tags, but a store page goes on for hundreds of KB after those (reviews, recommendations, ...).
+# Here the page is read in chunks and fed to an incremental parser that only watches for those blocks.
+# As soon as every one of them has been seen (and closed), we stop reading and parse just what we have.
+# Pages missing one of the blocks (no system requirements, for example) are simply read to the end.
+#
+# Usage:
+#   spec_list, stats = scrape_partial(steam_url)
+#   stats -> {'bytes_read' : ..., 'bytes_total' : ..., 'complete' : ..., 'parse_seconds' : ..., 'parse_seconds_saved' : ...}
+
+import codecs
+import time
+import urllib.request
+from html.parser import HTMLParser
+
+from extract import extract_fields
+from parsers import make_soup
+
+try:
+  from lxml import etree
+except ImportError:
+  etree = None
+
+CHUNK_SIZE = 16 * 1024
+
+# The <meta itemprop=...> tags extract_fields() needs
+WANTED_METAS = {'reviewCount', 'ratingValue', 'bestRating', 'worstRating'}
+
+
+# Given : The tag name and a get(attr) function for the tag's attributes
+# Returns : Which of the blocks we're waiting for this tag starts (None if it's none of them)
+def block_started(name, get):
+  if get('id') == 'genresAndManufacturer':
+    return 'info'
+  if name != 'div':
+    return None
+  if get('id') == 'appHubAppName':
+    return 'title'
+  classes = (get('class') or '').split()
+  if 'popular_tags' in classes:
+    return 'tags'
+  if 'date' in classes:
+    return 'date'
+  if 'game_area_sys_req_leftCol' in classes:
+    return 'sys_req'
+  if classes == ['game_purchase_price', 'price'] or 'discount_original_price' in classes:
+    return 'price'
+  return None
+
+
+# Keeps track of which blocks have been read in full, from the start/end tag events of an incremental parser
+class FieldWatcher:
+  BLOCKS = {'title', 'info', 'tags', 'date', 'sys_req', 'price'}
+
+  def __init__(self):
+    self.complete = set() # Blocks that have been closed
+    self.metas = set()    # Wanted itemprops seen so far
+    self.open = []        # [block, tag name, depth] for every block still open
+
+  def start(self, name, get):
+    for entry in self.open: # Count nested tags of the same name, so we know which end tag closes the block
+      if entry[1] == name:
+        entry[2] = entry[2] + 1
+    if name == 'meta':
+      itemprop = get('itemprop')
+      if itemprop in WANTED_METAS:
+        self.metas.add(itemprop)
+      return
+    block = block_started(name, get)
+    if block is not None and block not in self.complete:
+      self.open.append([block, name, 1])
+
+  def end(self, name):
+    for entry in list(self.open):
+      if entry[1] == name:
+        entry[2] = entry[2] - 1
+        if entry[2] == 0:
+          self.complete.add(entry[0])
+          self.open.remove(entry)
+
+  @property
+  def done(self):
+    return len(self.metas) == len(WANTED_METAS) and self.complete >= self.BLOCKS
+
+
+# Incremental parser feeding a FieldWatcher, built on lxml's pull parser (fast, takes bytes)
+class LxmlFeeder:
+  def __init__(self, watcher):
+    self.watcher = watcher
+    self.parser = etree.HTMLPullParser(events = ('start', 'end'))
+
+  def feed(self, chunk):
+    self.parser.feed(chunk)
+    for event, element in self.parser.read_events():
+      if not isinstance(element.tag, str): # Comments, processing instructions
+        continue
+      if event == 'start':
+        self.watcher.start(element.tag, element.get)
+      else:
+        self.watcher.end(element.tag)
+
+# Incremental parser feeding a FieldWatcher, built on Python's html.parser (always available, takes text)
+class StdlibFeeder(HTMLParser):
+  def __init__(self, watcher):
+    super().__init__(convert_charrefs = True)
+    self.watcher = watcher
+    self.decoder = codecs.getincrementaldecoder('utf-8')(errors = 'replace')
+
+  def feed(self, chunk):
+    super().feed(self.decoder.decode(chunk))
+
+  def handle_starttag(self, tag, attrs):
+    self.watcher.start(tag, dict(attrs).get)
+
+  def handle_endtag(self, tag):
+    self.watcher.end(tag)
+
+def make_feeder(watcher):
+  return LxmlFeeder(watcher) if etree is not None else StdlibFeeder(watcher)
+
+
+# Given : An iterator over the chunks (bytes) of a page
+# Returns : (the bytes read, True if the whole page had to be read)
+def read_until_fields(chunks):
+  watcher = FieldWatcher()
+  feeder = make_feeder(watcher)
+  read = []
+  for chunk in chunks:
+    read.append(chunk)
+    feeder.feed(chunk)
+    if watcher.done:
+      return b''.join(read), False
+  return b''.join(read), True
+
+# Same as read_until_fields(), for an async iterator of chunks (such as aiohttp's response.content.iter_chunked())
+async def read_until_fields_async(chunks):
+  watcher = FieldWatcher()
+  feeder = make_feeder(watcher)
+  read = []
+  async for chunk in chunks:
+    read.append(chunk)
+    feeder.feed(chunk)
+    if watcher.done:
+      return b''.join(read), False
+  return b''.join(read), True
+
+
+# Given : A response object (urllib or http.client) returns an iterator over its body, chunk by chunk
+def iter_response(response, chunk_size = CHUNK_SIZE):
+  while True:
+    chunk = response.read(chunk_size)
+    if not chunk:
+      return
+    yield chunk
+
+# Given : The Content-Length header (or None) of a response and whether it was compressed on the wire
+# Returns : The size of the full page in bytes, or None if it can't be known from the headers
+def page_size(content_length, content_encoding = None):
+  if content_length is None or content_encoding not in (None, 'identity'):
+    return None # The header would count compressed bytes, while we count decompressed ones
+  return int(content_length)
+
+
+# Given : The bytes read of a page (possibly cut short), whether that's the whole page, the size of the
+#   whole page (None if unknown) and how long parsing + extracting the bytes read took
+# Returns : The stats of the page: how much was read and roughly how much parse time that saved.
+#   The saving is an estimate: parse time grows about linearly with page size, so the full page is assumed
+#   to take bytes_total / bytes_read times as long as the part we parsed
+def partial_stats(page, complete, bytes_total, parse_seconds):
+  if complete and bytes_total is None:
+    bytes_total = len(page)
+  saved = None
+  if bytes_total and len(page):
+    saved = parse_seconds * max(bytes_total - len(page), 0) / len(page)
+  return {'bytes_read' : len(page), 'bytes_total' : bytes_total, 'complete' : complete,
+          'parse_seconds' : parse_seconds, 'parse_seconds_saved' : saved}
+
+# Given : The bytes read of a page (possibly cut short), the url, whether that's the whole page and its full size
+# Returns : (spec_list, stats), see partial_stats()
+def extract_partial(page, steam_url, complete, bytes_total = None, backend = None):
+  start = time.perf_counter()
+  spec_list = extract_fields(make_soup(page, backend), steam_url)
+  return spec_list, partial_stats(page, complete, bytes_total, time.perf_counter() - start)
+
+# Given : A steam url
+# Returns : (spec_list, stats), downloading only as much of the page as extract_fields() needs
+def scrape_partial(steam_url, backend = None, chunk_size = CHUNK_SIZE):
+  with urllib.request.urlopen(steam_url) as response:
+    bytes_total = page_size(response.headers.get('Content-Length'), response.headers.get('Content-Encoding'))
+    page, complete = read_until_fields(iter_response(response, chunk_size))
+  return extract_partial(page, steam_url, complete, bytes_total, backend)
@@ -0,0 +1,80 @@
+# Re-extraction of the pages in the page cache, spread over several processes.
+#
+# Once the pages are in page_cache/ (see page_cache.py), running the extraction again (say, after changing one of the
+# extract_* helpers) is purely CPU work, and parsing 4k+ pages on one core is slow. Here the cached pages are split
+# into chunks, each worker process reads, decompresses, parses and extracts a whole chunk at a time, and the rows
+# come back in app_id order as the chunks finish.
+#
+# Usage (from the command line):
+#   python reextract.py page_cache steam_hardware_data_v5_UNCLEAN.csv --workers 4
+# Usage (from python):
+#   hw_df, errors = reextract_df(PageCache('page_cache'), workers = 4)
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from extract import extract_page, HW_COLUMNS
+from page_cache import PageCache, read_blob
+
+CHUNK_SIZE = 32
+
+
+# Given : A list of (app_id, url, blob path) and the parser backend to use
+# Returns : A list of (app_id, spec_list, error) for the chunk, error being the name of the exception (or None)
+# This is what runs in the worker processes. Only paths go in and rows come out, so little is pickled either way
+def extract_chunk(entries, backend = None):
+  results = []
+  for app_id, url, blob_path in entries:
+    try:
+      results.append((app_id, extract_page(read_blob(blob_path), url, backend), None))
+    except Exception as e:
+      results.append((app_id, None, type(e).__name__ + ': ' + str(e)))
+  return results
+
+
+# Given : A list of (app_id, url, blob path) (see PageCache.entries())
+# Yields : (app_id, spec_list, error) for every entry, in the same order, as soon as its chunk is done
+# workers    : Number of processes (None for one per core, 1 runs everything in this process)
+# chunk_size : Pages handed to a worker at a time
+def reextract_entries(entries, workers = None, chunk_size = CHUNK_SIZE, backend = None):
+  chunks = [entries[i:i + chunk_size] for i in range(0, len(entries), chunk_size)]
+  if workers == 1:
+    for chunk in chunks:
+      yield from extract_chunk(chunk, backend)
+    return
+  with ProcessPoolExecutor(max_workers = workers) as executor:
+    for results in executor.map(extract_chunk, chunks, [backend] * len(chunks)):
+      yield from results
+
+
+# Given : A PageCache (plus any of reextract_entries()'s keyword arguments)
+# Returns : (hw_df, errors) like fetch.scrape_urls(), errors being a list of (app_id, error)
+def reextract_df(cache, **options):
+  list_of_specs = []
+  errors = []
+  for app_id, spec_list, error in reextract_entries(cache.entries(), **options):
+    if error is None:
+      list_of_specs.append(spec_list)
+    else:
+      errors.append((app_id, error))
+  return pd.DataFrame(list_of_specs, columns = HW_COLUMNS), errors
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description = 'Re-extract every page in the page cache')
+  parser.add_argument('cache_dir')
+  parser.add_argument('out_csv')
+  parser.add_argument('--workers', type = int, default = os.cpu_count())
+  parser.add_argument('--chunk-size', type = int, default = CHUNK_SIZE)
+  parser.add_argument('--backend', default = None)
+  options = parser.parse_args()
+
+  with PageCache(options.cache_dir) as cache:
+    hw_df, errors = reextract_df(cache, workers = options.workers, chunk_size = options.chunk_size, backend = options.backend)
+  for app_id, error in errors:
+    print("ERROR FOR APP : " + str(app_id) + " (" + error + ")")
+  hw_df.to_csv(options.out_csv)
+  print(str(len(hw_df)) + " rows written to " + options.out_csv)
@@ -0,0 +1,170 @@
+# Typed Arrow schemas for the scrape -> clean -> analysis handoff, and parquet read/write for each stage.
+#
+# Between stages the data used to go through csv, so every stage re-parsed strings, User Tags came back as the
+# string "['Indie', 'Horror']" and every file grew an 'Unnamed: 0' index column that the next notebook dropped.
+# With parquet, values come back with the types they were written with (User Tags as a list of strings).
+#
+#   RAW_SCHEMA   : rows as scraped (scrape.py -> clean.py)
+#   CLEAN_SCHEMA : rows after clean.py (clean.py -> analysis.py)
+#
+# Usage:
+#   write_stage(steam_df, 'Steam Data Clean v5 (Cleaned).parquet', CLEAN_SCHEMA)
+#   steam_df = read_stage('Steam Data Clean v5 (Cleaned)')   (the .parquet if there is one, else the .csv)
+#   for chunk in read_stage_chunks('steam_hardware_data_v5_UNCLEAN', 50000): ...   (same, a chunk of rows at a time)
+
+import ast
+import os
+import shutil
+
+import pandas as pd
+
+try:
+  import pyarrow as pa
+  import pyarrow.parquet as pq
+except ImportError:
+  pa = None
+
+if pa is not None:
+  RAW_SCHEMA = pa.schema([
+    ('Title', pa.string()),
+    ('Graphs', pa.string()),     # Hardware columns are the raw requirement text, '1' when the page had none
+    ('Memory', pa.string()),
+    ('OS', pa.string()),
+    ('Processor', pa.string()),
+    ('Storage', pa.string()),
+    ('app_id', pa.string()),
+    ('Original Price', pa.string()),
+    ('Developer', pa.string()),
+    ('Publisher', pa.string()),
+    ('Genre', pa.string()),
+    ('Release Date', pa.string()),
+    ('User Tags', pa.list_(pa.string())),
+    ('All Time Reception', pa.string()),
+    ('Total Count of Reviews', pa.int64()),
+    ('Rating', pa.int64()),
+    ('Best Rating', pa.int64()),
+    ('Worst Rating', pa.int64()),
+  ])
+
+  CLEAN_SCHEMA = pa.schema([
+    ('Title', pa.string()),
+    ('Graphs', pa.string()),
+    ('Memory', pa.float64()),    # GB
+    ('Processor', pa.string()),
+    ('Storage', pa.float64()),   # GB
+    ('app_id', pa.string()),
+    ('Original Price', pa.float64()),
+    ('Developer', pa.string()),
+    ('Publisher', pa.string()),
+    ('Genre', pa.string()),
+    ('Release Date', pa.timestamp('ns')),
+    ('User Tags', pa.list_(pa.string())),
+    ('All Time Reception', pa.string()),
+    ('Total Count of Reviews', pa.int64()),
+    ('Rating', pa.int64()),
+    ('CPU Vendor', pa.string()), # Read out of Processor / Graphs by hardware.py, null when the text doesn't say
+    ('CPU Family', pa.string()),
+    ('CPU Cores', pa.float64()),
+    ('CPU GHz', pa.float64()),
+    ('CPU Model', pa.string()),  # Model found in hardware_models.csv, and its approximate 0-100 score
+    ('CPU Score', pa.float64()),
+    ('GPU Vendor', pa.string()),
+    ('GPU Model', pa.string()),
+    ('GPU VRAM', pa.float64()),  # GB
+    ('GPU Tier', pa.int64()),    # 1 (integrated / old) to 5 (high end)
+    ('GPU Score', pa.float64()),
+  ])
+else:
+  RAW_SCHEMA = CLEAN_SCHEMA = None
+
+
+# Given : The User Tags of one row, as a list or as the string a csv stored it as ("['Indie', 'Horror']")
+# Returns : The tags as a list of strings (None if there's nothing)
+def as_tag_list(tags):
+  if tags is None or (isinstance(tags, float) and pd.isna(tags)):
+    return None
+  if isinstance(tags, str):
+    tags = ast.literal_eval(tags) if tags.startswith('[') else [tags]
+  return [str(tag) for tag in tags]
+
+# Given : A column of values and the Arrow type it should have
+# Returns : The column as an Arrow array of that type. Values that can't be converted become nulls
+def to_arrow_array(values, arrow_type):
+  values = pd.Series(values)
+  if pa.types.is_list(arrow_type):
+    return pa.array([as_tag_list(tags) for tags in values], type = arrow_type)
+  if pa.types.is_integer(arrow_type):
+    return pa.array(pd.to_numeric(values, errors = 'coerce').astype('Int64'), type = arrow_type)
+  if pa.types.is_floating(arrow_type):
+    return pa.array(pd.to_numeric(values, errors = 'coerce').astype('float64'), type = arrow_type)
+  if pa.types.is_timestamp(arrow_type):
+    return pa.array(pd.to_datetime(values, errors = 'coerce'), type = arrow_type)
+  return pa.array([None if pd.isna(value) else str(value) for value in values], type = arrow_type)
+
+# Given : A DataFrame (or a list of rows in the schema's column order) and a schema
+# Returns : A pyarrow Table with exactly the schema's columns and types
+def to_table(data, schema):
+  if not isinstance(data, pd.DataFrame):
+    data = pd.DataFrame(list(data), columns = schema.names)
+  return pa.table([to_arrow_array(data[field.name].values, field.type) for field in schema], schema = schema)
+
+
+# Given : A DataFrame, a .parquet path and a schema, writes the DataFrame to parquet with that schema
+# (replacing a folder of parts left at that path by a sink, see sinks.ParquetSink). A folder with anything else in it
+# is left alone, and raises FileExistsError
+def write_stage(df, path, schema):
+  if os.path.isdir(path):
+    others = [name for name in os.listdir(path) if not name.endswith('.parquet')]
+    if others:
+      raise FileExistsError(path + " is a folder with more than parquet parts in it (" + ', '.join(sorted(others)[:3])
+                            + "), not replacing it")
+    shutil.rmtree(path)
+  pq.write_table(to_table(df, schema), path)
+
+# Given : The path of a stage's output, with or without the extension
+# Returns : The path to read it from: the .parquet if there is one (a file or a folder of parts), else the .csv
+def stage_path(path):
+  stem, extension = os.path.splitext(path)
+  if extension not in ('.parquet', '.csv'):
+    stem, extension = path, ''
+  if extension != '.csv' and pa is not None and os.path.exists(stem + '.parquet'):
+    return stem + '.parquet'
+  return stem + '.csv'
+
+# Given : A DataFrame just read from a stage's output
+# Returns : It without a csv's 'Unnamed: 0' index column, and with User Tags turned back into lists
+def tidy_stage(df):
+  df = df.drop(columns = [column for column in df.columns if column.startswith('Unnamed: ')])
+  if 'User Tags' in df.columns:
+    df['User Tags'] = [as_tag_list(tags) for tags in df['User Tags']]
+  return df
+
+# Given : The path of a stage's output, with or without the extension
+# Returns : The DataFrame, from the .parquet if there is one (a file or a folder of parts), else from the .csv
+#   (without its 'Unnamed: 0' index column, and with User Tags turned back into lists)
+def read_stage(path):
+  path = stage_path(path)
+  if path.endswith('.parquet'):
+    return tidy_stage(pd.read_parquet(path))
+  return tidy_stage(pd.read_csv(path))
+
+# Given : The path of a stage's output (see read_stage()) and the number of rows per chunk
+# Yields : The stage's rows as DataFrames of at most chunksize rows, tidied like read_stage() does, with the index
+#   counting up across chunks. Only one chunk is in memory at a time
+def read_stage_chunks(path, chunksize = 50000):
+  path = stage_path(path)
+  if not path.endswith('.parquet'):
+    for chunk in pd.read_csv(path, chunksize = chunksize):
+      yield tidy_stage(chunk)
+    return
+  parts = [path]
+  if os.path.isdir(path):
+    parts = sorted(os.path.join(path, name) for name in os.listdir(path)
+                   if name.endswith('.parquet') and not name.startswith(('_', '.'))) # Like pd.read_parquet()
+  start = 0
+  for part in parts:
+    for batch in pq.ParquetFile(part).iter_batches(batch_size = chunksize):
+      chunk = batch.to_pandas()
+      chunk.index = pd.RangeIndex(start, start + len(chunk))
+      start = start + len(chunk)
+      yield tidy_stage(chunk)
@@ -10,7 +10,6 @@
 # %%
 # Imports
 import pandas as pd
-import bs4
 import urllib.request
 
 # %% [markdown]
@@ -48,298 +47,115 @@ url_set = set(URL_ARRAY) # Remove duplicates
 len(url_set)
 
 # %% [markdown]
-# The 'meat' of this scraper. The Steam Page Scraper, with it's extraction helper methods.
+# The 'meat' of this scraper. The Steam Page Scraper. The extraction helper methods live in `extract.py`, so that the fetch engine in `fetch.py` can use them too.
 
 # %%
-# Given a <div> tag containing the ORIGINAL price, will extract the numerical value from the div tag
-# Input Form : <div class="discount_original_price">$39.99</div> | Output: 39.99
-def extract_price(steam_page_price_div, steamed_soup):
-  price = -1; # -1 comes up if no price was found
-
-  # If the div-tage is empty...
-  if steam_page_price_div == None:
-    # ...the price is likely contained in another tag. Look for it and extract the price...
-    steam_page_price_div = steamed_soup.find("div", {"class": "discount_original_price"})
-
-  # Making the assumption that div tag has only one item
-  for item in steam_page_price_div:
-    # print(item)
-    price = item.strip()
-
-  return price
-
-# Given a Steam URL (for example, https://store.steampowered.com/app/1092790/Inscryption/)
-#   will extract the corresponding app_ID
-def extract_app_id(steam_url):
-  # Split by '/'
-  # https://store.steampowered.com/app/1092790/Inscryption/) <- App ID will be 5th element
-
-  forward_slash = steam_url.split('/')
-  return forward_slash[4]
-
-# Given bs4 object of a steam page
-#   Returns developer, publisher, genre as string
-def extract_info(steamed_soup):
-  everything = steamed_soup.find(id = 'genresAndManufacturer')
-
-  #Now here, I realized I could extract genre, Developer, Publisher/
-
-  # Developer
-  developer_name = ''
-  dev = everything.find('div', {'class' : 'dev_row'}).find('a')
-  for developer in dev: # Again, assuming there's only one developer 
-    developer_name = developer
-
-  # Publisher
-  # Get the list of div-tags of type 'dev_row'. 2nd one in list is publisher
-  publisher = everything.find_all('div', {'class' : 'dev_row'})
-
-  publisher_name = '' # Placeholder for publisher name
-  i = 0 # When i = 1, that's our location of the publisher
-  for item in publisher:
-    if i == 1: # Publisher name is the <a> tag in the second 'dev_row' <div> tag
-      for a_tag_value in item.find('a'): # Get the publisher a-tag
-        publisher_name = a_tag_value #Since each a-tag has only one list of publishers
-    i = i + 1 # Increment if i = 0
-  
-  # Genre
-  b_tags = steamed_soup.find('span', {'data-panel' : '{"flow-children":"row"}'}).find('a')
-  genre = b_tags.text
-  # print("~~~~~~~~~~~~~~~~ NEXT GAME~~~~~~~~~~~~~~~~~~")
-  return [developer_name,publisher_name,genre]
-
-
-  # Given a bs4 object a Steam Page, gets the release date
-def extract_date(steamed_soup):
-  date = steamed_soup.find('div' , {'class' : 'date'})
-  release_date = date.text
-  return release_date
-
-# Given a bs4 object of a steam page, gets the tags from'Popular user-defined tags for this product:' 
-def extract_user_tags(steamed_soup):
-  tag_list = ['']
-
-  # Get list of tags
-  tags = steamed_soup.find_all('a', {'class' : 'app_tag'})
-  tag_list = [''] * len(tags)  # Make an array for the tags
-  i = 0 # indexing for the array
-  for tag in tags:
-      tag_list[i] = tag.text.strip()
-      # print(tag.text.strip())
-      i = i + 1
-
-  # print("~~~~~~~~~~~~~~~~ NEXT GAME~~~~~~~~~~~~~~~~~~")
-  return tag_list
-
-def extract_all_review_summary(steamed_soup):
-  # Not all pages have this rating. Return 'N/A' if so
-  try :
-      e_a_r_s = steamed_soup.find('span', {'class' : 'game_review_summary positive'})
-      # print(e_a_r_s.text)
-      return e_a_r_s.text
-  except:
-    #  print('no rating found')
-     return 'N/A'
-  # print("~~~~~~~~~~~~~~~~ NEXT GAME~~~~~~~~~~~~~~~~~~")
-  return -1
-
- # Given a bs4 object of a Steam Page, gets the TOTAL review count (not recent)
-def extract_review_count(steamed_soup):
-  rev_count_tag = steamed_soup.find('meta', attrs={'itemprop': 'reviewCount'})
-  return rev_count_tag['content']
-
- # Given a bs4 object of a Steam Page, gets the current rating of the title
-def extract_current_rating(steamed_soup):
-  curr_rating = steamed_soup.find('meta', attrs={'itemprop': 'ratingValue'})
-  return curr_rating['content']
-
- # Given a bs4 object of a Steam Page, gets the best rating recieved
-def extract_best_rating(steamed_soup):
-  best_rating = steamed_soup.find('meta', attrs={'itemprop': 'bestRating'})
-  return best_rating['content']
-
- # Given a bs4 object of a Steam Page, gets the worst rating recieved
-def extract_worst_rating(steamed_soup):
-  worst_rating = steamed_soup.find('meta', attrs={'itemprop': 'worstRating'})
-  return worst_rating['content']
-
-
- # Given a bs4 object of a Steam Page, gets the game title
-def extract_steam_title(steamed_soup):
-  game_name = steamed_soup.find('div', {'id': 'appHubAppName'})
-  title = game_name.get_text()
-  return title
+from extract import extract_page
 
 # Given: A url (as string) of a particular page for a steam
 # Returns: A LIST consisting of the steam game info, for use with dataframe
 # This is the function for scraping ONE single steam page
 # If app_ID is -1, then app_ID isn't known
 def steam_scrape(steam_url, app_ID):
-    # Store specifications in a list
-    # For now we have an array of length 6. Adjust this size later when we add more parameters
-    spec_list = [1] * ( 18 ) # 6 original arguments, and the 12 extra for the app_ID, original price, etc
-    len(spec_list)
-
-    # Get the steam url response from urllib and parse it with BeautifulSoup
+    # Get the steam url response from urllib and hand it to the extraction helpers
     response_steam_page = urllib.request.urlopen(steam_url).read()
-    steamed_soup = bs4.BeautifulSoup(response_steam_page, features="html.parser")
-
-    # Get the div tag that stores the minimum requirements
-    # ul_minimum = steamed_soup.find('div', {'class': 'game_area_sys_req_leftCol'}).find_all('li')
-    ul_min = True # If ul_minimum tag was found
-    try: # look for game info
-      ul_minimum = steamed_soup.find('div', {'class': 'game_area_sys_req_leftCol'}).find_all('li')
-    except: # add NA if nothing found
-      ul_min = False
-      ul_minimum = ['Error:Error'] * 5 # Since this ul-minimum tag always has 5 items
-
-    # Extract corresponding information from this tag
-    # NOTE TO SELF: This could go into it's own function
-    for li in ul_minimum:
-      if ul_min:
-          requirement_pair = li.get_text().split(":")
-          # print(requirement_pair)
-          if 'OS' in requirement_pair:
-              # print(requirement_pair)
-              spec_list[3] = requirement_pair[1]
-              # specification_dict['OS'] = requirement_pair[1]
-          if 'Processor' in requirement_pair:
-              # print(requirement_pair)
-              spec_list[4] = requirement_pair[1]
-              # specification_dict['Processer'] = requirement_pair[1]
-          if 'Memory' in requirement_pair:
-              spec_list[2] = requirement_pair[1]
-              # specification_dict['Memory'] = requirement_pair[1]
-          if 'Graphics' in requirement_pair:
-              spec_list[1] = requirement_pair[1]
-              # specification_dict['Graphics'] = requirement_pair[1]
-          if 'Storage' in requirement_pair:
-              spec_list[5] = requirement_pair[1]
-              # specification_dict['Storage'] = requirement_pair[1]
-
-    # Get the title of the Steam Page
-    title = extract_steam_title(steamed_soup)
-
-    # Get the div tag that stores the original price of the game
-    # class="discount_original_price"
-    div_original_price = steamed_soup.find("div", {"class": "game_purchase_price price"})
-
-    # Not all steam pages will have the div-tag of class 'game_purchase_price price'
-    # In such a case, we fall back on finding other possible tags in the steamed_soup
-    # Pass a reference to steamed_soup to this function so that we may look for other tags, if needed.
-    price = extract_price(div_original_price, steamed_soup)
-
-    # App_ID is -1 if none found. Otherwise, we extract it here
-    app_ID = extract_app_id(steam_url)
-
-    # Developer, Publisher, Genre
-    developer,publisher,genre = extract_info(steamed_soup)
-
-    # Release Date
-    release_date = extract_date(steamed_soup)
-
-    # User Tags
-    user_tags = extract_user_tags(steamed_soup)
-
-    # All-Time Review Rating (as string)
-    all_time_reception = extract_all_review_summary(steamed_soup)
-
-    # 'Microdata' (Review Count, Current Rating Value, Best Rating, Worst Rating)
-    all_review_count = extract_review_count(steamed_soup)
-
-    # Current Rating Value
-    current_Rating = extract_current_rating(steamed_soup)
-
-    # Best Rating recieved
-    best_rating = extract_best_rating(steamed_soup)
-
-    # Worst Rating recieved
-    worst_rating = extract_worst_rating(steamed_soup)
-
-    #________________ Store the scraped info _____________
-
-    # Store the title
-    spec_list[0] = title
-
-    # Store the app_id
-    spec_list[6] = str(app_ID) # Add the app_ID as string to avoid any Int-String type mismatch issues
-
-    # store price
-    spec_list[7] = price
-
-    # Store developer
-    spec_list[8] = developer
-
-    # Store Publisher
-    spec_list[9] = publisher
-
-    # Store Genre
-    spec_list[10] = genre
-
-    # Store release date
-    spec_list[11] = release_date
-
-    # User tags
-    spec_list [12] = user_tags
-
-    # Store All Time Reception (Mostly Positive, Mixed, etc)
-    spec_list[13] = all_time_reception
-
-    # Store 'ALL Review Count'
-    spec_list[14] = all_review_count
-
-    # Rating 
-    spec_list[15] = current_Rating
-
-    # Best Rating Recieved
-    spec_list[16] = best_rating
-
-    # Worst Rating Recieved
-    spec_list[17] = worst_rating
-
-    return spec_list
+    return extract_page(response_steam_page, steam_url)
 
 # %% [markdown]
 # Run the actual scraping process, with the functions defined above, then store in a df
 # 
 # We note that not all Steam links are scrapable, so we print out any links that couldn't be scraped. In the full scrape, there wasn't enough unscrapable entries to cause worry. Don't remember the exact figure, but it was around 30-80 entries, which is a very acceptable loss in a data set of ~4,388 entries.
 
+# %% [markdown]
+# The pages are fetched concurrently by the engine in `fetch.py` (a pool of asyncio workers sharing one keep-alive connection pool, with a per-host rate limit) and each page goes through `extract_page`, same as `steam_scrape` above. Set `limit = None` for the full crawl.
+# 
+# With `partial = True`, each page is only downloaded up to the end of the blocks we extract from (see `partial.py`), and `page_stats` tells us how many bytes that saved.
+# 
+# Every downloaded page is also saved (compressed) in `page_cache/`, so that re-running the extraction after changing the helpers doesn't download the catalog again. `cache_mode` is one of:
+# * `'cache-first'` : use cached pages that are less than a week old, download the rest
+# * `'cache-only'` : never download, only re-extract what's cached
+# * `'refresh'` : download everything again
+# * `'conditional'` : only download the pages that changed since they were cached (ETag / Last-Modified)
+# 
+# A partly read page is cached as such, and can't be re-extracted for fields past where we stopped reading, so `partial` is off while we cache.
+
+# %% [markdown]
+# The crawl keeps its progress in `crawl_state.sqlite` (see `crawl_state.py`): rows are written to `out_csv` (see `sinks.py`, a `.jsonl` or `.parquet` path works too, and a `.parquet` keeps the types from `schema.RAW_SCHEMA` for clean.py) 50 pages at a time, and those urls are marked as done as the file is flushed. If the run stops halfway, the rows not written yet are dropped, and running this cell again picks up the urls that aren't done yet (without writing any row twice). Urls that failed keep the class of the exception, so we know *why* they failed (set `retry_failed = True` to give them another go).
+
+# %% [markdown]
+# A page missing a block (no system requirements, no review summary, a developer row without a link...) is still kept: only the fields it lacks keep their placeholder (`1` for the hardware, `-1` for the price, `'N/A'` for the reception, empty otherwise). `field_stats` counts, for every column, how many pages had it (`ok`), didn't (`missing`) or had it in a shape we can't read (`error`). Pages that aren't store pages at all (an age gate, an error page) still fail, as `NotAStorePage`.
+#
+# `crawl_metrics` times every stage of the crawl (DNS / connect / time to first byte / download, and the parsing), so we can tell whether a slow crawl is waiting on the store or on our parsing. `crawl_metrics.to_json(path)` / `crawl_metrics.to_prometheus(path)` export it. To time each `extract_*` helper, pass `parse = metrics.InstrumentedParse(crawl_metrics, helpers = True)`, and for a cProfile of the whole thing, run it inside `with metrics.profiled():` (see `metrics.py`).
+
 # %%
+import itertools
+import fetch
+from crawl_state import CrawlQueue
+from page_cache import PageCache
+from metrics import Metrics
+from extract import FieldStats
+
 limit = 50
+partial = False
+retry_failed = False
+cache_mode = 'cache-first'
+cache = PageCache('page_cache', ttl = 7 * 24 * 3600, max_bytes = 2 * 1024 ** 3)
 
-# Get a list of scrapes from a list of steam pages
-list_of_specs = []  # A List of steam page items. Each steam page item is a list containing hardware + other info
-# Build the data from list
-i = 0
-for item in url_set:
-    if i > 50:
-      break
-    
-    try:
-      steam_page_info = steam_scrape(item, -1) # Just put -1 as a placeholder.
-      list_of_specs.append(steam_page_info)
-    except:
-      print("ERROR FOR URL : "  + str(item))
+# v5 means using v3 of steam_links data with v4 of scraping script
+out_csv = 'steam_hardware_data_demonstration.csv'
+
+# Queue up the urls (ones already in the queue are left as they are)
+queue = CrawlQueue('crawl_state.sqlite')
+queue.add(itertools.islice(url_set, limit))
+
+# Build the data from the queue, writing rows to out_csv as we go (nothing piles up in memory)
+page_stats = []
+crawl_metrics = Metrics()
+field_stats = FieldStats()
+counts = fetch.scrape_resumable(queue, out_csv, flush_every = 50, retry_failed = retry_failed,
+                                concurrency = 16, per_host_rate = 10, partial = partial, page_stats = page_stats,
+                                cache = cache, cache_mode = cache_mode, metrics = crawl_metrics,
+                                field_stats = field_stats)
+print(counts)
+print(queue.error_counts())
+print(crawl_metrics.summary())
+print(field_stats.summary())
+
+if partial:
+  bytes_read = sum(stats['bytes_read'] for url, stats in page_stats)
+  print("Read " + str(bytes_read) + " bytes over " + str(len(page_stats)) + " pages")
 
-# Construct our dataframe
-hw_df = pd.DataFrame(list_of_specs, columns=["Title", "Graphs", "Memory", "OS", "Processor", "Storage","app_id", "Original Price", "Developer","Publisher","Genre",\
-                                             "Release Date", "User Tags", "All Time Reception", "Total Count of Reviews", "Rating", "Best Rating", "Worst Rating"])
+# %% [markdown]
+# Instead of starting from `steam_links_v3.txt`, `discover.py` can find the apps itself by paging through the store's search results (or the Web API's app list). Discovered urls go straight into the same queue, and the scraper starts on them while discovery is still paging, so there's no separate link-collecting step. `max_pages = 1` keeps this to the first 100 results; `None` goes through the whole catalog.
 
+# %%
+import discover
 
-# Print to csv
-# hw_df.to_csv('steam_hardware_data.csv')
+discovery = {'source' : 'search', 'search_params' : {'category1' : '998'}, 'max_pages' : 1} # category1=998 : games only
+counts = discover.discover_and_scrape(queue, out_csv, discovery = discovery, concurrency = 16, per_host_rate = 10,
+                                      cache = cache, cache_mode = cache_mode)
+print(counts)
 
 # %%
+from schema import read_stage
+
+hw_df = read_stage(out_csv)
 len(hw_df)
 
 # %%
 hw_df
 
 # %% [markdown]
-# Then, we save to csv, and clean in another .ipynb
+# For the daily refresh, we don't need to crawl everything again: `delta.py` keeps a fingerprint of every app in `fingerprints.sqlite` (the page's ETag / Last-Modified and a hash of the extracted fields), asks the store for each page only if it changed, and merges just the changed rows into `out_csv`. The counts say how many apps came back as `not-modified` (304, nothing downloaded), `unchanged` (downloaded, but same fields), `changed` or `new`.
 
 # %%
-# v5 means using v3 of steam_links data with v4 of scraping script
-hw_df.to_csv('steam_hardware_data_demonstration.csv')
+import delta
+
+fingerprints = delta.FingerprintStore('fingerprints.sqlite')
+delta_counts = delta.refresh(itertools.islice(url_set, limit), out_csv, fingerprints, concurrency = 16, per_host_rate = 10)
+print(delta_counts)
+
+# %% [markdown]
+# The csv was saved as the crawl went, and we clean it in another .ipynb
 
 
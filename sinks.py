@@ -0,0 +1,263 @@
+# Row sinks: where scraped rows go as they come in, instead of piling up in list_of_specs until the end.
+#
+# Every sink takes spec_lists (one per page, in HW_COLUMNS order) through write(), and writes them out as it goes,
+# so memory stays flat however many apps are crawled:
+#   CsvSink     : same layout as hw_df.to_csv() (index column first, User Tags written as a python list)
+#   JsonlSink   : one JSON object per line, User Tags kept as a real list
+#   ParquetSink : a folder of parquet files, one per run, written a row group per flush()
+# flush() makes everything written so far safe on disk (the crawl only marks urls done after a flush).
+# write_frame() takes a whole DataFrame of rows at once (a cleaned chunk, see cleaning.py).
+#
+# FanOutSink writes to several sinks at once, each one getting all of the rows or only the ones its filter keeps, so
+# e.g. the cleaned data and its hardware-trimmed version come out of the same pass over the rows.
+#
+# Usage:
+#   with open_sink('steam_hardware_data.csv') as sink:   (picks the sink from the extension: .csv, .jsonl, .parquet)
+#     sink.write(spec_list)
+#   with FanOutSink([(open_sink('all.csv', columns), None), (open_sink('trimmed.parquet', columns), has_hardware)]) as sink:
+#     sink.write_frame(chunk)
+
+import csv
+import json
+import os
+import re
+
+import pandas as pd
+
+from extract import HW_COLUMNS
+from schema import RAW_SCHEMA, to_table
+
+try:
+  import pyarrow as pa
+  import pyarrow.parquet as pq
+except ImportError:
+  pa = None
+
+
+# What every sink does. Subclasses fill in write(), and flush()/close() if they buffer anything
+class RowSink:
+  def __init__(self, columns = HW_COLUMNS):
+    self.columns = columns
+    self.rows_written = 0
+
+  def write(self, row):
+    raise NotImplementedError
+
+  def write_rows(self, rows):
+    for row in rows:
+      self.write(row)
+
+  # Given : A DataFrame with the sink's columns
+  def write_frame(self, df):
+    self.write_rows(df[list(self.columns)].itertuples(index = False))
+
+  def flush(self):
+    pass
+
+  def close(self):
+    self.flush()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+
+# Appends rows to a csv laid out like DataFrame.to_csv(): an index column, then the columns.
+# The header is only written if the file is new, and the index carries on from start_index
+class CsvSink(RowSink):
+  def __init__(self, path, columns = HW_COLUMNS, start_index = 0):
+    super().__init__(columns)
+    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+    self.file = open(path, 'a', newline = '', encoding = 'utf-8')
+    self.writer = csv.writer(self.file)
+    self.next_index = start_index
+    if new_file:
+      self.writer.writerow([''] + list(columns))
+
+  def write(self, row):
+    self.writer.writerow([self.next_index] + ['' if value is None else value for value in row]) # Lists come out as str(list), same as pandas
+    self.next_index = self.next_index + 1
+    self.rows_written = self.rows_written + 1
+
+  # Writes the whole DataFrame with one to_csv(), the index still carrying on from the last row
+  def write_frame(self, df):
+    df = df[list(self.columns)].set_axis(pd.RangeIndex(self.next_index, self.next_index + len(df)), axis = 0)
+    df.to_csv(self.file, header = False)
+    self.next_index = self.next_index + len(df)
+    self.rows_written = self.rows_written + len(df)
+
+  def flush(self):
+    self.file.flush()
+    os.fsync(self.file.fileno())
+
+  def close(self):
+    if not self.file.closed:
+      self.flush()
+      self.file.close()
+
+
+# Appends rows to a newline-delimited JSON file, one {column : value} object per line
+class JsonlSink(RowSink):
+  def __init__(self, path, columns = HW_COLUMNS):
+    super().__init__(columns)
+    self.file = open(path, 'a', encoding = 'utf-8')
+
+  def write(self, row):
+    self.file.write(json.dumps(dict(zip(self.columns, row)), ensure_ascii = False) + '\n')
+    self.rows_written = self.rows_written + 1
+
+  def write_frame(self, df):
+    if len(df):
+      df[list(self.columns)].to_json(self.file, orient = 'records', lines = True, force_ascii = False, date_format = 'iso')
+      self.rows_written = self.rows_written + len(df)
+
+  def flush(self):
+    self.file.flush()
+    os.fsync(self.file.fileno())
+
+  def close(self):
+    if not self.file.closed:
+      self.flush()
+      self.file.close()
+
+
+# Writes rows into a folder of parquet files (read the folder back with pd.read_parquet(path) or schema.read_stage()).
+# A run of the sink writes one file, part-00000.parquet (part-00001... for the next runs), with one row group per
+# flush() (and one every row_group_size rows in between). A parquet file can't be read until it's closed, so while
+# the run goes the file is _part-00000.parquet (hidden from readers), and each flush() also writes the rows it commits
+# to a journal file next to it (part-00000-00001.parquet...). close() closes the file and swaps it in for the journal.
+# After a crash the journal files are the rows of the run (every flushed row, once), and the next ParquetSink opened on
+# the folder throws away the unfinished file (or the journal files left over, if the crash came during the swap)
+# Scraped rows are typed with schema.RAW_SCHEMA, other rows with the schema given (e.g. schema.CLEAN_SCHEMA), and
+# without one every column is stored as strings
+class ParquetSink(RowSink):
+  def __init__(self, path, columns = HW_COLUMNS, row_group_size = 1000, schema = None):
+    if pa is None:
+      raise ImportError('ParquetSink needs pyarrow')
+    super().__init__(columns)
+    self.path = path
+    self.row_group_size = row_group_size
+    if schema is not None:
+      self.schema = schema
+    elif list(columns) == RAW_SCHEMA.names:
+      self.schema = RAW_SCHEMA
+    else:
+      self.schema = pa.schema([(column, pa.string()) for column in columns])
+    self.buffer = []
+    self.unflushed = [] # Tables written since the last flush(), for the journal
+    self.writer = None
+    self.journal = []
+    os.makedirs(path, exist_ok = True)
+    recover_parts(path)
+    numbers = [int(match.group(1)) for match in map(PART_NAME.match, os.listdir(path)) if match]
+    part = str(max(numbers) + 1 if numbers else 0).zfill(5)
+    self.part_path = os.path.join(path, 'part-' + part + '.parquet')
+    self.open_path = os.path.join(path, '_part-' + part + '.parquet')
+
+  def write(self, row):
+    self.buffer.append(row)
+    self.rows_written = self.rows_written + 1
+    if len(self.buffer) >= self.row_group_size:
+      self.write_row_group()
+
+  def write_row_group(self):
+    if not self.buffer:
+      return
+    self.write_table(to_table(self.buffer, self.schema))
+    self.buffer = []
+
+  def write_table(self, table):
+    if self.writer is None:
+      self.writer = pq.ParquetWriter(self.open_path, self.schema)
+    self.writer.write_table(table, row_group_size = max(self.row_group_size, table.num_rows))
+    self.unflushed.append(table)
+
+  # Writes the whole DataFrame as one row group (after the rows write() buffered, to keep them in order)
+  def write_frame(self, df):
+    self.write_row_group()
+    if len(df):
+      self.write_table(to_table(df, self.schema))
+      self.rows_written = self.rows_written + len(df)
+
+  def flush(self):
+    self.write_row_group()
+    if not self.unflushed:
+      return
+    journal_path = self.part_path[:-len('.parquet')] + '-' + str(len(self.journal) + 1).zfill(5) + '.parquet'
+    with open(journal_path, 'wb') as file:
+      pq.write_table(pa.concat_tables(self.unflushed), file)
+      file.flush()
+      os.fsync(file.fileno())
+    self.journal.append(journal_path)
+    self.unflushed = []
+
+  def close(self):
+    self.flush()
+    if self.writer is not None:
+      self.writer.close()
+      self.writer = None
+      finish_part(self.open_path, self.journal)
+      self.journal = []
+
+
+# part-00000.parquet, part-00000-00001.parquet (a journal file) and _part-00000.parquet (unfinished): the part's number
+PART_NAME = re.compile(r'^_?part-(\d+)(?:-\d+)?\.parquet$')
+
+# Given : The path of a closed _part-NNNNN.parquet and its journal files
+# Puts it in place of the journal files as part-NNNNN.parquet
+def finish_part(open_path, journal):
+  os.replace(open_path, os.path.join(os.path.dirname(open_path), os.path.basename(open_path)[1:]))
+  for journal_path in journal:
+    os.remove(journal_path)
+
+# Given : A ParquetSink folder, tidies what a crashed run left in it: an unfinished _part file is removed (its journal
+# files keep the rows), and the journal files of a part that was finished are removed
+def recover_parts(path):
+  names = os.listdir(path)
+  for name in names:
+    match = PART_NAME.match(name)
+    if match is None:
+      continue
+    finished = 'part-' + match.group(1) + '.parquet' in names
+    if name.startswith('_') or (finished and name != 'part-' + match.group(1) + '.parquet'):
+      os.remove(os.path.join(path, name))
+
+
+# Writes every row to several sinks: routes is a list of (sink, keep), keep being None for a sink that gets every row,
+# or a function taking a DataFrame of rows and returning True for the ones that sink gets (as for
+# cleaning.CleaningPlan.keep_rows()). Rows are routed a DataFrame at a time, write() makes a one-row DataFrame
+class FanOutSink(RowSink):
+  def __init__(self, routes):
+    super().__init__(routes[0][0].columns if routes else HW_COLUMNS)
+    self.routes = routes
+
+  def write(self, row):
+    self.write_frame(pd.DataFrame([list(row)], columns = list(self.columns)))
+
+  def write_frame(self, df):
+    for sink, keep in self.routes:
+      sink.write_frame(df if keep is None else df[keep(df).fillna(False).astype(bool).values])
+    self.rows_written = self.rows_written + len(df)
+
+  def flush(self):
+    for sink, keep in self.routes:
+      sink.flush()
+
+  def close(self):
+    for sink, keep in self.routes:
+      sink.close()
+
+
+# Given : A path, picks the sink from its extension (.csv, .jsonl / .ndjson, .parquet)
+# Returns : The opened sink. start_index is only used by csv, row_group_size and schema only by parquet
+def open_sink(path, columns = HW_COLUMNS, start_index = 0, row_group_size = 1000, schema = None):
+  extension = os.path.splitext(path)[1].lower()
+  if extension == '.csv':
+    return CsvSink(path, columns, start_index)
+  if extension in ('.jsonl', '.ndjson'):
+    return JsonlSink(path, columns)
+  if extension == '.parquet':
+    return ParquetSink(path, columns, row_group_size, schema)
+  raise ValueError("Don't know which sink to use for " + path + ' (expected .csv, .jsonl or .parquet)')
@@ -0,0 +1,174 @@
+# A local stand-in for the Steam store, for trying out the fetcher without touching the real site.
+#
+# Serves saved store pages out of a folder, looked up by app_id:
+#   GET /app/1092790/Inscryption/  ->  <pages_dir>/1092790.html
+# Pages come with an ETag and Last-Modified, and conditional requests for an unchanged page get a 304.
+# The JSON endpoints appdetails.py uses are served from saved answers in the same folder:
+#   GET /api/appdetails?appids=1092790   ->  <pages_dir>/1092790.json          (the 'data' part of the answer)
+#   GET /appreviews/1092790?json=1       ->  <pages_dir>/1092790.reviews.json  (the 'query_summary' part)
+# And the listings discover.py pages through, listing every <app_id>.html in the folder (in app_id order):
+#   GET /search/results/?start=0&count=100&json=1  ->  {'total_count', 'results_html' with one link per app}
+#   GET /ISteamApps/GetAppList/v2/                 ->  {'applist' : {'apps' : [{'appid', 'name'}, ...]}}
+#
+# It can also misbehave like the real store under load, to try out the retries and throttling:
+#   serve('saved_pages', throttle_rate = 0.2, retry_after = 1)   (20% of requests get a 429 with Retry-After: 1)
+#   serve('saved_pages', error_rate = 0.1)                       (10% get a 503)
+#   serve('saved_pages', slow_rate = 0.1, slow_seconds = 5)      (10% wait 5 seconds before answering)
+#
+# Usage:
+#   server, base_url = serve('saved_pages')
+#   urls = [base_url + '/app/1092790/Inscryption/', ...]
+#   hw_df, errors = fetch.scrape_urls(urls)
+#   server.shutdown()
+
+import email.utils
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+APP_PATH = re.compile(r'^/app/(\d+)')
+REVIEWS_PATH = re.compile(r'^/appreviews/(\d+)')
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+  protocol_version = 'HTTP/1.1' # So that clients can keep their connections alive
+  pages_dir = '.'
+  throttle_rate = 0.0
+  retry_after = 1
+  error_rate = 0.0
+  slow_rate = 0.0
+  slow_seconds = 5.0
+  random = random.Random(0)
+  requests_seen = 0
+
+  # Given : The chance of a fault happening, returns True if it happens to this request
+  def fault(self, rate):
+    return rate > 0 and self.random.random() < rate
+
+  # Returns : True if this request was answered with a fault (the caller should stop there)
+  def send_fault(self):
+    type(self).requests_seen = type(self).requests_seen + 1
+    if self.fault(self.slow_rate):
+      time.sleep(self.slow_seconds)
+    if self.fault(self.throttle_rate):
+      self.send_body(429, b'Too Many Requests', 'text/plain', {'Retry-After' : str(self.retry_after)})
+      return True
+    if self.fault(self.error_rate):
+      self.send_body(503, b'Service Unavailable', 'text/plain')
+      return True
+    return False
+
+  def do_GET(self):
+    if self.send_fault():
+      return
+    path = urlsplit(self.path).path
+    if path == '/api/appdetails':
+      self.send_appdetails()
+      return
+    if path == '/search/results/':
+      self.send_search_results()
+      return
+    if path == '/ISteamApps/GetAppList/v2/':
+      self.send_app_list()
+      return
+    if REVIEWS_PATH.match(path):
+      self.send_reviews(REVIEWS_PATH.match(path).group(1))
+      return
+    match = APP_PATH.match(self.path)
+    page_path = os.path.join(self.pages_dir, match.group(1) + '.html') if match else None
+    if page_path is None or not os.path.exists(page_path):
+      self.send_body(404, b'Not Found', 'text/plain')
+      return
+    with open(page_path, 'rb') as page_file:
+      page = page_file.read()
+    etag = '"' + hashlib.sha1(page).hexdigest() + '"'
+    last_modified = email.utils.formatdate(os.path.getmtime(page_path), usegmt = True)
+    validators = {'ETag' : etag, 'Last-Modified' : last_modified}
+    if self.headers.get('If-None-Match') == etag or (self.headers.get('If-None-Match') is None and self.headers.get('If-Modified-Since') == last_modified):
+      self.send_body(304, b'', 'text/html; charset=utf-8', validators)
+      return
+    self.send_body(200, page, 'text/html; charset=utf-8', validators)
+
+  # Given : An app_id, returns its saved JSON (or None if there's no <app_id><suffix> file)
+  def load_json(self, app_id, suffix):
+    json_path = os.path.join(self.pages_dir, app_id + suffix)
+    if not os.path.exists(json_path):
+      return None
+    with open(json_path, encoding = 'utf-8') as json_file:
+      return json.load(json_file)
+
+  # Answers like the store's /api/appdetails: {app_id : {success, data}} for the one app asked for (400 for more)
+  def send_appdetails(self):
+    query = parse_qs(urlsplit(self.path).query)
+    app_ids = [app_id for app_id in query.get('appids', [''])[0].split(',') if app_id]
+    if len(app_ids) != 1:
+      self.send_body(400, b'null', 'application/json')
+      return
+    data = self.load_json(app_ids[0], '.json')
+    answer = {app_ids[0] : {'success' : True, 'data' : data} if data is not None else {'success' : False}}
+    self.send_body(200, json.dumps(answer).encode('utf-8'), 'application/json')
+
+  # Answers like the store's /appreviews/<app_id>?json=1 (summary only, no reviews)
+  def send_reviews(self, app_id):
+    summary = self.load_json(app_id, '.reviews.json')
+    answer = {'success' : 1, 'query_summary' : summary} if summary is not None else {'success' : 2}
+    self.send_body(200, json.dumps(answer).encode('utf-8'), 'application/json')
+
+  # Returns : The app_ids of the saved pages, in order
+  def listed_app_ids(self):
+    return sorted(int(name[:-len('.html')]) for name in os.listdir(self.pages_dir) if name.endswith('.html') and name[:-len('.html')].isdigit())
+
+  # Answers like the store's infinite-scroll search: one page of result rows as HTML, plus the total number of results
+  def send_search_results(self):
+    query = parse_qs(urlsplit(self.path).query)
+    start = int(query.get('start', ['0'])[0])
+    count = min(int(query.get('count', ['50'])[0]), 100)
+    app_ids = self.listed_app_ids()
+    base_url = 'http://' + self.headers.get('Host', '127.0.0.1')
+    rows = ['<a href="' + base_url + '/app/' + str(app_id) + '/App_' + str(app_id) + '/?snr=1_7_7_151_150_1" data-ds-appid="'
+            + str(app_id) + '" class="search_result_row ds_collapse_flag">App ' + str(app_id) + '</a>' for app_id in app_ids[start:start + count]]
+    answer = {'success' : 1, 'results_html' : '\n'.join(rows), 'total_count' : len(app_ids), 'start' : start}
+    self.send_body(200, json.dumps(answer).encode('utf-8'), 'application/json')
+
+  # Answers like the Web API's GetAppList: every app in one answer
+  def send_app_list(self):
+    answer = {'applist' : {'apps' : [{'appid' : app_id, 'name' : ''} for app_id in self.listed_app_ids()]}}
+    self.send_body(200, json.dumps(answer).encode('utf-8'), 'application/json')
+
+  # Given : A status code, the body (as bytes) and its content type, sends the full response
+  def send_body(self, status, body, content_type, extra_headers = None):
+    self.send_response(status)
+    self.send_header('Content-Type', content_type)
+    self.send_header('Content-Length', str(len(body)))
+    for name, value in (extra_headers or {}).items():
+      self.send_header(name, value)
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, format, *args):
+    pass # Keep the notebook output clean
+
+
+# A client that gave up on a slow answer (timed out) shows up as a broken pipe. That's expected here, so it's not printed
+class StandInServer(ThreadingHTTPServer):
+  daemon_threads = True
+
+  def handle_error(self, request, client_address):
+    pass
+
+
+# Given : A folder of saved pages named <app_id>.html (and a port, 0 picks a free one), plus any faults to inject
+#   (throttle_rate, retry_after, error_rate, slow_rate, slow_seconds, see the top of this file)
+# Returns : (server, base_url) with the server already running on a background thread. Call server.shutdown() when done
+#   server.RequestHandlerClass.requests_seen counts the requests it got
+def serve(pages_dir, port = 0, handler = StandInHandler, **faults):
+  handler_class = type('Handler', (handler,), dict(faults, pages_dir = pages_dir, random = random.Random(0), requests_seen = 0))
+  server = StandInServer(('127.0.0.1', port), handler_class)
+  threading.Thread(target = server.serve_forever, daemon = True).start()
+  return server, 'http://127.0.0.1:' + str(server.server_address[1])
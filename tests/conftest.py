@@ -0,0 +1,30 @@
+# The modules live at the top of the repo (next to the notebooks), so the tests import them from there.
+# Pages used by the tests are in tests/fixtures/pages, named <app_id>.html like standin.py and bench.py expect.
+# Some have their saved JSON answers next to them (<app_id>.json, <app_id>.reviews.json), for appdetails.py.
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES_DIR = os.path.join(ROOT, 'tests', 'fixtures', 'pages')
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def pages_dir():
+  return PAGES_DIR
+
+# Returns : The fixture pages as (url, page bytes), see bench.load_corpus()
+@pytest.fixture
+def corpus():
+  from bench import load_corpus
+  return load_corpus(PAGES_DIR)
+
+# Returns : The rows scraped from the fixture pages, as the DataFrame scrape.py builds (the raw stage)
+@pytest.fixture
+def raw_frame(corpus):
+  import pandas as pd
+  from extract import HW_COLUMNS, extract_page
+  return pd.DataFrame([extract_page(page, url) for url, page in corpus], columns = HW_COLUMNS)
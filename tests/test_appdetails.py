@@ -0,0 +1,50 @@
+import pytest
+
+import standin
+from appdetails import AppNotFound, details_to_spec_list, scrape_app_ids
+from extract import HW_COLUMNS
+
+
+@pytest.fixture
+def store(pages_dir):
+  server, base_url = standin.serve(pages_dir)
+  yield base_url
+  server.shutdown()
+
+
+# The saved JSON answers (tests/fixtures/pages/<app_id>.json and .reviews.json) come out as the page's row would
+def test_scrape_app_ids(store):
+  hw_df, errors = scrape_app_ids(['1001', store + '/app/2001/Free_Game/', '9999'], base_url = store,
+                                 per_host_rate = None, retry = None)
+  rows = hw_df.set_index('app_id')
+  assert list(hw_df.columns) == HW_COLUMNS
+  assert sorted(rows.index) == ['1001', '2001']
+
+  inscryption = rows.loc['1001']
+  assert inscryption['Title'] == 'Inscryption'
+  assert inscryption['Original Price'] == '$19.99' # The price before the discount, like the store page's
+  assert inscryption['Processor'].strip() == 'AMD Ryzen 5 1600 or Intel i5-7600'
+  assert (inscryption['Developer'], inscryption['Publisher'], inscryption['Genre']) == ('Daniel Mullins Games', 'Devolver Digital', 'Indie')
+  assert inscryption['User Tags'] == []
+  assert (inscryption['All Time Reception'], inscryption['Total Count of Reviews']) == ('Very Positive', '86297')
+  assert inscryption['Rating'] == '9' # round(10 * 80000 / 86297)
+
+  free_game = rows.loc['2001']
+  assert free_game['Original Price'] == 'Free To Play'
+  assert free_game['All Time Reception'] == 'N/A' # Only positive summaries are kept
+  assert free_game['Rating'] == '3'
+  assert free_game['Graphs'] == 1 # No requirements
+
+  # {"success": false} for an app the store doesn't have
+  assert [(app_id, type(error)) for app_id, error in errors] == [('9999', AppNotFound)]
+
+
+@pytest.mark.parametrize('summary, rating', [
+  ({'total_positive' : 80000, 'total_reviews' : 86297}, '9'),
+  ({'total_positive' : 5, 'total_reviews' : 10}, '5'),
+  ({'total_positive' : 0, 'total_reviews' : 10}, '1'), # The page's scale starts at 1
+  ({'total_positive' : 0, 'total_reviews' : 0}, '0'),
+  (None, '0'),
+])
+def test_rating(summary, rating):
+  assert details_to_spec_list({'name' : 'Game'}, '1', summary)[15] == rating
@@ -0,0 +1,17 @@
+import json
+import os
+
+from bench import PAGE_CATEGORIES, bench_suite, categorize, compare_to_baseline
+
+
+def test_corpus_covers_every_category(corpus):
+  covered = set(category for url, page in corpus for category in categorize(page))
+  assert covered == set(PAGE_CATEGORIES) | {'regular'}
+
+# The committed baseline must have every stage the suite times, or the comparison silently skips them
+def test_baseline_has_every_stage(corpus, pages_dir):
+  with open(os.path.join(os.path.dirname(pages_dir), 'bench_baseline.json')) as baseline_file:
+    baseline = json.load(baseline_file)
+  results = bench_suite(corpus, repeat = 1)
+  assert set(results) | {'scrape_urls'} == set(baseline)
+  compare_to_baseline(results, baseline, tolerance = float('inf'))
@@ -0,0 +1,60 @@
+import pandas as pd
+
+import fetch
+import standin
+from cleaning import clean_stage, has_hardware
+from crawl_state import CrawlQueue
+from schema import read_stage
+from sinks import FanOutSink, open_sink
+
+
+# Given : Rows read back from a stage's output
+# Returns : Them as text, in app_id order, so outputs of different formats (typed or not) can be compared
+def as_text(df):
+  df = df.astype(object).where(df.notna(), '')
+  return df.map(str).set_index('app_id').sort_index()
+
+
+# One scrape writes the same rows to every sink it fans out to
+def test_scrape_fans_out_to_every_sink(tmp_path, pages_dir, corpus):
+  server, base_url = standin.serve(pages_dir)
+  urls = [base_url + '/app/' + url.split('/')[4] + '/' for url, page in corpus]
+  paths = {extension : str(tmp_path / ('rows' + extension)) for extension in ('.csv', '.jsonl', '.parquet')}
+  try:
+    with CrawlQueue(str(tmp_path / 'crawl_state.sqlite')) as queue, \
+         FanOutSink([(open_sink(path), None) for path in paths.values()]) as sink:
+      queue.add(urls)
+      fetch.scrape_resumable(queue, sink, flush_every = 4, concurrency = 2, retry = None)
+  finally:
+    server.shutdown()
+
+  from_csv = as_text(pd.read_csv(paths['.csv'], index_col = 0, dtype = str, keep_default_na = False)) # As written ('N/A' too)
+  from_parquet = as_text(read_stage(paths['.parquet']))
+  from_jsonl = as_text(pd.read_json(paths['.jsonl'], lines = True, dtype = False))
+  assert len(from_csv) == len(corpus)
+  pd.testing.assert_frame_equal(from_parquet, from_csv)
+  pd.testing.assert_frame_equal(from_jsonl, from_csv)
+
+
+# The raw stage cleans to the same frame whether it was handed over as a csv or as parquet, and each output gets the
+# rows its filter keeps
+def test_clean_stage_same_from_csv_and_parquet(tmp_path, raw_frame):
+  raw_frame.to_csv(tmp_path / 'raw.csv')
+  with open_sink(str(tmp_path / 'raw_typed.parquet')) as sink:
+    sink.write_frame(raw_frame)
+
+  outputs = {}
+  for name in ('raw.csv', 'raw_typed.parquet'):
+    full = str(tmp_path / (name + '.clean.parquet'))
+    trimmed = str(tmp_path / (name + '.trimmed.parquet'))
+    counts = clean_stage(str(tmp_path / name), {full : None, trimmed : has_hardware}, chunksize = 3)
+    outputs[name] = read_stage(full), read_stage(trimmed), counts[full], counts[trimmed]
+
+  full_from_csv, trimmed_from_csv, full_rows, trimmed_rows = outputs['raw.csv']
+  full_from_parquet, trimmed_from_parquet = outputs['raw_typed.parquet'][:2]
+  assert outputs['raw_typed.parquet'][2:] == (full_rows, trimmed_rows)
+  assert 0 < trimmed_rows < full_rows == len(full_from_csv)
+  pd.testing.assert_frame_equal(full_from_parquet, full_from_csv)
+  pd.testing.assert_frame_equal(trimmed_from_parquet, trimmed_from_csv)
+  pd.testing.assert_frame_equal(trimmed_from_csv.reset_index(drop = True), # GPU Tier reads back as float where it has NAs
+                                full_from_csv[has_hardware(full_from_csv).values].reset_index(drop = True), check_dtype = False)
@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+
+from cleaning import DateParser, parse_prices, parse_sizes, steam_plan
+from extract import HW_COLUMNS
+
+
+# The decimal separator is told from a thousands one by the rest of the amount, not by how many digits follow it
+@pytest.mark.parametrize('text, price', [
+  ('$0.125', 0.125),
+  ('$12.99', 12.99),
+  ('12,99€', 12.99),
+  ('1 234,56 zł', 1234.56),
+  ('$1,234.56', 1234.56),
+  ('1.234,56€', 1234.56),
+  ('¥ 1,200', 1200.0),
+  ('CLP$ 10.500', 10500.0),
+  ('1,234,567₫', 1234567.0),
+])
+def test_price_amounts(text, price):
+  assert parse_prices(pd.Series([text]))['price'][0] == pytest.approx(price)
+
+@pytest.mark.parametrize('text, gb', [
+  ('1.875 GB', 1.875),
+  ('2.5 GB', 2.5),
+  ('1,5 Go', 1.5),
+  ('1,024 MB', 1.0),
+  ('1.234,5 MB', 1234.5 / 1024),
+  ('8 GB RAM', 8.0),
+  ('1 024 MB', 1.0),
+  ('1\u2009024 MB', 1.0),
+  ('1\u00a0024 MB', 1.0),
+  ('1\u202f024,5 Mo', 1024.5 / 1024),
+  ('1.024 MB', 1.0),
+  ('2 500 MB available space', 2500 / 1024),
+  ('1 GB / 512 MB', 1.0),
+])
+def test_size_amounts(text, gb):
+  assert parse_sizes(pd.Series([text]))['gb'][0] == pytest.approx(gb)
+
+def test_placeholders_are_missing():
+  assert parse_prices(pd.Series(['-1', None]))['price'].isna().all()
+  assert parse_sizes(pd.Series(['1', None]))['missing'].all()
+
+
+# The store writes the release date in the browsing language, and only as precisely as it knows it
+@pytest.mark.parametrize('text, date, format', [
+  ('22 Oct, 2017', '2017-10-22', 'day month year'),
+  ('Oct 21, 2016', '2016-10-21', 'month day year'),
+  ('12 Mär. 2021', '2021-03-12', 'day month year'),
+  ('15 févr. 2020', '2020-02-15', 'day month year'),
+  ('3 de ago. de 2019', '2019-08-03', 'day month year'),
+  ('5 мая. 2018 г.', '2018-05-05', 'day month year'),
+  ('2019年3月5日', '2019-03-05', 'year month day'),
+  ('March 2022', '2022-03-01', 'month year'),
+  ('Q3 2023', '2023-07-01', 'quarter'),
+  ('2024', '2024-01-01', 'year'),
+])
+def test_release_dates(text, date, format):
+  row = DateParser().parse(pd.Series([text])).iloc[0]
+  assert (row['date'], row['format']) == (pd.Timestamp(date), format)
+
+# Dates the store doesn't have yet aren't dates, but aren't counted as unparseable either
+def test_upcoming_and_unparseable_dates():
+  dates = DateParser()
+  parsed = dates.parse(pd.Series(['Coming soon', 'To be announced', 'not a date', None, 'not a date', '2024']))
+  assert parsed['date'].isna().tolist() == [True, True, True, True, True, False]
+  assert parsed['format'].tolist()[:2] == ['upcoming', 'upcoming']
+  coverage = dates.coverage()
+  assert (coverage['rows'], coverage['parsed']) == (6, 1)
+  assert (coverage['formats']['upcoming'], coverage['formats']['unparsed'], coverage['formats']['missing']) == (2, 2, 1)
+  assert coverage['unparsed'] == [('not a date', 2)]
+  assert len(dates.cache) == 4 # Each distinct string parsed once
+
+# Cleaning chunk by chunk gives the same rows as cleaning the whole frame at once
+def test_plan_run_and_stream_agree(raw_frame):
+  whole = steam_plan().run(raw_frame)
+  chunks = [raw_frame.iloc[start:start + 2] for start in range(0, len(raw_frame), 2)]
+  streamed = pd.concat(list(steam_plan().stream(chunk.copy() for chunk in chunks)))
+  assert len(chunks) > 3 and 0 < len(whole) < len(raw_frame) # Some rows are dropped, in several of the chunks
+  pd.testing.assert_frame_equal(streamed, whole)
+  assert list(raw_frame.columns) == HW_COLUMNS # run() left the frame it was given alone
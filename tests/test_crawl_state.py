@@ -0,0 +1,32 @@
+import asyncio
+
+from crawl_state import CrawlQueue
+from discover import feed_queue
+
+
+# An app is queued once, whatever url it comes under, and any of its urls gives (and sets) its status
+def test_queue_dedupes_on_app_id(tmp_path):
+  with CrawlQueue(str(tmp_path / 'crawl_state.sqlite')) as queue:
+    assert queue.add(['https://store.steampowered.com/app/367520/Hollow_Knight/',
+                      'https://store.steampowered.com/app/367520/',
+                      'http://store.steampowered.com/app/0367520/?snr=1_7_7_230_150_3']) == 1
+    assert queue.unfinished() == ['https://store.steampowered.com/app/367520/Hollow_Knight/']
+    queue.mark_done(['https://store.steampowered.com/app/367520/'])
+    assert queue.status('https://store.steampowered.com/app/367520/Hollow_Knight/') == 'done'
+    assert queue.counts() == {'pending' : 0, 'done' : 1, 'failed' : 0}
+
+
+# An app scraped under its slugged url isn't scraped again when discovery finds its canonical url
+def test_feed_queue_skips_apps_done_under_another_url(tmp_path):
+  async def discovered():
+    for app_id in ('367520', '1092790'):
+      yield 'https://store.steampowered.com/app/' + app_id + '/'
+
+  async def passed_on(queue):
+    return [url async for url in feed_queue(discovered(), queue)]
+
+  with CrawlQueue(str(tmp_path / 'crawl_state.sqlite')) as queue:
+    queue.add(['https://store.steampowered.com/app/367520/Hollow_Knight/'])
+    queue.mark_done(['https://store.steampowered.com/app/367520/Hollow_Knight/'])
+    assert asyncio.run(passed_on(queue)) == ['https://store.steampowered.com/app/1092790/']
+    assert queue.counts() == {'pending' : 1, 'done' : 1, 'failed' : 0}
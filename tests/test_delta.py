@@ -0,0 +1,49 @@
+import shutil
+
+import pandas as pd
+
+import delta
+import standin
+
+
+# Refreshes the dataset from the stand-in's pages
+def refresh(base_url, out, fingerprints):
+  urls = [base_url + '/app/' + app_id + '/' for app_id in ('1001', '1002', '1003')]
+  return delta.refresh(urls, out, fingerprints, concurrency = 2, retry = None)
+
+def counts(**found):
+  return dict(dict.fromkeys(delta.DELTA_STATUSES + ('failed',), 0), **found)
+
+
+# 304s and pages whose fields didn't change leave their rows alone, only the changed page's row is rewritten
+def test_refresh_only_rewrites_changed_rows(tmp_path, pages_dir):
+  saved_pages = tmp_path / 'saved_pages'
+  saved_pages.mkdir()
+  for app_id in ('1001', '1002', '1003'):
+    shutil.copy(pages_dir + '/' + app_id + '.html', saved_pages / (app_id + '.html'))
+  server, base_url = standin.serve(str(saved_pages))
+  out = str(tmp_path / 'rows.csv')
+  try:
+    with delta.FingerprintStore(str(tmp_path / 'fingerprints.sqlite')) as fingerprints:
+      assert refresh(base_url, out, fingerprints) == counts(new = 3)
+      before = pd.read_csv(out, index_col = 0).set_index('app_id')
+      changed_at = dict(fingerprints.db.execute('SELECT app_id, changed_at FROM fingerprints'))
+
+      assert refresh(base_url, out, fingerprints) == counts(**{'not-modified' : 3})
+
+      page_1001 = saved_pages / '1001.html'
+      page_1001.write_bytes(page_1001.read_bytes().replace(b'$19.99', b'$24.99'))
+      page_1002 = saved_pages / '1002.html'
+      page_1002.write_bytes(page_1002.read_bytes() + b'<!-- served at another time -->')
+      assert refresh(base_url, out, fingerprints) == counts(**{'changed' : 1, 'unchanged' : 1, 'not-modified' : 1})
+      after = pd.read_csv(out, index_col = 0).set_index('app_id')
+      changed_at_after = dict(fingerprints.db.execute('SELECT app_id, changed_at FROM fingerprints'))
+  finally:
+    server.shutdown()
+
+  assert sorted(after.index) == [1001, 1002, 1003]
+  assert before.loc[1001, 'Original Price'] == '$19.99'
+  assert after.loc[1001, 'Original Price'] == '$24.99'
+  pd.testing.assert_frame_equal(after.drop(index = 1001).sort_index(), before.drop(index = 1001).sort_index())
+  assert changed_at_after['1001'] > changed_at['1001']
+  assert (changed_at_after['1002'], changed_at_after['1003']) == (changed_at['1002'], changed_at['1003'])
@@ -0,0 +1,48 @@
+import asyncio
+import shutil
+
+import pandas as pd
+import pytest
+
+import fetch
+import standin
+from crawl_state import CrawlQueue
+
+
+@pytest.fixture
+def store(tmp_path, pages_dir):
+  saved_pages = tmp_path / 'saved_pages'
+  saved_pages.mkdir()
+  for app_id in range(101, 107):
+    shutil.copy(pages_dir + '/1001.html', saved_pages / (str(app_id) + '.html'))
+  server, base_url = standin.serve(str(saved_pages))
+  yield base_url
+  server.shutdown()
+
+
+# A run that stops halfway must leave only rows of done urls in the output, so the next run doesn't repeat any
+def test_resume_after_crash_writes_every_row_once(tmp_path, store):
+  urls = [store + '/app/' + str(app_id) + '/' for app_id in range(101, 107)]
+  out_csv = str(tmp_path / 'rows.csv')
+
+  # Stops the run once the first batch is done and the next page is (most likely) held back unflushed
+  async def crashing_urls():
+    for url in urls[:3]:
+      yield url
+    while queue.counts()['done'] < 2:
+      await asyncio.sleep(0.01)
+    await asyncio.sleep(0.2)
+    raise RuntimeError('crawl stopped')
+
+  with CrawlQueue(str(tmp_path / 'crawl_state.sqlite')) as queue:
+    queue.add(urls)
+    with pytest.raises(RuntimeError):
+      fetch.scrape_resumable(queue, out_csv, flush_every = 2, urls = crashing_urls(), concurrency = 1, retry = None)
+    assert queue.counts()['done'] == 2
+    assert len(pd.read_csv(out_csv)) == 2 # The third row was never marked done, so it isn't in the output either
+
+    counts = fetch.scrape_resumable(queue, out_csv, flush_every = 2, concurrency = 1, retry = None)
+
+  assert counts['done'] == 6
+  app_ids = pd.read_csv(out_csv)['app_id'].tolist()
+  assert sorted(app_ids) == list(range(101, 107))
@@ -0,0 +1,95 @@
+import pandas as pd
+import pytest
+
+from hardware import MODEL_INDEXES, MODELS_PATH, cpu_columns, gpu_columns, parse_gpu_strings
+
+
+# The vendor, model and tier of a card must all be the index model's, not a mix of it and the regex tables
+@pytest.mark.parametrize('text, vendor, model, tier', [
+  ('Intel HD 5500', 'Intel', 'Intel HD Graphics 5500', 1),
+  ('Radeon RX 580 8GB / GTX 1060 6GB', 'AMD', 'Radeon RX 580', 3),
+  ('NVIDIA GeForce GTX 960 2GB', 'NVIDIA', 'GeForce GTX 960', 2),
+])
+def test_gpu_columns_describe_one_card(text, vendor, model, tier):
+  row = gpu_columns(pd.Series([text])).iloc[0]
+  assert (row['GPU Vendor'], row['GPU Model'], row['GPU Tier']) == (vendor, model, tier)
+
+
+# The CPU named first in the text wins, whatever the order of CPU_FAMILIES
+@pytest.mark.parametrize('text, vendor, family', [
+  ('AMD Ryzen 5 1600 or Intel i5-7600', 'AMD', 'Ryzen 5'),
+  ('Intel Core i5-4460 / AMD FX-6300', 'Intel', 'Core i5'),
+])
+def test_cpu_family_is_the_first_named(text, vendor, family):
+  row = cpu_columns(pd.Series([text])).iloc[0]
+  assert (row['CPU Vendor'], row['CPU Family']) == (vendor, family)
+
+# 'HD' alone isn't a Radeon, and a suffix only counts where it ends ('9800GTX+' isn't a 9800 GT)
+@pytest.mark.parametrize('text, vendor, model', [
+  ('Intel HD 5500', 'Intel', 'Intel HD Graphics 5500'),
+  ('ATI Radeon HD 4850', 'AMD', 'Radeon HD 4850'),
+  ('AMD Radeon HD 7850 / Intel HD 4000', 'AMD', 'Radeon HD 7850'),
+  ('GeForce 9800 GTX+', 'NVIDIA', 'GeForce 9800 GTX+'),
+  ('RX 7900 XTX', 'AMD', 'Radeon RX 7900 XTX'),
+])
+def test_gpu_strings(text, vendor, model):
+  row = parse_gpu_strings(pd.Series([text])).iloc[0]
+  assert (row['GPU Vendor'], row['GPU Model']) == (vendor, model)
+
+@pytest.mark.parametrize('text, model', [
+  ('9800GTX+', 'GeForce 9800 GTX+'),
+  ('GeForce 9800 GT', 'GeForce 9800 GT'),
+  ('8800 GTS', None),
+  ('GTX 1050 / GTX 960 Ti', 'GeForce GTX 1050'),
+])
+def test_model_suffix_is_anchored(text, model):
+  found = gpu_columns(pd.Series([text])).iloc[0]['GPU Model']
+  assert (None if pd.isna(found) else found) == model
+
+# A model of another family or vendor than the one written before the number isn't the card named, even with the
+# same number: no model (and no score) rather than a decade-newer card
+@pytest.mark.parametrize('text, vendor', [
+  ('Radeon HD 6800 series', 'AMD'),
+  ('AMD Radeon HD 6650', 'AMD'),
+  ('Radeon HD 6500 series', 'AMD'),
+  ('NVIDIA Quadro 4000', 'NVIDIA'),
+  ('GeForce GT 650M', 'NVIDIA'),
+])
+def test_model_family_and_vendor_must_match(text, vendor):
+  assert MODEL_INDEXES['gpu'].match(text)[1] is None
+  row = gpu_columns(pd.Series([text])).iloc[0]
+  assert row['GPU Vendor'] == vendor
+  assert pd.isna(row['GPU Score'])
+
+# VRAM needs an MB / GB unit: the M of a mobile GPU isn't megabytes
+@pytest.mark.parametrize('text, vram', [
+  ('GeForce GTX 970M', None),
+  ('GTX 460M', None),
+  ('Radeon HD 6770M 1GB', 1.0),
+  ('NVIDIA GeForce GTX 960 2GB', 2.0),
+  ('GTX 1060 6 GB', 6.0),
+  ('Radeon HD 5770 (512 Mo)', 0.5),
+])
+def test_gpu_vram(text, vram):
+  found = parse_gpu_strings(pd.Series([text])).iloc[0]['GPU VRAM']
+  assert (None if pd.isna(found) else found) == vram
+
+# The tier of a card comes from its score, so a card with a higher score is never in a lower tier
+def test_tiers_follow_scores():
+  models = pd.read_csv(MODELS_PATH, comment = '#').query("kind == 'gpu'")
+  columns = gpu_columns(models['model'].reset_index(drop = True))
+  assert (columns['GPU Model'].values == models['model'].values).all()
+  ranked = columns.sort_values(['GPU Score', 'GPU Tier'])
+  assert ranked['GPU Tier'].is_monotonic_increasing
+  assert ranked['GPU Tier'].iloc[0] == 1 and ranked['GPU Tier'].iloc[-1] == 5
+
+@pytest.mark.parametrize('text, tier', [
+  ('RTX 3050', 4),
+  ('RTX 2080 Ti', 5),
+  ('RX 6400', 2),
+  ('GTX 1660', 3),
+  ('GTX 1660 Super', 3),
+  ('Radeon R7 260X', 2),
+])
+def test_gpu_tier(text, tier):
+  assert gpu_columns(pd.Series([text])).iloc[0]['GPU Tier'] == tier
@@ -0,0 +1,35 @@
+import pytest
+
+from links import MAX_APP_ID, AppIdBitmap, clean_url, dedupe_links
+
+
+def test_dedupe_links_on_app_id():
+  stats = {}
+  lines = ['https://store.steampowered.com/app/367520/Hollow_Knight/?snr=1_7_7_230_150_3',
+           'http://store.steampowered.com/app/367520/',
+           '',
+           'https://store.steampowered.com/sub/1234/']
+  assert list(dedupe_links(lines, stats = stats)) == ['https://store.steampowered.com/app/367520/Hollow_Knight/']
+  assert stats == {'lines' : 4, 'unique' : 1, 'duplicates' : 1, 'blank' : 1, 'invalid' : 1}
+
+# An app_id past MAX_APP_ID is an invalid link, not a reason to allocate a huge bitmap
+def test_app_ids_past_the_cap_are_invalid():
+  seen = AppIdBitmap()
+  stats = {}
+  lines = ['https://store.steampowered.com/app/' + str(MAX_APP_ID + 1) + '/',
+           'https://store.steampowered.com/app/99999999999999999999/',
+           'https://store.steampowered.com/app/' + str(MAX_APP_ID) + '/']
+  assert len(list(dedupe_links(lines, seen, stats))) == 1
+  assert stats['invalid'] == 2
+  assert len(seen.bits) == MAX_APP_ID // 8 + 1
+  with pytest.raises(ValueError):
+    seen.add(MAX_APP_ID + 1)
+
+# Links to an app lose their tracking info, anything else comes back as it was
+def test_clean_url():
+  assert clean_url('https://store.steampowered.com/app/367520/Hollow_Knight/?snr=1_7_7_230_150_3') == \
+         'https://store.steampowered.com/app/367520/Hollow_Knight/'
+  for url in ('https://store.steampowered.com/sub/1234/?snr=1_7_7',
+              'https://store.steampowered.com/bundle/5678/Some_Bundle/',
+              'https://store.steampowered.com/agecheck/sub/1234/'):
+    assert clean_url(url) == url
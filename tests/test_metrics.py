@@ -0,0 +1,57 @@
+import fetch
+import standin
+from extract import FieldStats, HW_COLUMNS, extract_page_detailed
+from metrics import Histogram, InstrumentedParse, Metrics
+
+
+# Each bucket counts the values up to its bound (included), past the previous one, the last one everything past the bounds
+def test_histogram_buckets():
+  histogram = Histogram((1, 2, 5))
+  for value in (0.5, 1, 1.5, 2, 10):
+    histogram.observe(value)
+  assert histogram.counts == [2, 2, 0, 1]
+  assert (histogram.count, histogram.sum, histogram.min, histogram.max) == (5, 15.0, 0.5, 10)
+  assert histogram.as_dict()['buckets'] == {'1' : 2, '2' : 2, '5' : 0, '+Inf' : 1}
+  assert 1 <= histogram.quantile(0.5) <= 2
+  assert Histogram().quantile(0.5) is None
+
+def test_to_prometheus():
+  metrics = Metrics()
+  metrics.observe('parse', 0.002)
+  metrics.observe('parse', 0.2)
+  metrics.page_done(b'x' * 20000)
+  lines = metrics.to_prometheus().splitlines()
+  assert '# TYPE steamscrape_stage_seconds histogram' in lines
+  assert 'steamscrape_stage_seconds_bucket{stage="parse",le="0.001"} 0' in lines
+  assert 'steamscrape_stage_seconds_bucket{stage="parse",le="0.0025"} 1' in lines
+  assert 'steamscrape_stage_seconds_bucket{stage="parse",le="+Inf"} 2' in lines # Buckets are cumulative
+  assert 'steamscrape_stage_seconds_count{stage="parse"} 2' in lines
+  assert 'steamscrape_page_bytes_bucket{le="32768"} 1' in lines
+  assert 'steamscrape_pages_total 1' in lines
+
+
+# The instrumented parse gives what extract_page_detailed() gives, so a crawl using it still fills field_stats
+def test_instrumented_parse_keeps_field_stats(corpus, pages_dir):
+  metrics = Metrics()
+  parse = InstrumentedParse(metrics, helpers = True)
+  for url, page in corpus:
+    assert parse(page, url) == extract_page_detailed(page, url)
+
+  server, base_url = standin.serve(pages_dir)
+  urls = [base_url + '/app/' + url.split('/')[4] + '/' for url, page in corpus]
+  metrics = Metrics()
+  field_stats = FieldStats()
+  try:
+    hw_df, errors = fetch.scrape_urls(urls, concurrency = 2, retry = None, metrics = metrics,
+                                      parse = InstrumentedParse(metrics), field_stats = field_stats)
+  finally:
+    server.shutdown()
+
+  assert errors == [] and len(hw_df) == len(corpus)
+  assert field_stats.pages == len(corpus)
+  assert field_stats.counts['Title']['ok'] == len(corpus)
+  assert field_stats.counts['Processor']['missing'] > 0 # The no_sys_req pages
+  assert list(field_stats.counts) == HW_COLUMNS
+  assert metrics.pages == len(corpus)
+  assert {'parse', 'extract', 'fetch', 'parse_total'} <= set(metrics.stages)
+  assert metrics.stages['extract'].count == len(corpus)
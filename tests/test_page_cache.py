@@ -0,0 +1,81 @@
+import asyncio
+import os
+import shutil
+
+import pytest
+
+import fetch
+import page_cache
+import standin
+from page_cache import CacheMiss, PageCache, read_blob
+
+
+def test_put_get_round_trip(tmp_path, corpus):
+  url, page = corpus[0]
+  with PageCache(str(tmp_path / 'cache')) as cache:
+    cache.put('1001', url, page, etag = '"abc"', last_modified = 'Mon, 01 Jan 2024 00:00:00 GMT')
+    cache.put('1002', url, page) # Same page, stored once
+    entry = cache.get('1001')
+    assert (entry.page, entry.url, entry.etag, entry.complete) == (page, url, '"abc"', True)
+    assert entry.last_modified == 'Mon, 01 Jan 2024 00:00:00 GMT'
+    assert cache.get('9999') is None
+    assert cache.app_ids() == ['1001', '1002']
+    [(app_id, entry_url, path), (other_app_id, other_url, other_path)] = cache.entries()
+    assert path == other_path and read_blob(path) == page
+    assert len(os.listdir(os.path.dirname(path))) == 1
+
+    cache.put('1001', url, page + b'<!-- changed -->', complete = False)
+    assert cache.get('1001').complete is False
+    assert os.path.exists(path) # Still the page of 1002
+
+@pytest.mark.skipif(page_cache.zstandard is None, reason = 'zstandard is not installed')
+def test_pages_are_stored_with_zstd(tmp_path, corpus):
+  url, page = corpus[0]
+  with PageCache(str(tmp_path / 'cache')) as cache:
+    cache.put('1001', url, page)
+    path = cache.entries()[0][2]
+    assert path.endswith('.zst')
+    assert os.path.getsize(path) < len(page) / 3
+
+
+@pytest.fixture
+def store(tmp_path, pages_dir):
+  saved_pages = tmp_path / 'saved_pages'
+  saved_pages.mkdir()
+  shutil.copy(pages_dir + '/1001.html', saved_pages / '1001.html')
+  server, base_url = standin.serve(str(saved_pages))
+  yield server, base_url, saved_pages / '1001.html'
+  server.shutdown()
+
+# Given : The stand-in, a url, a PageCache and a cache mode
+# Returns : (page, the number of requests the stand-in got for it)
+def load(server, url, cache, cache_mode):
+  async def load_once():
+    async with fetch.open_session(1, 10) as session:
+      return await fetch.load_page(session, url, cache, cache_mode)
+  seen = server.RequestHandlerClass.requests_seen
+  page, complete, bytes_total = asyncio.run(load_once())
+  return page, server.RequestHandlerClass.requests_seen - seen
+
+def test_cache_modes(tmp_path, store):
+  server, base_url, page_path = store
+  url = base_url + '/app/1001/'
+  original = page_path.read_bytes()
+  with PageCache(str(tmp_path / 'cache')) as cache:
+    with pytest.raises(CacheMiss): # Offline: nothing cached yet, and the store isn't asked
+      load(server, url, cache, 'cache-only')
+    assert server.RequestHandlerClass.requests_seen == 0
+
+    assert load(server, url, cache, 'cache-first') == (original, 1)
+    assert load(server, url, cache, 'cache-first') == (original, 0) # Fresh in the cache
+
+    page_path.write_bytes(original + b'<!-- changed -->')
+    assert load(server, url, cache, 'cache-only') == (original, 0)
+    assert load(server, url, cache, 'conditional') == (original + b'<!-- changed -->', 1)
+    assert load(server, url, cache, 'conditional') == (original + b'<!-- changed -->', 1) # A 304, the cached page is used
+    page_path.write_bytes(original)
+    assert load(server, url, cache, 'refresh') == (original, 1)
+    assert cache.get('1001').page == original
+
+  with PageCache(str(tmp_path / 'cache'), ttl = 0) as cache:
+    assert load(server, url, cache, 'cache-first') == (original, 1) # Stale
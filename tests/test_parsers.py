@@ -0,0 +1,28 @@
+import pytest
+
+from extract import extract_fields, extract_fields_by_helpers, extract_page, FIELD_PLACEHOLDERS, HW_COLUMNS
+from parsers import PARSER_BACKENDS, make_soup
+
+
+# Every backend must give exactly the rows html.parser gives (the reference, it's what the original scraper used)
+@pytest.mark.parametrize('backend', [backend for backend in PARSER_BACKENDS if backend != 'html.parser'])
+def test_backends_give_the_same_rows(corpus, backend):
+  for url, page in corpus:
+    assert extract_page(page, url, backend) == extract_page(page, url, 'html.parser'), url
+
+# The single-pass extraction gives the rows the original extract_* helpers give, on every fixture page (the ones
+# without system requirements too) and with every installed backend
+@pytest.mark.parametrize('backend', list(PARSER_BACKENDS))
+def test_single_pass_matches_helpers(corpus, backend):
+  for url, page in corpus:
+    assert extract_fields(make_soup(page, backend), url) == extract_fields_by_helpers(make_soup(page, backend), url), url
+
+# Rows that kept the User Tags placeholder mustn't share one list (appending to one row's tags changed every row's)
+def test_placeholder_tags_are_not_shared(corpus):
+  url, page = corpus[0]
+  page = page.replace(b'class="app_tag', b'class="no_tag') # A store page without user tags
+  first = extract_page(page, 'https://store.steampowered.com/app/1/')
+  second = extract_page(page, 'https://store.steampowered.com/app/2/')
+  first[HW_COLUMNS.index('User Tags')].append('Indie')
+  assert second[HW_COLUMNS.index('User Tags')] == []
+  assert FIELD_PLACEHOLDERS['User Tags'] == []
@@ -0,0 +1,31 @@
+import pytest
+
+import partial
+from extract import extract_page, extract_page_detailed
+from partial import extract_partial, read_until_fields
+
+
+# Given : A page (bytes), returns it cut in 4 KB chunks, as a download would come in
+def chunks(page, size = 4096):
+  return (page[start:start + size] for start in range(0, len(page), size))
+
+
+# What's read of a page gives the same row as the whole page, and reading stops early on the pages that have every
+# block (the fixture pages without system requirements are read to the end)
+@pytest.mark.parametrize('feeder', ['lxml', 'html.parser'])
+def test_read_until_fields(corpus, feeder, monkeypatch):
+  if feeder == 'html.parser':
+    monkeypatch.setattr(partial, 'etree', None)
+  elif partial.etree is None:
+    pytest.skip('lxml is not installed')
+  stopped_early = 0
+  for url, page in corpus:
+    read, complete = read_until_fields(chunks(page))
+    spec_list, stats = extract_partial(read, url, complete, len(page))
+    assert spec_list == extract_page(page, url)
+    has_every_block = extract_page_detailed(page, url)[1]['Processor'] == 'ok'
+    assert complete == (not has_every_block)
+    assert (len(read) < len(page)) == has_every_block
+    assert (stats['bytes_read'], stats['bytes_total']) == (len(read), len(page))
+    stopped_early = stopped_early + (not complete)
+  assert stopped_early >= 5
@@ -0,0 +1,25 @@
+import pytest
+
+from extract import extract_page
+from page_cache import PageCache
+from reextract import reextract_df
+
+
+# Given : A folder to put the cache in and a list of (url, page bytes)
+# Returns : A PageCache holding every page
+def cache_of(cache_dir, corpus):
+  cache = PageCache(str(cache_dir))
+  for url, page in corpus:
+    cache.put(url.rstrip('/').split('/')[-1], url, page)
+  return cache
+
+
+# Rows come back from the worker processes pickled, so nothing in them may hold on to the parse tree
+# (a bs4 string does, and pickling a full-size page's tree runs out of recursion)
+@pytest.mark.parametrize('backend', ['html.parser', 'lxml', 'selectolax'])
+def test_reextract_with_workers_matches_single_process(tmp_path, corpus, backend):
+  with cache_of(tmp_path, corpus) as cache:
+    hw_df, errors = reextract_df(cache, workers = 2, chunk_size = 1, backend = backend)
+  assert errors == []
+  assert hw_df.values.tolist() == [extract_page(page, url, backend) for url, page in corpus]
+  assert all(type(value) is str for value in hw_df['Developer'].tolist() + hw_df['Publisher'].tolist())
@@ -0,0 +1,45 @@
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from cleaning import steam_plan
+from schema import CLEAN_SCHEMA, RAW_SCHEMA, read_stage, read_stage_chunks, write_stage
+from sinks import ParquetSink
+
+
+# A stage written with its schema comes back with the declared Arrow types, whole or a chunk at a time
+@pytest.mark.parametrize('stage', ['raw', 'clean'])
+def test_stage_round_trip(tmp_path, raw_frame, stage):
+  df, schema = (raw_frame, RAW_SCHEMA) if stage == 'raw' else (steam_plan().run(raw_frame), CLEAN_SCHEMA)
+  path = str(tmp_path / (stage + '.parquet'))
+  write_stage(df, path, schema)
+  assert pq.read_schema(path).remove_metadata() == schema
+
+  whole = read_stage(path)
+  assert list(whole.columns) == schema.names and len(whole) == len(df)
+  assert whole['User Tags'].tolist() == df['User Tags'].tolist()
+  assert whole['Total Count of Reviews'].tolist() == [int(count) for count in df['Total Count of Reviews']]
+  if stage == 'clean':
+    assert str(whole['Release Date'].dtype) == 'datetime64[ns]'
+    pd.testing.assert_series_equal(whole['Memory'], df['Memory'].reset_index(drop = True))
+  chunks = list(read_stage_chunks(path, chunksize = 3))
+  assert len(chunks) == 3
+  pd.testing.assert_frame_equal(pd.concat(chunks), whole)
+
+
+# write_stage replaces the folder a ParquetSink left at the path, but nothing else
+def test_write_stage_only_replaces_parquet_folders(tmp_path, raw_frame):
+  path = str(tmp_path / 'raw.parquet')
+  with ParquetSink(path) as sink:
+    sink.write_frame(raw_frame)
+  write_stage(raw_frame.head(2), path, RAW_SCHEMA)
+  assert os.path.isfile(path) and len(read_stage(path)) == 2
+
+  folder = tmp_path / 'notes.parquet'
+  folder.mkdir()
+  (folder / 'notes.txt').write_text('keep me')
+  with pytest.raises(FileExistsError):
+    write_stage(raw_frame, str(folder), RAW_SCHEMA)
+  assert (folder / 'notes.txt').read_text() == 'keep me'
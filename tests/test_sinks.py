@@ -0,0 +1,55 @@
+import os
+import shutil
+
+import pyarrow.parquet as pq
+
+import fetch
+import standin
+from crawl_state import CrawlQueue
+from extract import extract_page
+from schema import read_stage
+from sinks import ParquetSink
+
+
+# Given : The fixture pages
+# Returns : Their rows (spec_lists), as the scraper makes them
+def page_rows(corpus):
+  return [extract_page(page, url) for url, page in corpus]
+
+def parquet_files(path):
+  return sorted(name for name in os.listdir(path) if name.endswith('.parquet'))
+
+
+# A run writes one file, with a row group per flush, not a file per flush
+def test_parquet_run_is_one_file_with_a_row_group_per_flush(tmp_path, pages_dir):
+  saved_pages = tmp_path / 'saved_pages'
+  saved_pages.mkdir()
+  for app_id in range(101, 110):
+    shutil.copy(pages_dir + '/1001.html', saved_pages / (str(app_id) + '.html'))
+  server, base_url = standin.serve(str(saved_pages))
+  out = str(tmp_path / 'rows.parquet')
+  try:
+    with CrawlQueue(str(tmp_path / 'crawl_state.sqlite')) as queue:
+      queue.add([base_url + '/app/' + str(app_id) + '/' for app_id in range(101, 110)])
+      fetch.scrape_resumable(queue, out, flush_every = 3, concurrency = 1, retry = None)
+  finally:
+    server.shutdown()
+
+  assert parquet_files(out) == ['part-00000.parquet']
+  assert pq.ParquetFile(os.path.join(out, 'part-00000.parquet')).num_row_groups == 3
+  assert sorted(read_stage(out)['app_id']) == [str(app_id) for app_id in range(101, 110)]
+
+# A run that stops without close() leaves every flushed row readable once, and the next run carries on next to them
+def test_parquet_rows_survive_a_crash(tmp_path, corpus):
+  rows = page_rows(corpus)
+  out = str(tmp_path / 'rows.parquet')
+  crashed = ParquetSink(out)
+  crashed.write_rows(rows[:4])
+  crashed.flush()
+  crashed.write_rows(rows[4:6]) # Never flushed
+  assert sorted(read_stage(out)['app_id']) == sorted(row[6] for row in rows[:4])
+
+  with ParquetSink(out) as sink:
+    sink.write_rows(rows[4:])
+  assert not any(name.startswith('_') for name in os.listdir(out))
+  assert sorted(read_stage(out)['app_id']) == sorted(row[6] for row in rows)
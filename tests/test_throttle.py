@@ -0,0 +1,81 @@
+import asyncio
+import email.utils
+import shutil
+import time
+
+import pytest
+
+import fetch
+import standin
+from throttle import AdaptiveLimit, RetryPolicy, TokenBucket, parse_retry_after
+
+
+@pytest.mark.parametrize('value, seconds', [
+  ('120', 120.0),
+  (' 3 ', 3.0),
+  (None, None),
+  ('', None),
+  ('soon', None),
+])
+def test_parse_retry_after(value, seconds):
+  assert parse_retry_after(value) == seconds
+
+def test_parse_retry_after_http_date():
+  in_a_minute = email.utils.formatdate(time.time() + 60, usegmt = True)
+  assert 55 <= parse_retry_after(in_a_minute) <= 60
+  a_minute_ago = email.utils.formatdate(time.time() - 60, usegmt = True)
+  assert parse_retry_after(a_minute_ago) == 0.0
+
+
+# A pause holds back the next token even though the bucket refills much faster than that
+def test_token_bucket_pause():
+  async def wait_after_pause():
+    bucket = TokenBucket(rate = 1000, burst = 5)
+    await bucket.acquire()
+    bucket.pause(0.2)
+    start = time.monotonic()
+    await bucket.acquire()
+    return time.monotonic() - start
+  assert asyncio.run(wait_after_pause()) >= 0.19
+
+
+# Halves on every push back (once per cooldown), grows back by one after `limit` successes in a row
+def test_adaptive_limit():
+  gate = AdaptiveLimit(8, cooldown = 0)
+  gate.throttled()
+  assert gate.limit == 4
+  gate.throttled()
+  gate.throttled()
+  assert gate.limit == 1
+  gate.throttled()
+  assert gate.limit == 1 # Never under the minimum
+  gate.success()
+  assert gate.limit == 2
+  gate.success()
+  assert gate.limit == 2
+  gate.success()
+  assert gate.limit == 3
+
+def test_adaptive_limit_cooldown():
+  gate = AdaptiveLimit(8, cooldown = 60)
+  gate.throttled()
+  gate.throttled() # Same burst of push back, counted once
+  assert gate.limit == 4
+
+
+# Against a store that throttles 30% of the requests, every page still comes in, after retries
+def test_scrape_retries_throttled_requests(tmp_path, pages_dir):
+  saved_pages = tmp_path / 'saved_pages'
+  saved_pages.mkdir()
+  for app_id in range(101, 109):
+    shutil.copy(pages_dir + '/1001.html', saved_pages / (str(app_id) + '.html'))
+  server, base_url = standin.serve(str(saved_pages), throttle_rate = 0.3, retry_after = 0)
+  urls = [base_url + '/app/' + str(app_id) + '/' for app_id in range(101, 109)]
+  try:
+    hw_df, errors = fetch.scrape_urls(urls, concurrency = 4, retry = RetryPolicy(attempts = 10, base_delay = 0.01))
+  finally:
+    server.shutdown()
+
+  assert errors == []
+  assert sorted(hw_df['app_id']) == [str(app_id) for app_id in range(101, 109)]
+  assert server.RequestHandlerClass.requests_seen > len(urls)
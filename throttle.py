@@ -0,0 +1,156 @@
+# Throttling and retries for store fetches.
+#
+# Under load the store answers with 429s and 5xxs, or stalls, and every one of those used to end up as a lost
+# "ERROR FOR URL". The pieces here let the fetch engine back off instead:
+#   TokenBucket        : per-host rate limit that allows short bursts, and can be paused (for a Retry-After)
+#   RetryPolicy        : which failures are worth retrying, and how long to wait (exponential backoff with jitter,
+#                        or whatever Retry-After asked for)
+#   AdaptiveLimit      : how many requests may be in flight. It halves when the store pushes back and creeps
+#                        back up one at a time while requests go through (additive increase, multiplicative decrease)
+
+import asyncio
+import email.utils
+import random
+import time
+
+import aiohttp
+
+# Responses that mean "slow down / try again later", as opposed to "this page doesn't exist"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+# Refills at `rate` tokens per second up to `burst` tokens. Each request takes one token, waiting if there's none
+class TokenBucket:
+  def __init__(self, rate, burst = 1):
+    self.rate = rate
+    self.burst = burst
+    self.tokens = burst
+    self.updated = time.monotonic()
+    self.paused_until = 0.0
+    self.lock = asyncio.Lock()
+
+  # Waits for a token (and for any pause to be over)
+  async def acquire(self):
+    async with self.lock: # Waiters are served in turn
+      while True:
+        now = time.monotonic()
+        if now < self.paused_until:
+          await asyncio.sleep(self.paused_until - now)
+          continue
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+          self.tokens = self.tokens - 1
+          return
+        await asyncio.sleep((1 - self.tokens) / self.rate)
+
+  # Given : A number of seconds, holds back every request for that long (the bucket is emptied too)
+  def pause(self, seconds):
+    self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+    self.tokens = 0
+
+
+# One TokenBucket per host, made the first time the host is seen. A rate of None (or 0) means no limit
+class HostRateLimiter:
+  def __init__(self, per_host_rate = None, burst = 1):
+    self.per_host_rate = per_host_rate
+    self.burst = burst
+    self.buckets = {}
+
+  def bucket(self, host):
+    if host not in self.buckets:
+      self.buckets[host] = TokenBucket(self.per_host_rate, self.burst)
+    return self.buckets[host]
+
+  # Given : A host name, waits until a request to that host is allowed
+  async def wait(self, host):
+    if self.per_host_rate:
+      await self.bucket(host).acquire()
+
+  # Given : A host name and a number of seconds, holds back every request to that host for that long
+  def pause(self, host, seconds):
+    if self.per_host_rate:
+      self.bucket(host).pause(seconds)
+
+
+# Given : The value of a Retry-After header (seconds, or an HTTP date), or None
+# Returns : How many seconds to wait, or None if there's no (usable) header
+def parse_retry_after(value):
+  if not value:
+    return None
+  value = value.strip()
+  if value.isdigit():
+    return float(value)
+  try:
+    when = email.utils.parsedate_to_datetime(value)
+  except (TypeError, ValueError):
+    return None
+  return max(0.0, when.timestamp() - time.time())
+
+
+class RetryPolicy:
+  # attempts    : Tries per url, the first one included
+  # base_delay  : Wait before the first retry, doubled for every one after it (with full jitter)
+  # max_delay   : Longest wait between two tries (a Retry-After is capped to this too)
+  def __init__(self, attempts = 4, base_delay = 1.0, max_delay = 60.0):
+    self.attempts = attempts
+    self.base_delay = base_delay
+    self.max_delay = max_delay
+
+  # Given : The exception a fetch raised
+  # Returns : True if it's worth trying again (throttling, server errors, timeouts, dropped connections)
+  def should_retry(self, error):
+    if isinstance(error, aiohttp.ClientResponseError):
+      return error.status in RETRY_STATUSES
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError))
+
+  # Given : The number of the try that just failed (1 for the first) and the exception it raised
+  # Returns : Seconds to wait before the next try: the Retry-After if the store sent one, else a random wait
+  #   between 0 and base_delay * 2^(attempt - 1) ("full jitter", so that throttled workers don't retry in lockstep)
+  def delay(self, attempt, error):
+    headers = getattr(error, 'headers', None)
+    retry_after = parse_retry_after(headers.get('Retry-After')) if headers else None
+    if retry_after is not None:
+      return min(retry_after, self.max_delay)
+    return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+# A semaphore whose size follows how the store is coping: halved (at most once per `cooldown` seconds) whenever
+# a request is throttled, failed with a server error or timed out, and grown by one after `limit` requests in a
+# row went through. Stays between minimum and maximum
+class AdaptiveLimit:
+  def __init__(self, maximum, minimum = 1, start = None, cooldown = 5.0):
+    self.maximum = maximum
+    self.minimum = minimum
+    self.limit = start or maximum
+    self.cooldown = cooldown
+    self.in_flight = 0
+    self.successes = 0
+    self.last_decrease = 0.0
+    self.condition = asyncio.Condition()
+
+  async def __aenter__(self):
+    async with self.condition:
+      await self.condition.wait_for(lambda: self.in_flight < self.limit)
+      self.in_flight = self.in_flight + 1
+    return self
+
+  async def __aexit__(self, *exc_info):
+    async with self.condition:
+      self.in_flight = self.in_flight - 1
+      self.condition.notify_all()
+
+  # A request went through
+  def success(self):
+    self.successes = self.successes + 1
+    if self.successes >= self.limit and self.limit < self.maximum:
+      self.limit = self.limit + 1
+      self.successes = 0
+
+  # The store pushed back (429, 5xx, timeout)
+  def throttled(self):
+    self.successes = 0
+    now = time.monotonic()
+    if now - self.last_decrease >= self.cooldown:
+      self.limit = max(self.minimum, self.limit // 2)
+      self.last_decrease = now